@@ -0,0 +1,179 @@
+import argparse
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from settings import (LOGS_DIR, BASE_URL, SCRAPE_ENGINE, BACKFILL_WORKERS,
+                      BACKFILL_MIN_INTERVAL)
+from main import open_settlement_page, scrape_month_selenium, scrape_month_http
+from utils.driver_pool import new_driver
+from utils.http_scraper import create_session, open_settlement_form
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """
+    Enforces a minimum interval between consecutive requests of one worker.
+    """
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._last_call = 0.0
+
+    def wait(self):
+        delay = self._last_call + self.min_interval - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self._last_call = time.monotonic()
+
+
+def parse_month(value):
+    """
+    Parses a 'YYYY-MM' string.
+    Returns:
+        tuple: (year, month)
+    Raises:
+        ValueError: If the value is not a valid 'YYYY-MM' month.
+    """
+    try:
+        year, month = (int(part) for part in value.split('-'))
+    except ValueError:
+        raise ValueError(f"Invalid month '{value}'. Expected format YYYY-MM.")
+    if not (1 <= month <= 12):
+        raise ValueError(f"Invalid month '{value}'. Please enter a value between 1 and 12.")
+    return year, month
+
+
+def iter_months(start, end):
+    """
+    Yields every (year, month) from start to end, both inclusive.
+    Args:
+        start (tuple): (year, month) of the first month
+        end (tuple): (year, month) of the last month
+    """
+    year, month = start
+    while (year, month) <= end:
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+class _Worker:
+    """
+    Per-thread scrape state: one HTTP form or one browser, reused for every month the thread handles.
+    """
+
+    def __init__(self, url, engine, min_interval):
+        self.url = url
+        self.engine = engine
+        self.limiter = RateLimiter(min_interval)
+        self.session = None
+        self.form = None
+        self.driver = None
+
+    def scrape(self, year, month):
+        if self.engine == 'http':
+            # The session waits for the limiter before each of its requests: a month takes
+            # several postbacks (year, month, Go, download)
+            if self.form is None:
+                self.session = create_session(self.limiter)
+                self.form = open_settlement_form(self.session, self.url)
+            return scrape_month_http(self.form, year, month)
+
+        # The browser sends its own requests; it is paced per page action
+        self.limiter.wait()
+        if self.driver is None:
+            self.driver = new_driver()
+            open_settlement_page(self.driver, self.url)
+            self.limiter.wait()
+        return scrape_month_selenium(self.driver, year, month)
+
+    def reset(self):
+        """Drops the current session/browser so the next month starts from a fresh page."""
+        if self.session is not None:
+            self.session.close()
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception as e:
+                logger.debug(f"Error closing browser: {str(e)}")
+        self.session = self.form = self.driver = None
+
+
+def backfill(start, end, workers=BACKFILL_WORKERS, engine=SCRAPE_ENGINE,
+             min_interval=BACKFILL_MIN_INTERVAL, url=BASE_URL):
+    """
+    Scrapes every month between start and end over a bounded pool of workers. Each month's
+    settlement_YYYY_MM.csv and XLS export are written as soon as that month completes.
+    Args:
+        start (tuple): (year, month) of the first month
+        end (tuple): (year, month) of the last month
+        workers (int): Number of concurrent workers (sessions or browsers)
+        engine (str): 'http' or 'selenium'
+        min_interval (float): Minimum seconds between two requests of the same worker
+        url (str): The settlement calendar URL
+    Returns:
+        dict: Maps (year, month) to True (saved), False (no data) or None (failed: the month
+              raised once its retries were spent, on either engine)
+    """
+    months = list(iter_months(start, end))
+    logger.info(f"Backfilling {len(months)} months with {workers} {engine} workers")
+
+    local = threading.local()
+    all_workers = []
+    lock = threading.Lock()
+
+    def run(year, month):
+        worker = getattr(local, 'worker', None)
+        if worker is None:
+            worker = local.worker = _Worker(url, engine, min_interval)
+            with lock:
+                all_workers.append(worker)
+        try:
+            return worker.scrape(year, month)
+        except Exception:
+            worker.reset()
+            raise
+
+    results = {}
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(run, y, m): (y, m) for y, m in months}
+            for future in as_completed(futures):
+                y, m = futures[future]
+                try:
+                    results[(y, m)] = future.result()
+                    logger.info(f"Backfilled {y}-{m:02d}")
+                except Exception as e:
+                    results[(y, m)] = None
+                    logger.error(f"Backfill failed for {y}-{m:02d}: {str(e)}", exc_info=True)
+    finally:
+        for worker in all_workers:
+            worker.reset()
+
+    failed = sorted(key for key, value in results.items() if value is None)
+    logger.info(f"Backfill complete: {len(months) - len(failed)} of {len(months)} months processed")
+    if failed:
+        logger.error(f"Failed months: {', '.join(f'{y}-{m:02d}' for y, m in failed)}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill the BSE settlement calendar for a range of months.")
+    parser.add_argument('start', help="First month, YYYY-MM")
+    parser.add_argument('end', help="Last month, YYYY-MM")
+    parser.add_argument('--workers', type=int, default=BACKFILL_WORKERS)
+    parser.add_argument('--engine', choices=['http', 'selenium'], default=SCRAPE_ENGINE)
+    parser.add_argument('--min-interval', type=float, default=BACKFILL_MIN_INTERVAL)
+    args = parser.parse_args()
+
+    os.makedirs(LOGS_DIR, exist_ok=True)
+    logging.basicConfig(
+        filename=os.path.join(LOGS_DIR, 'backfill.log'),
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        filemode='a'
+    )
+    backfill(parse_month(args.start), parse_month(args.end), workers=args.workers,
+             engine=args.engine, min_interval=args.min_interval)
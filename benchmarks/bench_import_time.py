@@ -0,0 +1,78 @@
+"""
+Checks the start-up cost of each CLI sub-command against an import-time budget.
+
+For every sub-command a fresh interpreter imports cli and the modules the sub-command loads
+before doing any work, and reports the time taken and the heavy libraries that came with them.
+A sub-command over its budget, or loading a library it does not need up front, fails the
+check (exit status 1).
+
+    python benchmarks/bench_import_time.py
+    python benchmarks/bench_import_time.py --budget-ms 150 --repeat 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BUDGET_MS = 250.0  # import time allowed per sub-command
+
+HEAVY_MODULES = ['selenium', 'webdriver_manager', 'bs4', 'requests', 'pandas', 'pdfplumber', 'pyarrow']
+
+# Modules imported by each sub-command of cli.py before it starts working
+COMMAND_MODULES = {
+    'scrape-bse': ['main'],
+    'convert-xls': ['utils.excel_scrap', 'main'],
+    'clean': ['utils.clean_csv'],
+    'validate': ['utils.validation', 'utils.run_manifest'],
+    'extract-nse': ['utils.nse_batch', 'utils.downloader'],
+    'all': ['main', 'utils.driver_pool'],
+    'daemon': ['utils.daemon', 'utils.driver_pool'],
+}
+
+_PROBE = """
+import importlib, json, sys, time
+start = time.perf_counter()
+import cli
+for name in sys.argv[1:]:
+    importlib.import_module(name)
+elapsed = time.perf_counter() - start
+heavy = sorted(m for m in %r if m in sys.modules)
+print(json.dumps({'ms': elapsed * 1000, 'heavy': heavy}))
+""" % (HEAVY_MODULES,)
+
+
+def probe(modules):
+    """
+    Imports cli and modules in a fresh interpreter.
+    Returns:
+        dict: 'ms' (import time in milliseconds) and 'heavy' (heavy libraries loaded)
+    """
+    output = subprocess.run([sys.executable, '-c', _PROBE] + modules, cwd=REPO_DIR, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--budget-ms', type=float, default=BUDGET_MS, help="Import time allowed per sub-command")
+    parser.add_argument('--repeat', type=int, default=3, help="Fresh interpreters per sub-command (best is kept)")
+    args = parser.parse_args()
+
+    failed = []
+    print(f"{'command':<12} {'import ms':>10}  heavy modules")
+    for command, modules in COMMAND_MODULES.items():
+        results = [probe(modules) for _ in range(args.repeat)]
+        best = min(result['ms'] for result in results)
+        heavy = results[-1]['heavy']
+        over = best > args.budget_ms
+        print(f"{command:<12} {best:>10.1f}  {', '.join(heavy) or '-'}"
+              f"{'  OVER BUDGET' if over else ''}")
+        if over or heavy:
+            failed.append(command)
+
+    if failed:
+        print(f"\nImport budget of {args.budget_ms:.0f} ms exceeded or heavy imports in: {', '.join(failed)}")
+        sys.exit(1)
@@ -0,0 +1,69 @@
+"""
+Benchmarks serial vs. process-pool page extraction on a synthetic multi-page circular.
+
+    python benchmarks/bench_pdf_extraction.py --pages 48 --workers 1 2 4
+    python benchmarks/bench_pdf_extraction.py --table-finder
+
+The annexure layouts are learned by a first, untimed extraction. With --table-finder every page
+goes through pdfplumber's table finder instead (PDF_LAYOUT_EXTRACTION = False).
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic_pdf import build_settlement_pdf
+from utils import pdf_extraction
+from utils.pdf_extraction import extract_pdf_data
+from utils.pdf_layout import LayoutCache
+
+
+def run(pdf_bytes, workers, layout_cache=None):
+    """
+    Extracts the PDF into a scratch directory.
+    Returns:
+        tuple: (seconds, sorted list of written file names with their contents)
+    """
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)
+        try:
+            start = time.perf_counter()
+            extract_pdf_data(io.BytesIO(pdf_bytes), 'BENCH', workers=workers, layout_cache=layout_cache)
+            elapsed = time.perf_counter() - start
+            outputs = []
+            for root, _, files in os.walk(scratch):
+                for name in sorted(files):
+                    with open(os.path.join(root, name), encoding='utf-8') as f:
+                        outputs.append((name, f.read()))
+        finally:
+            os.chdir(cwd)
+    return elapsed, sorted(outputs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=48)
+    parser.add_argument('--rows', type=int, default=25)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--table-finder', action='store_true', help="Extract without the cached layouts")
+    args = parser.parse_args()
+
+    pdf_bytes = build_settlement_pdf(args.pages, args.rows)
+    print(f"Synthetic PDF: {args.pages + 1} pages, {len(pdf_bytes) / 1024:.0f} KiB")
+    pdf_extraction.PDF_LAYOUT_EXTRACTION = not args.table_finder
+    layout_cache = LayoutCache(None)
+    run(pdf_bytes, 1, layout_cache)
+
+    baseline_time, baseline_outputs = None, None
+    for workers in args.workers:
+        elapsed, outputs = run(pdf_bytes, workers, layout_cache)
+        if baseline_time is None:
+            baseline_time, baseline_outputs = elapsed, outputs
+        same = "identical" if outputs == baseline_outputs else "DIFFERENT"
+        print(f"workers={workers:<3} {elapsed:7.2f}s  speedup x{baseline_time / elapsed:4.2f}  "
+              f"files={len(outputs)} output {same}")
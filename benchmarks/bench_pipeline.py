@@ -0,0 +1,291 @@
+"""
+Benchmarks every pipeline stage offline, against recorded BSE fixtures and synthetic NSE
+circulars, scaling the input from one month to ten years and from one page to 200 pages.
+
+    python benchmarks/bench_pipeline.py --months 1 12 120 --pages 1 20 200
+    python benchmarks/bench_pipeline.py --json results.json
+    python benchmarks/bench_pipeline.py --baseline results.json --tolerance 0.2
+
+Stages: scrape (settlement page -> rows), convert (XLS export -> CSV), clean ('@' anomalies),
+dates (conversion to the publish format), validate (compare_folders) and pdf (extract_pdf_data).
+Every run works in a scratch directory: the directory settings of the loaded modules are
+pointed into it, so nothing is written under BASE_DIR and no request leaves the machine.
+Timings are the best of --repeat runs without memory tracing; the peak memory comes from one
+extra traced run. With --baseline, a stage whose throughput dropped by more than --tolerance
+is reported as a regression and the script exits with status 1.
+"""
+import argparse
+import csv
+import inspect
+import io
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import settings
+from benchmarks.bse_fixtures import load_sample_tables, shift_month, render_setcal_page, render_xls_export
+from benchmarks.synthetic_pdf import build_settlement_pdf
+from utils import columnar_sink, instrumentation, table_parser
+from utils.table_parser import parse_settlement_tables
+from utils.excel_scrap import clean_xls_files
+from utils.clean_csv import clean_csv_date_columns, convert_date_format
+from utils.validation import compare_folders
+from utils.pdf_extraction import extract_pdf_data
+from utils.pdf_layout import LayoutCache
+
+STAGES = ['scrape', 'convert', 'clean', 'dates', 'validate', 'pdf']
+
+
+@contextmanager
+def redirect_base_dir(scratch):
+    """
+    Points every path setting under BASE_DIR into scratch: the module globals of the loaded
+    utils modules and the default arguments captured from them. Restored on exit.
+    """
+    base = settings.BASE_DIR
+    saved = []
+
+    def move(value):
+        return os.path.join(scratch, os.path.relpath(value, base))
+
+    def is_path(value):
+        return isinstance(value, str) and value.startswith(base)
+
+    for name, module in list(sys.modules.items()):
+        if not name.startswith('utils.') or module is None:
+            continue
+        for attr, value in list(vars(module).items()):
+            if is_path(value):
+                saved.append((module, attr, value))
+                setattr(module, attr, move(value))
+            elif inspect.isfunction(value) and value.__module__ == name:
+                func = inspect.unwrap(value)
+                if func.__defaults__ and any(is_path(v) for v in func.__defaults__):
+                    saved.append((func, '__defaults__', func.__defaults__))
+                    func.__defaults__ = tuple(move(v) if is_path(v) else v for v in func.__defaults__)
+    try:
+        yield
+    finally:
+        for target, attr, value in reversed(saved):
+            setattr(target, attr, value)
+
+
+def month_fixtures(count, start_year=2015):
+    """
+    Returns (year, month, settlement page, XLS export) for `count` consecutive months.
+    """
+    main_rows, timing_rows = load_sample_tables()
+    fixtures = []
+    for i in range(count):
+        year, month = start_year + i // 12, i % 12 + 1
+        main, timing = shift_month(main_rows, year, month), shift_month(timing_rows, year, month)
+        fixtures.append((year, month, render_setcal_page(main, timing), render_xls_export(main, timing)))
+    return fixtures
+
+
+def _write_settlement_csvs(fixtures, folder):
+    os.makedirs(folder, exist_ok=True)
+    for year, month, page, _ in fixtures:
+        with open(os.path.join(folder, f"settlement_{year}_{month:02d}.csv"), 'w', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerows(parse_settlement_tables(page))
+
+
+def _write_xls_exports(fixtures, folder):
+    os.makedirs(folder, exist_ok=True)
+    for year, month, _, export in fixtures:
+        with open(os.path.join(folder, f"settlement_{year}_{month:02d}.xls"), 'w', encoding='utf-8') as f:
+            f.write(export)
+
+
+def bse_stages(fixtures, workers):
+    """
+    Returns stage name -> (prepare, run) for the BSE stages. prepare() lays out the inputs of
+    the stage in the scratch directory, run() is the measured call.
+    """
+    def prepare_scrape():
+        pass
+
+    def run_scrape():
+        for _, _, page, _ in fixtures:
+            parse_settlement_tables(page)
+
+    def prepare_convert():
+        _write_xls_exports(fixtures, settings_dir('OUTPUT_DIR'))
+
+    def prepare_settlement():
+        _write_settlement_csvs(fixtures, settings_dir('SETTLEMENT_DIR'))
+
+    def run_dates():
+        folder = settings_dir('SETTLEMENT_DIR')
+        for filename in sorted(os.listdir(folder)):
+            convert_date_format(filename, folder, settings_dir('READY_DIR'))
+
+    def prepare_validate():
+        prepare_convert()
+        clean_xls_files()
+        prepare_settlement()
+        columnar_sink.is_enabled()  # pyarrow is imported once, not inside the measured stage
+
+    def run_validate():
+        mismatches = compare_folders(settings_dir('OUTPUT_DIR'), settings_dir('SETTLEMENT_DIR'),
+                                     workers=workers, report_dir=None, dest_folder=settings_dir('READY_DIR'))
+        if mismatches:
+            raise RuntimeError(f"{mismatches} fixture files did not validate")
+
+    return {
+        'scrape': (prepare_scrape, run_scrape),
+        'convert': (prepare_convert, clean_xls_files),
+        'clean': (prepare_settlement, lambda: clean_csv_date_columns(settings_dir('SETTLEMENT_DIR'))),
+        'dates': (prepare_settlement, run_dates),
+        'validate': (prepare_validate, run_validate),
+    }
+
+
+def pdf_stage(pdf_bytes, workers, layout_cache):
+    def run():
+        if extract_pdf_data(io.BytesIO(pdf_bytes), 'BENCH', workers=workers, layout_cache=layout_cache) is None:
+            raise RuntimeError("PDF extraction failed")
+
+    return (lambda: None, run)
+
+
+def settings_dir(name):
+    """
+    Returns a directory setting as currently redirected (the value seen by the utils modules).
+    """
+    return getattr(sys.modules['utils.validation'], name)
+
+
+def run_case(stage, prepare, run, repeat):
+    """
+    Runs one stage `repeat` times untraced, then once with memory tracing, each time in a
+    fresh scratch directory.
+    Returns:
+        dict: best wall time, its CPU time and the peak traced memory in bytes
+    """
+    best = None
+    for traced in [False] * repeat + [True]:
+        instrumentation.METRICS_TRACE_MEMORY = traced
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as scratch, redirect_base_dir(scratch):
+            os.chdir(scratch)
+            try:
+                prepare()
+                with instrumentation.measure(f"bench.{stage}") as measurement:
+                    if run() is False:
+                        raise RuntimeError(f"Stage {stage} failed")
+            finally:
+                os.chdir(cwd)
+        if traced:
+            best['peak_mem_bytes'] = measurement.peak
+        elif best is None or measurement.wall < best['wall_s']:
+            best = {'wall_s': measurement.wall, 'cpu_s': measurement.cpu}
+    return best
+
+
+def run_benchmarks(stages, month_scales, page_scales, repeat, workers):
+    """
+    Returns:
+        list: One result dict per (stage, scale)
+    """
+    results = []
+    for months in month_scales:
+        fixtures = month_fixtures(months)
+        cases = bse_stages(fixtures, workers)
+        for stage in (s for s in STAGES if s in stages and s in cases):
+            results.append(dict(stage=stage, unit='months', scale=months,
+                                **run_case(stage, *cases[stage], repeat)))
+            print_result(results[-1])
+    if 'pdf' in stages:
+        layout_cache = LayoutCache(None)  # in memory, shared by the runs: layouts are learned on the first one
+        for pages in page_scales:
+            pdf_bytes = build_settlement_pdf(pages)
+            results.append(dict(stage='pdf', unit='pages', scale=pages,
+                                **run_case('pdf', *pdf_stage(pdf_bytes, workers, layout_cache), repeat)))
+            print_result(results[-1])
+    return results
+
+
+def print_result(result):
+    throughput = result['scale'] / result['wall_s'] if result['wall_s'] else float('inf')
+    result['throughput'] = throughput
+    print(f"{result['stage']:<9} {result['scale']:>5} {result['unit']:<7} {result['wall_s'] * 1000:>10.1f} "
+          f"{result['cpu_s'] * 1000:>10.1f} {throughput:>10.1f}/s {result['peak_mem_bytes'] / 1024:>10.0f}")
+
+
+def print_trends(results):
+    """
+    Prints, per stage, how throughput and peak memory per unit evolve with the input size
+    relative to the smallest scale: flat is linear, a falling throughput is super-linear work.
+    """
+    print(f"\n{'stage':<9} {'scale':>5} {'throughput x':>13} {'KiB/unit':>10}")
+    by_stage = {}
+    for result in results:
+        by_stage.setdefault(result['stage'], []).append(result)
+    for stage, rows in by_stage.items():
+        base = rows[0]['throughput']
+        for row in rows:
+            print(f"{stage:<9} {row['scale']:>5} {row['throughput'] / base:>13.2f} "
+                  f"{row['peak_mem_bytes'] / 1024 / row['scale']:>10.1f}")
+
+
+def compare_baseline(results, baseline_path, tolerance):
+    """
+    Compares throughput with a previous --json run.
+    Returns:
+        list: (stage, scale, baseline throughput, throughput) of every regression
+    """
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(r['stage'], r['scale']): r for r in json.load(f)['results']}
+    regressions = []
+    print(f"\nAgainst {baseline_path} (tolerance {tolerance:.0%}):")
+    for result in results:
+        old = baseline.get((result['stage'], result['scale']))
+        if not old:
+            continue
+        change = result['throughput'] / old['throughput'] - 1
+        flag = 'REGRESSION' if change < -tolerance else ''
+        print(f"{result['stage']:<9} {result['scale']:>5} {change:>+8.1%} {flag}")
+        if flag:
+            regressions.append((result['stage'], result['scale'], old['throughput'], result['throughput']))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    parser.add_argument('--months', type=int, nargs='+', default=[1, 12, 120])
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 20, 200])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=1, help="Processes for validation and PDF extraction")
+    parser.add_argument('--backend', choices=['lxml', 'bs4'], help="Force a table parser backend")
+    parser.add_argument('--json', help="Write the results to this file")
+    parser.add_argument('--baseline', help="Results file of an earlier run to compare with")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed throughput drop (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+
+    backend = args.backend or ('lxml' if table_parser.etree is not None else 'bs4')
+    if backend == 'bs4':
+        table_parser.etree = None
+    elif table_parser.etree is None:
+        sys.exit("lxml is not installed")
+
+    print(f"backend={backend} workers={args.workers} repeat={args.repeat}")
+    print(f"{'stage':<9} {'scale':>5} {'unit':<7} {'wall ms':>10} {'cpu ms':>10} {'throughput':>12} {'peak KiB':>10}")
+    results = run_benchmarks(args.stages, args.months, args.pages, args.repeat, args.workers)
+    print_trends(results)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'backend': backend, 'workers': args.workers, 'python': platform.python_version(),
+                       'results': results}, f, indent=2)
+    if args.baseline and compare_baseline(results, args.baseline, args.tolerance):
+        sys.exit(1)
@@ -0,0 +1,67 @@
+"""
+Compares the lxml and BeautifulSoup table-extraction backends on the settlement page and
+the XLS export, scaling the number of table rows.
+
+    python benchmarks/bench_table_parser.py --scales 1 10 100
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bse_fixtures import load_sample_tables, scale_rows, render_setcal_page, render_xls_export
+from utils import table_parser
+
+
+def measure(func, repeat):
+    """
+    Returns (seconds per call, peak traced memory in KiB, result of the last call).
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    elapsed = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024, result
+
+
+def run_backend(backend, page, export, repeat):
+    saved = table_parser.etree
+    if backend == 'bs4':
+        table_parser.etree = None
+    try:
+        return (measure(lambda: table_parser.parse_settlement_tables(page), repeat),
+                measure(lambda: table_parser.parse_xls_export(export), repeat))
+    finally:
+        table_parser.etree = saved
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if table_parser.etree is None:
+        sys.exit("lxml is not installed; nothing to compare against")
+
+    main_rows, timing_rows = load_sample_tables()
+    print(f"{'scale':>6} {'input':>14} {'backend':>8} {'page ms':>9} {'page KiB':>9} {'xls ms':>9} {'xls KiB':>9}")
+    for scale in args.scales:
+        page = render_setcal_page(scale_rows(main_rows, scale), timing_rows)
+        export = render_xls_export(scale_rows(main_rows, scale), timing_rows)
+        results = {}
+        for backend in ('bs4', 'lxml'):
+            (page_s, page_kib, page_rows), (xls_s, xls_kib, xls_rows) = run_backend(backend, page, export, args.repeat)
+            results[backend] = (page_rows, xls_rows)
+            print(f"{scale:>6} {len(page) // 1024:>6}/{len(export) // 1024:>5}KiB {backend:>8} "
+                  f"{page_s * 1000:>9.1f} {page_kib:>9.0f} {xls_s * 1000:>9.1f} {xls_kib:>9.0f}")
+        if results['bs4'] != results['lxml']:
+            print(f"{'':>6} WARNING: backends disagree at scale {scale}")
@@ -0,0 +1,101 @@
+"""
+Renders offline BSE fixtures from the sample settlement CSV kept in archive/:
+the setcal.aspx page as the browser sees it after clicking Go, and the .xls export
+(an HTML document) the download button returns.
+"""
+import csv
+import html
+import os
+import re
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_CSV = os.path.join(REPO_DIR, 'archive', 'settlement', 'settlement_2025_05.csv')
+
+
+def load_sample_tables(path=SAMPLE_CSV):
+    """
+    Reads a settlement CSV and splits it at the blank separator row.
+    Returns:
+        tuple: (main_rows, timing_rows), each starting with its header row
+    """
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        rows = list(csv.reader(f))
+    if [] in rows:
+        blank = rows.index([])
+        return rows[:blank], rows[blank + 1:]
+    return rows, []
+
+
+def scale_rows(rows, factor):
+    """
+    Repeats the data rows of a table `factor` times, keeping a single header.
+    """
+    return rows[:1] + rows[1:] * factor
+
+
+def shift_month(rows, year, month, sample_year=2025, sample_month=5):
+    """
+    Moves every dd/mm/yyyy date of the sample tables into another month, so fixtures for
+    consecutive months publish to distinct files. Days are capped at 28 to stay valid.
+    """
+    offset = (year - sample_year) * 12 + (month - sample_month)
+
+    def shift(match):
+        day, m, y = (int(part) for part in match.groups())
+        y, m = divmod(y * 12 + m - 1 + offset, 12)
+        return f"{min(day, 28):02d}/{m + 1:02d}/{y}"
+
+    return [[re.sub(r'(\d{2})/(\d{2})/(\d{4})', shift, value) for value in row] for row in rows]
+
+
+def render_table(table_id, rows):
+    """
+    Renders rows the way an ASP.NET DataGrid does: a header row of <th> and data rows of <td>.
+    """
+    out = [f'<table cellspacing="0" rules="all" border="1" id="{table_id}" style="border-collapse:collapse;">']
+    out.append('<tr class="tablehead">' + ''.join(f'<th scope="col">{html.escape(h)}</th>' for h in rows[0]) + '</tr>')
+    for row in rows[1:]:
+        out.append('<tr class="TTRow">' + ''.join(f'<td>{html.escape(v)}</td>' for v in row) + '</tr>')
+    out.append('</table>')
+    return '\n'.join(out)
+
+
+def _layout_filler(blocks):
+    """
+    Navigation/menu markup standing in for the rest of the BSE page.
+    """
+    items = ''.join(f'<li><a href="/markets/page{i}.aspx">Menu item {i}</a></li>' for i in range(40))
+    return ''.join(f'<div class="menu"><ul>{items}</ul><script>var x{i} = {i};</script></div>'
+                   for i in range(blocks))
+
+
+def render_setcal_page(main_rows, timing_rows, filler_blocks=20):
+    """
+    Renders the settlement calendar page after a Go postback.
+    """
+    tables = render_table('ContentPlaceHolder1_dgSettle', main_rows)
+    if timing_rows:
+        tables += render_table('ContentPlaceHolder1_dg1', timing_rows)
+    return f'''<!DOCTYPE html>
+<html><head><title>Settlement Calendar</title></head><body>
+<form method="post" action="./setcal.aspx" id="form1">
+<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="{'A' * 4000}" />
+{_layout_filler(filler_blocks)}
+<table class="layout"><tr><td>
+<select name="ctl00$ContentPlaceHolder1$ddlYear" id="ContentPlaceHolder1_ddlYear"><option value="2025">2025</option></select>
+<input type="submit" name="ctl00$ContentPlaceHolder1$btnGo" value="Go" id="ContentPlaceHolder1_btnGo" />
+<input type="image" name="ctl00$ContentPlaceHolder1$imgDownload" id="ContentPlaceHolder1_imgDownload" src="/images/xls.gif" />
+{tables}
+</td></tr></table>
+{_layout_filler(filler_blocks)}
+</form></body></html>'''
+
+
+def render_xls_export(main_rows, timing_rows):
+    """
+    Renders the .xls export returned by the download button.
+    """
+    tables = render_table('ContentPlaceHolder1_dgSettle', main_rows)
+    if timing_rows:
+        tables += '<br/>' + render_table('ContentPlaceHolder1_dg1', timing_rows)
+    return f'<html><head><meta charset="utf-8"></head><body>{tables}</body></html>'
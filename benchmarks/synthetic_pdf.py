@@ -0,0 +1,162 @@
+"""
+Builds synthetic NSE-style settlement circular PDFs for the benchmarks.
+
+Every page after the cover holds one ruled table laid out like the circular annexures:
+annexure title row, description row, header row, data rows and, on every third page,
+an exemption note spanning the whole last row. build_annexure_a_pdf builds the odd one out,
+Annexure A, whose columns are split into unlabelled sub-columns.
+"""
+from datetime import date, timedelta
+
+HEADER = ['Settlement Type', 'Settlement No.', 'Trade Start Date', 'Trade End Date',
+          'Custodial Confirmation Date', 'Settlement Date']
+TYPES = ['B', 'M', 'Z', '5']
+COLUMN_WIDTHS = [70, 70, 80, 80, 110, 80]
+ROW_HEIGHT = 16
+LEFT = 40
+TOP = 800
+FONT_SIZE = 7
+ANNEXURE_A_SPLITS = (2, 4)  # columns drawn as two unlabelled sub-columns below the header
+
+
+def _escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def _table_rows(page_number, rows_per_page):
+    settlement_type = TYPES[page_number % len(TYPES)]
+    rows = [[f"Annexure '{settlement_type}'"] + [''] * 5,
+            [f"Schedule {page_number}"] + [''] * 5,
+            list(HEADER)]
+    start = date(2025, 1, 1) + timedelta(days=page_number * rows_per_page)
+    for i in range(rows_per_page):
+        trade = start + timedelta(days=i)
+        settle = trade + timedelta(days=1)
+        rows.append([settlement_type, str(2025000 + page_number * 1000 + i),
+                     trade.strftime('%d-%b-%y'), trade.strftime('%d-%b-%y'),
+                     settle.strftime('%d-%b-%y'), settle.strftime('%d-%b-%y')])
+    if page_number % 3 == 0:
+        rows.append(['Auction of shortages will be conducted in the next settlement', '', '', '', '', ''])
+    return rows
+
+
+def _page_content(rows):
+    ops = ['0.5 w']
+    right = LEFT + sum(COLUMN_WIDTHS)
+    bottom = TOP - ROW_HEIGHT * len(rows)
+    # The exemption note is a merged cell: inner rules stop above it
+    inner_bottom = bottom + ROW_HEIGHT if not any(rows[-1][1:]) else bottom
+
+    # Horizontal rules
+    for i in range(len(rows) + 1):
+        y = TOP - ROW_HEIGHT * i
+        ops.append(f"{LEFT} {y} m {right} {y} l S")
+    # Vertical rules
+    x = LEFT
+    for i, width in enumerate([0] + COLUMN_WIDTHS):
+        x += width
+        edge = i in (0, len(COLUMN_WIDTHS))
+        ops.append(f"{x} {TOP} m {x} {bottom if edge else inner_bottom} l S")
+
+    for i, row in enumerate(rows):
+        y = TOP - ROW_HEIGHT * (i + 1) + 5
+        x = LEFT
+        for width, value in zip(COLUMN_WIDTHS, row):
+            if value:
+                ops.append(f"BT /F1 {FONT_SIZE} Tf {x + 3} {y} Td ({_escape(value)}) Tj ET")
+            x += width
+    return '\n'.join(ops).encode('latin-1')
+
+
+def _annexure_a_content(rows):
+    right = LEFT + sum(COLUMN_WIDTHS)
+    bottom = TOP - ROW_HEIGHT * len(rows)
+    has_note = not any(rows[-1][1:])
+    # The note spans every column but the first, whose rule runs down to the bottom
+    inner_bottom = bottom + ROW_HEIGHT if has_note else bottom
+    below_header = TOP - ROW_HEIGHT * 3
+    ops = ['0.5 w']
+
+    for i in range(len(rows) + 1):
+        y = TOP - ROW_HEIGHT * i
+        ops.append(f"{LEFT} {y} m {right} {y} l S")
+    x = LEFT
+    for i, width in enumerate(COLUMN_WIDTHS):
+        if i in ANNEXURE_A_SPLITS:
+            ops.append(f"{x + width / 2} {below_header} m {x + width / 2} {inner_bottom} l S")
+        ops.append(f"{x} {TOP} m {x} {bottom if i <= 1 else inner_bottom} l S")
+        x += width
+    ops.append(f"{right} {TOP} m {right} {bottom} l S")
+
+    for i, row in enumerate(rows):
+        y = TOP - ROW_HEIGHT * (i + 1) + 5
+        if has_note and i == len(rows) - 1:
+            ops.append(f"BT /F1 {FONT_SIZE} Tf {LEFT + COLUMN_WIDTHS[0] + 3} {y} Td ({_escape(row[0])}) Tj ET")
+            continue
+        x = LEFT
+        for column, (width, value) in enumerate(zip(COLUMN_WIDTHS, row)):
+            # Below the header, a split column's value sits in either of its sub-columns
+            offset = width / 2 if column in ANNEXURE_A_SPLITS and i > 2 and i % 2 else 0
+            if value:
+                ops.append(f"BT /F1 {FONT_SIZE} Tf {x + offset + 3} {y} Td ({_escape(value)}) Tj ET")
+            x += width
+    return '\n'.join(ops).encode('latin-1')
+
+
+def _build_pdf(contents):
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # Pages, filled in once the page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    page_refs = []
+    for content in contents:
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        content_ref = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref)
+        page_refs.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % ref for ref in page_refs)
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_refs)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def build_settlement_pdf(pages, rows_per_page=25):
+    """
+    Builds a settlement circular PDF.
+    Args:
+        pages (int): Number of annexure pages (a cover page is added in front)
+        rows_per_page (int): Data rows in each annexure table
+    Returns:
+        bytes: The PDF document
+    """
+    contents = [b"BT /F1 14 Tf 40 780 Td (Synthetic settlement circular) Tj ET"]
+    contents += [_page_content(_table_rows(page_number, rows_per_page))
+                 for page_number in range(1, pages + 1)]
+    return _build_pdf(contents)
+
+
+def build_annexure_a_pdf(rows_per_page=25, note=True):
+    """
+    Builds a circular whose only annexure is an Annexure A table.
+    Args:
+        rows_per_page (int): Data rows in the table
+        note (bool): End the table with an exemption note
+    Returns:
+        bytes: The PDF document
+    """
+    rows = _table_rows(3 if note else 1, rows_per_page)
+    rows[0][0] = "Annexure 'A'"
+    contents = [b"BT /F1 14 Tf 40 780 Td (Synthetic settlement circular) Tj ET", _annexure_a_content(rows)]
+    return _build_pdf(contents)
@@ -0,0 +1,158 @@
+"""
+Runs the whole pipeline or a single stage of it.
+
+    python cli.py all
+    python cli.py scrape-bse --year 2025 --month 5
+    python cli.py convert-xls
+    python cli.py clean
+    python cli.py validate --workers 4
+    python cli.py extract-nse CMPT66953 --workers 2
+    python cli.py daemon --run-now
+
+Only settings and the standard library are imported up front. Each sub-command imports what
+it needs when it runs, so a validation-only run never loads Selenium, pandas or pdfplumber.
+"""
+import os
+import sys
+import logging
+import argparse
+from datetime import datetime
+from settings import (LOGS_DIR, BASE_URL, SETTLEMENT_DIR, OUTPUT_DIR, VALIDATION_WORKERS,
+                      NSE_BATCH_WORKERS, PROFILE_RUN, DAEMON_PORT)
+
+logger = logging.getLogger(__name__)
+
+
+def scrape_bse(args):
+    from main import scrape_bse
+
+    scrape_bse(args.url, args.year, args.month)
+    return 0
+
+
+def convert_xls(args):
+    from utils.excel_scrap import clean_xls_files
+    from main import record_months_converted
+
+    clean_xls_files()
+    record_months_converted()
+    return 0
+
+
+def clean(args):
+    from utils.clean_csv import clean_csv_date_columns
+
+    clean_csv_date_columns(args.folder)
+    return 0
+
+
+def validate(args):
+    from utils.validation import compare_folders
+    from utils.run_manifest import get_run_manifest
+
+    mismatches = compare_folders(output_folder=OUTPUT_DIR, settlement_folder=SETTLEMENT_DIR,
+                                 manifest=get_run_manifest(), workers=args.workers)
+    return 1 if mismatches else 0
+
+
+def extract_nse(args):
+    from utils.nse_batch import load_circulars, configured_circulars
+    from utils.downloader import create_pooled_session
+
+    session = create_pooled_session(args.workers)
+    results = load_circulars(args.circulars or configured_circulars(session), workers=args.workers,
+                             session=session)
+    return 0 if all(results.values()) else 1
+
+
+def run_all(args):
+    from main import build_pipeline
+    from utils.driver_pool import get_driver_pool
+
+    try:
+        results = build_pipeline(args.url).run()
+    finally:
+        get_driver_pool().close()
+    return 0 if all(result.status == 'ok' for result in results.values()) else 1
+
+
+def daemon(args):
+    from utils.daemon import build_daemon
+    from utils.driver_pool import get_driver_pool
+
+    try:
+        build_daemon(args.url, port=args.port).run_forever(run_now=args.run_now)
+    finally:
+        get_driver_pool().close()
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="BSE / NSE settlement calendar pipeline.")
+    parser.add_argument('--profile', action='store_true', default=PROFILE_RUN,
+                        help="Write a cProfile dump of the run to PROFILE_DIR")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    command = commands.add_parser('scrape-bse', help="Scrape the BSE calendar and its XLS export")
+    command.add_argument('--url', default=BASE_URL)
+    command.add_argument('--year', type=int, default=datetime.now().year)
+    command.add_argument('--month', type=int, default=datetime.now().month,
+                         help="First month scraped; the next month is scraped as well")
+    command.set_defaults(func=scrape_bse)
+
+    command = commands.add_parser('convert-xls', help="Convert the XLS exports in OUTPUT_DIR to CSV")
+    command.set_defaults(func=convert_xls)
+
+    command = commands.add_parser('clean', help="Strip the '@' anomalies from the scraped CSVs")
+    command.add_argument('--folder', default=SETTLEMENT_DIR)
+    command.set_defaults(func=clean)
+
+    command = commands.add_parser('validate', help="Validate, convert and publish the BSE files")
+    command.add_argument('--workers', type=int, default=VALIDATION_WORKERS)
+    command.set_defaults(func=validate)
+
+    command = commands.add_parser('extract-nse', help="Download and extract NSE circulars")
+    command.add_argument('circulars', nargs='*', help="Circular URLs or ids (default: NSE_CIRCULARS)")
+    command.add_argument('--workers', type=int, default=NSE_BATCH_WORKERS)
+    command.set_defaults(func=extract_nse)
+
+    command = commands.add_parser('all', help="Run the whole pipeline")
+    command.add_argument('--url', default=BASE_URL)
+    command.set_defaults(func=run_all)
+
+    command = commands.add_parser('daemon', help="Keep running, on the DAEMON_SCHEDULES cron schedules")
+    command.add_argument('--url', default=BASE_URL)
+    command.add_argument('--port', type=int, default=DAEMON_PORT, help="Health/metrics port (0: any free port)")
+    command.add_argument('--run-now', action='store_true', help="Run every job once at start-up")
+    command.set_defaults(func=daemon)
+    return parser
+
+
+def main(argv=None):
+    """
+    Parses the command line and runs the sub-command.
+    Returns:
+        int: Exit status, 0 on success
+    """
+    args = build_parser().parse_args(argv)
+
+    os.makedirs(LOGS_DIR, exist_ok=True)
+    logging.basicConfig(
+        filename=os.path.join(LOGS_DIR, 'scrape.log'),
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        filemode='a'
+    )
+    logger.info(f"Running {args.command}...")
+    try:
+        from utils.instrumentation import profile_run
+
+        with profile_run(args.profile):
+            return args.func(args)
+    except Exception as e:
+        logger.error(f"{args.command} failed: {str(e)}", exc_info=True)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
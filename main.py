@@ -1,32 +1,31 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import Select
-from selenium.webdriver.chrome.options import Options
 from datetime import datetime
-import time
 import csv
 import os 
-import shutil
-from bs4 import BeautifulSoup
 import logging
 from settings import (SETTLEMENT_DIR, LOGS_DIR, OUTPUT_DIR, ARCHIVE_DIR,
-                     CHROME_OPTIONS, HEADLESS_MODE, WAIT_TIMEOUT, BASE_URL, PDF_URL)
-from selenium.webdriver.common.action_chains import ActionChains
+                     POSTBACK_TIMEOUT, DOWNLOAD_TIMEOUT, BASE_URL,
+                     SCRAPE_ENGINE, PROFILE_RUN)
 
-# Import functions from helper modules
+# Import functions from helper modules. Selenium and the HTTP engine (bs4, requests) are
+# imported by the functions that drive them, so runs that only validate or extract start fast
 from utils.excel_scrap import clean_xls_files
-from utils.clean_csv import clean_csv_date_columns
 from utils.validation import compare_folders
-from utils.pdf_extraction import load_pdf
-from utils.retry_mechanism import run_with_retries
+from utils.columnar_sink import build_consolidated, is_enabled as columnar_enabled
+from utils.settlement_index import get_settlement_index
+from utils.pipeline_runner import PipelineRunner
+from utils.nse_batch import load_circulars, configured_circulars
+from utils.downloader import create_pooled_session
+from utils.retry_mechanism import retry
+from utils.instrumentation import instrumented, profile_run
+from utils.table_parser import parse_settlement_tables, MAIN_TABLE_ID
+from utils.driver_pool import get_driver_pool
+from utils.archive_store import get_archive_store
+from utils.run_manifest import get_run_manifest, rows_sha256, month_key, month_key_from_filename
 
 # Initialize logger at the top
 logger = logging.getLogger(__name__)
 
+@instrumented()
 def scrape_table_data(driver):
     """
     Scrapes table data from a web page using Selenium and BeautifulSoup.
@@ -37,34 +36,14 @@ def scrape_table_data(driver):
     Raises:
         TimeoutException: If the main table element is not found within 10 seconds
     """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
 
     WebDriverWait(driver, 20).until(
         EC.presence_of_element_located((By.ID, "ContentPlaceHolder1_dgSettle"))
     )
-    soup = BeautifulSoup(driver.page_source, 'html.parser')
-    main_table = soup.find('table', {'id': 'ContentPlaceHolder1_dgSettle'})
-    data = []
-    
-    # Get headers
-    headers = [th.get_text(strip=True) for th in main_table.find('tr').find_all('th')]
-    data.append(headers)
-    
-    # Get rows
-    for row in main_table.find_all('tr')[1:]: 
-        cols = [td.get_text(strip=True) for td in row.find_all('td')]
-        data.append(cols)
-    
-    timing_table = soup.find('table', {'id': 'ContentPlaceHolder1_dg1'})
-    if timing_table:
-        timing_headers = [th.get_text(strip=True) for th in timing_table.find('tr').find_all('th')]
-        data.append([])  
-        data.append(timing_headers)
-        
-        for row in timing_table.find_all('tr')[1:]:  # Skip header row
-            cols = [td.get_text(strip=True) for td in row.find_all('td')]
-            data.append(cols)
-    
-    return data
+    return parse_settlement_tables(driver.page_source)
 
 def save_to_csv(data, filename='settlement_calendar.csv'):
     """
@@ -83,6 +62,7 @@ def save_to_csv(data, filename='settlement_calendar.csv'):
         writer.writerows(data)
     logger.info(f"Data saved to {filepath}")
 
+@instrumented()
 def download_xlsx_file(driver, year, month):
     """
     Downloads the XLSX file by clicking the download icon and saves it to the output directory.
@@ -90,56 +70,62 @@ def download_xlsx_file(driver, year, month):
         driver: Selenium WebDriver instance
         year (int): The year for the filename
         month (int): The month for the filename
+    Raises:
+        TimeoutError: If the file is not downloaded within DOWNLOAD_TIMEOUT
     """
-    try:
-        # Create output directory if it doesn't exist
-        os.makedirs(OUTPUT_DIR, exist_ok=True)
-        
-        # Configure Chrome to automatically download files without dialog
-        driver.command_executor._commands["send_command"] = ("POST", '/session/$sessionId/chromium/send_command')
-        params = {
-            'cmd': 'Page.setDownloadBehavior',
-            'params': {
-                'behavior': 'allow',
-                'downloadPath': os.path.abspath(OUTPUT_DIR)
-            }
+    from selenium.webdriver.common.by import By
+    from utils.wait_conditions import wait_for_download
+
+    # Create output directory if it doesn't exist
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    # Configure Chrome to automatically download files without dialog
+    driver.command_executor._commands["send_command"] = ("POST", '/session/$sessionId/chromium/send_command')
+    params = {
+        'cmd': 'Page.setDownloadBehavior',
+        'params': {
+            'behavior': 'allow',
+            'downloadPath': os.path.abspath(OUTPUT_DIR)
         }
-        driver.execute("send_command", params)
-        
-        # Find and click the download link
-        download_link = driver.find_element(By.ID, "ContentPlaceHolder1_imgDownload")
-        download_link.click()
-        
-        # Wait for download to complete
-        time.sleep(WAIT_TIMEOUT)
-        
-        # Define filenames
-        original_filename = f"SettlementCalendar{month:02d}{year}.xls"
-        new_filename = f"settlement_{year}_{month:02d}.xls"
-        original_path = os.path.join('output', original_filename)
-        new_path = os.path.join('output', new_filename)
-        
-        # Rename the downloaded file
-        if os.path.exists(original_path):
-            os.rename(original_path, new_path)
-            logger.info(f"Successfully saved as {new_filename}")
-        else:
-            logger.warning(f"Expected file {original_filename} not found")
-        
-        logger.info(f"XLSX file downloaded for {year}-{month:02d}")
-        
-    except Exception as e:
-        logger.error(f"Error downloading XLSX file: {str(e)}", exc_info=True)
+    }
+    driver.execute("send_command", params)
 
+    # Find and click the download link
+    download_link = driver.find_element(By.ID, "ContentPlaceHolder1_imgDownload")
+    download_link.click()
 
-def open_site_in_incognito(url, year=datetime.now().year, month=datetime.now().month):
+    # Define filenames
+    original_filename = f"SettlementCalendar{month:02d}{year}.xls"
+    new_filename = f"settlement_{year}_{month:02d}.xls"
+    new_path = os.path.join(OUTPUT_DIR, new_filename)
+
+    # Wait for download to complete; a missing file fails the month so it is retried
+    original_path = wait_for_download(OUTPUT_DIR, original_filename, DOWNLOAD_TIMEOUT)
+    if not original_path:
+        raise TimeoutError(f"Expected file {original_filename} not downloaded after {DOWNLOAD_TIMEOUT}s")
+
+    # Rename the downloaded file
+    os.replace(original_path, new_path)
+    logger.info(f"Successfully saved as {new_filename}")
+    logger.info(f"XLSX file downloaded for {year}-{month:02d}")
+
+def save_xls_file(content, year, month):
     """
-    Opens a specified URL in an incognito Chrome browser window, selects the settlement month and year,
-    scrapes the table data, and saves it to CSV files for the specified month and the next month.
+    Saves an XLS export fetched over HTTP under the name the Selenium download is renamed to.
     Args:
-        url (str): The URL of the website to scrape.
-        year (int): The year for which to scrape the data.
-        month (str): The month for which to scrape the data (1-12).
+        content (bytes): The raw XLS (HTML) export
+        year (int): The year for the filename
+        month (int): The month for the filename
+    """
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    new_filename = f"settlement_{year}_{month:02d}.xls"
+    with open(os.path.join(OUTPUT_DIR, new_filename), 'wb') as f:
+        f.write(content)
+    logger.info(f"Successfully saved as {new_filename}")
+
+def get_month_year_pairs(year, month):
+    """
+    Returns the (month, year) pairs to scrape: the given month and the next one.
     Raises:
         ValueError: If the month is not between 1 and 12.
     """
@@ -147,69 +133,342 @@ def open_site_in_incognito(url, year=datetime.now().year, month=datetime.now().m
     if not (1 <= month_int <= 12):
         raise ValueError(f"Invalid month '{month}'. Please enter a value between 1 and 12.")
     if month_int == 12:
-        month_year_pairs = [(month_int, year), (1, year + 1)]
-    else:
-        month_year_pairs = [(month_int, year), (month_int + 1, year)]
-
-    options = Options()
-    options.add_argument("--incognito")
-    options.add_argument("--headless=new" if HEADLESS_MODE else "--start-maximized")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    # Setting desired resolution
-    options.add_argument("window-size=1920,1080")  
-    # Add these new preferences for automatic downloads
-    options.add_experimental_option("prefs", CHROME_OPTIONS)
-
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=options)
+        return [(month_int, year), (1, year + 1)]
+    return [(month_int, year), (month_int + 1, year)]
+
+def is_month_up_to_date(year, month, table_data):
+    """
+    Checks the run manifest for a month whose table was just scraped.
+    Returns:
+        bool: True if the same content was already published, or if the files a previous run
+              saved for it are still intact so the pipeline can resume from them
+    """
+    manifest = get_run_manifest()
+    key = month_key(year, month)
+    source_hash = rows_sha256(table_data)
+    if manifest.is_current('months', key, source_hash, 'published'):
+        logger.info(f"{key} unchanged since it was published. Skipping.")
+        return True
+    if manifest.is_current('months', key, source_hash, 'scraped') and manifest.outputs_intact('months', key):
+        logger.info(f"{key} unchanged, resuming from stage '{manifest.get('months', key)['stage']}'")
+        return True
+    return False
 
+def record_month_scraped(year, month, table_data):
+    """
+    Records the scraped month and the files saved for it in the run manifest.
+    """
+    get_run_manifest().record('months', month_key(year, month), 'scraped',
+                              source_hash=rows_sha256(table_data),
+                              outputs=[os.path.join(SETTLEMENT_DIR, f"settlement_{year}_{month:02d}.csv"),
+                                       os.path.join(OUTPUT_DIR, f"settlement_{year}_{month:02d}.xls")])
+
+def scrape_month_http(form, year, month):
+    """
+    Scrapes one month through the HTTP engine and saves the CSV and XLS export.
+    Months whose content is unchanged since the last run are not downloaded again.
+    Args:
+        form (PostbackForm): Settlement calendar form returned by open_settlement_form
+        year (int): The year to scrape
+        month (int): The month to scrape (1-12)
+    Returns:
+        bool: True if data was found (and saved unless unchanged), False if the month has no data
+    """
+    from utils.http_scraper import fetch_settlement_month, download_settlement_xls
+
+    table_data, _ = fetch_settlement_month(form, year, month, download=False)
+    if not table_data or len(table_data) <= 1:
+        logger.warning(f"No data available for {year}-{str(month).zfill(2)}. Skipping download.")
+        return False
+    if is_month_up_to_date(year, month, table_data):
+        return True
+
+    save_xls_file(download_settlement_xls(form), year, month)
+    save_to_csv(table_data, filename=f'settlement_{year}_{str(month).zfill(2)}.csv')
+    record_month_scraped(year, month, table_data)
+    return True
+
+@instrumented()
+def open_site_http(url, year=datetime.now().year, month=datetime.now().month, session=None):
+    """
+    Browserless equivalent of open_site_in_incognito: replays the settlement calendar postbacks
+    with requests for the specified month and the next month.
+    Args:
+        url (str): The URL of the website to scrape.
+        year (int): The year for which to scrape the data.
+        month (str): The month for which to scrape the data (1-12).
+        session (requests.Session): Session to reuse (kept open); a new one is used and closed if None
+    Raises:
+        ValueError: If the month is not between 1 and 12.
+    """
+    from utils.http_scraper import create_session, open_settlement_form
+
+    month_year_pairs = get_month_year_pairs(year, month)
+
+    owned = session is None
+    session = session or create_session()
     try:
-        driver.get(url)
-        WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+        form = open_settlement_form(session, url)
+        for m, y in month_year_pairs:
+            scrape_month_http(form, y, m)
+    finally:
+        if owned:
+            session.close()
+
+def run_scrape(url, year=datetime.now().year, month=datetime.now().month, session=None):
+    """
+    Scrapes the settlement calendar with the engine configured in SCRAPE_ENGINE.
+    The HTTP engine (on `session` if given) falls back to Selenium if it fails. The engines
+    have their own circuit breakers ('bse_http', 'bse_selenium'), so the circuit the HTTP
+    failures opened does not stop the fallback.
+    """
+    # Invalid months are not an engine failure
+    get_month_year_pairs(year, month)
+    if SCRAPE_ENGINE == 'http':
+        try:
+            return open_site_http(url, year, month, session)
+        except Exception as e:
+            logger.warning(f"HTTP engine failed ({str(e)}), falling back to Selenium", exc_info=True)
+    return open_site_in_incognito(url, year, month)
+
+
+@retry('open_settlement_page', circuit='bse_selenium')
+def open_settlement_page(driver, url):
+    """
+    Loads the settlement calendar page and selects the Equity T + 1 calendar.
+    """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait, Select
+    from selenium.webdriver.support import expected_conditions as EC
+
+    driver.get(url)
+    WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
 
-        # Equity T + 1
-        settlement_dropdown = Select(driver.find_element(By.ID, "ContentPlaceHolder1_ddlsetllementcal"))
-        settlement_dropdown.select_by_value("0")
+    # Equity T + 1
+    settlement_dropdown = Select(driver.find_element(By.ID, "ContentPlaceHolder1_ddlsetllementcal"))
+    settlement_dropdown.select_by_value("0")
 
+@retry('scrape_month', circuit='bse_selenium')
+def scrape_month_selenium(driver, year, month):
+    """
+    Selects the month and year on an open settlement calendar page, scrapes the table data
+    and saves the CSV and XLS export. Months whose content is unchanged since the last run
+    are not downloaded again.
+    Args:
+        driver: Selenium WebDriver instance on the settlement calendar page
+        year (int): The year to scrape
+        month (int): The month to scrape (1-12)
+    Returns:
+        bool: True if data was found (and saved unless unchanged), False if the month has no data
+    """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait, Select
+    from selenium.webdriver.support import expected_conditions as EC
+    from utils.wait_conditions import click_and_wait_for_postback
+
+    # Select year
+    year_dropdown = Select(driver.find_element(By.ID, "ContentPlaceHolder1_ddlYear"))
+    year_dropdown.select_by_value(str(year))
+
+    # Select month
+    month_dropdown = Select(driver.find_element(By.ID, "ContentPlaceHolder1_ddlMonth"))
+    month_dropdown.select_by_value(str(month).zfill(2))
+
+    # Click Go
+    go_button = driver.find_element(By.ID, "ContentPlaceHolder1_btnGo")
+
+    # Wait until the button is clickable
+    WebDriverWait(driver, 20).until(EC.element_to_be_clickable((By.ID, "ContentPlaceHolder1_btnGo")))
+
+    # Scroll to the button and click, then wait for the postback to replace the table
+    driver.execute_script("arguments[0].scrollIntoView();", go_button)
+    click_and_wait_for_postback(driver, go_button, MAIN_TABLE_ID, POSTBACK_TIMEOUT)
+
+    # A month with no data comes back without the table; any other failure is raised and retried
+    table_data = scrape_table_data(driver) if driver.find_elements(By.ID, MAIN_TABLE_ID) else None
+    if not table_data or len(table_data) <= 1:
+        logger.warning(f"No data available for {year}-{str(month).zfill(2)}. Skipping download.")
+        return False
+    if is_month_up_to_date(year, month, table_data):
+        return True
+
+    download_xlsx_file(driver, year, month)
+    save_to_csv(table_data, filename=f'settlement_{year}_{str(month).zfill(2)}.csv')
+    record_month_scraped(year, month, table_data)
+    return True
+
+@instrumented()
+def open_site_in_incognito(url, year=datetime.now().year, month=datetime.now().month):
+    """
+    Opens a specified URL in an incognito Chrome browser window, selects the settlement month and year,
+    scrapes the table data, and saves it to CSV files for the specified month and the next month.
+    The browser comes from the shared driver pool, so retries and later runs in the same process
+    reuse a warm session instead of launching Chrome again.
+    Args:
+        url (str): The URL of the website to scrape.
+        year (int): The year for which to scrape the data.
+        month (str): The month for which to scrape the data (1-12).
+    Raises:
+        ValueError: If the month is not between 1 and 12.
+    """
+    month_year_pairs = get_month_year_pairs(year, month)
+
+    with get_driver_pool().session() as driver:
+        open_settlement_page(driver, url)
         for m, y in month_year_pairs:
-            # Select year
-            year_dropdown = Select(driver.find_element(By.ID, "ContentPlaceHolder1_ddlYear"))
-            year_dropdown.select_by_value(str(y))
+            scrape_month_selenium(driver, y, m)
+
+def pending_months():
+    """
+    Returns the month keys with scraped files waiting in SETTLEMENT_DIR.
+    """
+    if not os.path.isdir(SETTLEMENT_DIR):
+        return []
+    return sorted(filter(None, (month_key_from_filename(f) for f in os.listdir(SETTLEMENT_DIR))))
+
+def record_months_converted():
+    """
+    Records the months whose XLS export was converted to CSV in OUTPUT_DIR.
+    """
+    manifest = get_run_manifest()
+    for filename in sorted(os.listdir(OUTPUT_DIR)):
+        key = month_key_from_filename(filename)
+        entry = manifest.get('months', key) if key and filename.endswith('.csv') else None
+        if entry and entry['stage'] == 'scraped':
+            manifest.record('months', key, 'converted',
+                            outputs=[os.path.join(SETTLEMENT_DIR, filename), os.path.join(OUTPUT_DIR, filename)])
 
-            # Select month
-            month_dropdown = Select(driver.find_element(By.ID, "ContentPlaceHolder1_ddlMonth"))
-            month_dropdown.select_by_value(str(m).zfill(2))
+def archive_outputs():
+    """
+    Archives the processed files of SETTLEMENT_DIR and OUTPUT_DIR in the archive store, as
+    settlement/<file> and output/<file>, and removes them from those folders. Files identical
+    to ones archived by earlier runs are not stored again.
+    """
+    files = {}
+    for folder, name in ((SETTLEMENT_DIR, "settlement"), (OUTPUT_DIR, "output")):
+        if not os.path.isdir(folder):
+            continue
+        for filename in sorted(os.listdir(folder)):
+            path = os.path.join(folder, filename)
+            if os.path.isfile(path):
+                files[f"{name}/{filename}"] = path
+    if not files:
+        return
 
-            # Click Go
-            go_button = driver.find_element(By.ID, "ContentPlaceHolder1_btnGo")
+    store = get_archive_store()
+    store.archive_run(files)
+    store.prune()
 
-            # Wait until the button is clickable
-            WebDriverWait(driver, 20).until(EC.element_to_be_clickable((By.ID, "ContentPlaceHolder1_btnGo")))
+    manifest = get_run_manifest()
+    months = sorted({key for key in map(month_key_from_filename, map(os.path.basename, files.values())) if key})
+    for key in months:
+        if manifest.get('months', key):
+            manifest.record('months', key, 'archived')
+    logger.info(f"Archived {len(months)} months to {ARCHIVE_DIR}")
 
-            # Scroll to the button and click
-            driver.execute_script("arguments[0].scrollIntoView();", go_button)
-            go_button.click()
-            time.sleep(5)
+def convert_pending_months():
+    """
+    Converts the XLS exports of the months whose settlement calendar changed.
+    Returns:
+        list: The pending month keys (empty when nothing changed)
+    """
+    months = pending_months()
+    if not months:
+        logger.info("\nSettlement calendar unchanged since the last run, nothing to process")
+        return months
 
-            # Scrape and save
-            try:
-                table_data = scrape_table_data(driver)
+    # Process XLS files to CSV
+    logger.info(f"\nProcessing XLS files for {', '.join(months)}...")
+    clean_xls_files()
+    record_months_converted()
+    return months
 
-                # Check if table_data is empty or if the expected table is not found
-                if not table_data or len(table_data) <= 1:
-                    logger.warning(f"No data available for {y}-{str(m).zfill(2)}. Skipping download.")
-                    continue
 
-                download_xlsx_file(driver, y, m)
-                save_to_csv(table_data, filename=f'settlement_{y}_{str(m).zfill(2)}.csv')
+def validate_months(months):
+    """
+    Cleans, validates against the settlement folder and publishes in a single pass.
+    Returns:
+        int: Number of mismatched files
+    """
+    if not months:
+        return 0
+    logger.info("\nCleaning and validating files...")
+    # Loads pyarrow (about 0.5 s) for the columnar partitions before the measured compare_folders
+    columnar_enabled()
+    return compare_folders(output_folder=OUTPUT_DIR, settlement_folder=SETTLEMENT_DIR,
+                           manifest=get_run_manifest())
+
+
+def extract_circulars(circulars=None, session=None):
+    """
+    Downloads and extracts the NSE circulars concurrently (NSE_CIRCULARS and the discovered ones by default).
+    A pooled session is created unless one is given.
+    """
+    logger.info("\n Starting PDF extraction")
+    session = session or create_pooled_session()
+    results = load_circulars(circulars if circulars is not None else configured_circulars(session), session=session)
+    if not all(results.values()):
+        raise RuntimeError("PDF Extraction Failed")
+    logger.info("Extraction Complete")
+
+
+def publish_datasets():
+    # Rebuild the consolidated Parquet/Arrow datasets from the monthly partitions
+    build_consolidated()
+
+    # Index the new outputs for trading date / settlement number lookups
+    get_settlement_index().update()
+
+
+def archive_if_matched(months, mismatch_count):
+    if months and mismatch_count == 0:
+        logger.info("\nAll files match successfully!")
+        archive_outputs()
+    elif mismatch_count:
+        logger.error(f"\n{mismatch_count} files have mismatches. Please check the validation report.")
+
+
+def scrape_bse(url, year=datetime.now().year, month=datetime.now().month, session=None):
+    # Open the site and download the XLS file. The page load, each month and each download are
+    # retried on their own (@retry); retrying the whole scrape as well would multiply the attempts.
+    run_scrape(url, year, month, session)
+
+
+def build_pipeline(url=BASE_URL, circulars=None, branches=('bse', 'nse'), session=None, publish_unchanged=True):
+    """
+    Builds the daily run as a DAG: the BSE branch (scrape -> convert -> validate) and the NSE
+    branch (download + extract the circular) have no dependency on each other and run concurrently.
+    Publishing the datasets waits for both branches; archiving waits for the index to be updated.
+    Args:
+        url (str): The settlement calendar URL
+        circulars (list): NSE circulars to process; the configured ones if None
+        branches (tuple): Branches to run, 'bse' and/or 'nse'
+        session (requests.Session): Session reused by the HTTP requests of the run, if given
+        publish_unchanged (bool): Rebuild the datasets even when the run recorded no new output
+    Returns:
+        PipelineRunner: The runner, ready to run()
+    """
+    manifest_revision = get_run_manifest().revision
+
+    def publish():
+        if not publish_unchanged and get_run_manifest().revision == manifest_revision:
+            logger.info("No new output, datasets not rebuilt")
+            return
+        publish_datasets()
+
+    runner = PipelineRunner()
+    if 'bse' in branches:
+        # The month is read when the stage runs, so a long-running process follows month rollovers
+        runner.add('scrape_bse', lambda: scrape_bse(url, datetime.now().year, datetime.now().month, session))
+        runner.add('convert_xls', lambda _: convert_pending_months(), deps=['scrape_bse'])
+        runner.add('validate', validate_months, deps=['convert_xls'])
+    if 'nse' in branches:
+        runner.add('extract_nse', lambda: extract_circulars(circulars, session))
+    runner.add('publish_datasets', publish, after=[name for name in ('validate', 'extract_nse') if name in runner.stages])
+    if 'bse' in branches:
+        runner.add('archive', archive_if_matched, deps=['convert_xls', 'validate'], after=['publish_datasets'])
+    return runner
 
-            except Exception as e:
-                logger.error(f"Error while scraping data for {y}-{str(m).zfill(2)}: {str(e)}", exc_info=True)
-                continue
-    finally:
-        driver.quit()
 
 if __name__ == "__main__":
     try:
@@ -225,43 +484,9 @@ if __name__ == "__main__":
         )
         
         logger.info("Starting scraping process...")
-        URL = BASE_URL
-        pdf_url = PDF_URL
-        pdf_file_name = pdf_url.split("/")[-1].split(".")[0]
-        # year = YEAR
-        # month = MONTH
-        
-        # Open the site and download the XLS file
-        # success = run_with_retries(lambda: open_site_in_incognito(URL, year, month))
-        success = run_with_retries(lambda: open_site_in_incognito(URL))
-        if success:
-            # Process XLS files to CSV
-            logger.info("\nProcessing XLS files...")
-            clean_xls_files()
-            
-            # Clean CSV files
-            logger.info("\nCleaning CSV files...")
-            clean_csv_date_columns(folder=SETTLEMENT_DIR)
-            
-            # Validate against settlement folder
-            logger.info("\nValidating files...")
-            mismatch_count = compare_folders(output_folder=OUTPUT_DIR, settlement_folder=SETTLEMENT_DIR)
-
-            logger.info("\n Starting PDF extraction")
-            pdf_file = load_pdf(pdf_url,pdf_file_name)
-            if pdf_file:
-                logger.info("Extraction Complete")
-            else:
-                logger.error("PDF Extraction Failed")
-
-            if mismatch_count == 0:
-                logger.info("\nAll files match successfully!")
-                os.makedirs(ARCHIVE_DIR, exist_ok=True)
-                shutil.move(SETTLEMENT_DIR, os.path.join(ARCHIVE_DIR, "settlement"))
-                shutil.move(OUTPUT_DIR, os.path.join(ARCHIVE_DIR, "output"))
-            else:
-                logger.error(f"\n{mismatch_count} files have mismatches. Please check the validation report.")
-        else:
-            logger.error("All attempts to run the scraping process failed.")
+        with profile_run(PROFILE_RUN):
+            build_pipeline(BASE_URL).run()
     except Exception as e:
-        logger.error(f"Scraping failed: {str(e)}", exc_info=True)
\ No newline at end of file
+        logger.error(f"Scraping failed: {str(e)}", exc_info=True)
+    finally:
+        get_driver_pool().close()
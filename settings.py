@@ -19,14 +19,100 @@ CHROME_OPTIONS = {
 
 # Browser settings
 HEADLESS_MODE = True
-WAIT_TIMEOUT = 10 
+POSTBACK_TIMEOUT = 20  # maximum seconds to wait for a page postback
+DOWNLOAD_TIMEOUT = 60  # maximum seconds to wait for a download to complete
+DRIVER_POOL_SIZE = 1  # warm browsers kept between retries and runs of the same process
+DRIVER_CACHE_FILE = os.path.join(BASE_DIR, 'cache', 'chromedriver.json')
+DRIVER_CACHE_MAX_AGE = 7 * 24 * 60 * 60  # seconds before chromedriver is resolved again
+
+# Scrape engine: 'http' replays the ASP.NET postback with requests, 'selenium' drives Chrome.
+# The http engine falls back to selenium when it fails.
+SCRAPE_ENGINE = 'http'
+
+# HTTP settings
+REQUEST_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                  "AppleWebKit/537.36 (KHTML, like Gecko) "
+                  "Chrome/120.0.0.0 Safari/537.36"
+}
+HTTP_TIMEOUT = (10, 30)  # (connect, read) seconds
+DOWNLOAD_CHUNK_SIZE = 256 * 1024  # bytes streamed to disk at a time
+DOWNLOAD_RESUME_ATTEMPTS = 3  # connection attempts per download, each resuming where the last stopped
+DOWNLOAD_POOL_SIZE = 8  # keep-alive connections per host in the shared session
+
+# Retry settings
+RETRY_MAX_ATTEMPTS = 3  # attempts per stage (one month, one download, one PDF)
+RETRY_BASE_DELAY = 1.0  # seconds before the first retry, doubled on each attempt (with jitter)
+RETRY_MAX_DELAY = 30.0  # longest wait between two attempts
+RETRY_BUDGET = 30  # retries allowed across all stages of one run
+CIRCUIT_FAILURE_THRESHOLD = 5  # consecutive failures before a site is no longer called
+CIRCUIT_RESET_TIMEOUT = 60  # seconds before a trial call is let through again
+
+# Download cache
+HTTP_CACHE_DIR = os.path.join(BASE_DIR, 'cache', 'http')
+HTTP_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+# Columnar output: 'parquet', 'arrow' (IPC) or None. Needs pyarrow, skipped when it is not installed
+COLUMNAR_FORMAT = 'parquet'
+COLUMNAR_DIR = os.path.join(BASE_DIR, 'columnar')
+
+# Archive store: processed files of every run, compressed and stored once per content
+ARCHIVE_INDEX_PATH = os.path.join(ARCHIVE_DIR, 'index.sqlite3')  # runs, their files and the blobs holding them
+ARCHIVE_COMPRESSION = 'zstd'  # 'zstd' (needs zstandard, gzip is used without it) or 'gzip'
+ARCHIVE_KEEP_RUNS = 30  # most recent runs always kept in full
+ARCHIVE_MAX_AGE_DAYS = 90  # older runs beyond those are pruned, except for the latest version of each file
+
+# Run manifest: per month / circular source hash, stage reached and output hashes
+RUN_MANIFEST_PATH = os.path.join(BASE_DIR, 'state', 'run_manifest.json')
+
+# Settlement index: trading date / settlement number lookups over the processed outputs
+SETTLEMENT_INDEX_PATH = os.path.join(BASE_DIR, 'state', 'settlement_index.sqlite3')
+SETTLEMENT_INDEX_MAX_SPAN = 31  # longest trading period (days) expanded into the index
+
+# Instrumentation: per-stage wall time, CPU time and peak memory, one JSON line per stage
+METRICS_PATH = os.path.join(LOGS_DIR, 'metrics.jsonl')
+METRICS_MAX_BYTES = 10 * 1024 * 1024  # the metrics file is moved to metrics.jsonl.1 (replacing it) past this size
+METRICS_TRACE_MEMORY = False  # trace Python allocations for the per-stage peak (tracemalloc, slows allocations while on)
+PROFILE_RUN = False  # also profile every run with cProfile
+PROFILE_DIR = os.path.join(LOGS_DIR, 'profiles')  # <run id>.prof files are written here
+
+# Daemon mode (python cli.py daemon): cron expressions (minute hour day month weekday, local time)
+DAEMON_SCHEDULES = {
+    'bse': '30 18 * * *',  # BSE calendar of the current and next month, so month rollovers are picked up
+    'nse': '*/5 * * * *',  # NSE circular check; an unchanged circular costs one conditional request
+}
+DAEMON_HOST = '127.0.0.1'  # the health/metrics endpoint only listens locally
+DAEMON_PORT = 8765  # GET /health and /metrics; None disables the endpoint
+
+# Backfill settings
+BACKFILL_WORKERS = 4
+BACKFILL_MIN_INTERVAL = 1.0  # minimum seconds between two requests of the same worker
 
 # Variables Settings
 BASE_URL = "https://www.bseindia.com/markets/equity/EQReports/setcal.aspx"
 PDF_URL = "https://nsearchives.nseindia.com/content/circulars/CMPT66953.pdf"
 PDF_OUTBOUND_FOLDER = "NSE"
+NSE_CIRCULARS = [PDF_URL]  # circular URLs or ids processed on every run
+NSE_CIRCULAR_INDEX_URL = None  # index page (HTML or circulars API JSON) to discover more circulars from
+NSE_CIRCULAR_URL_TEMPLATE = "https://nsearchives.nseindia.com/content/circulars/{}.pdf"  # id -> URL
+NSE_CIRCULAR_PATTERN = r'^CMPT\d+\.pdf$'  # file names of settlement circulars on the index page
+NSE_BATCH_WORKERS = 4  # circulars downloaded and extracted at the same time
 PDF_SETTLEMENT_COL = ['Settlement No.', 'Sett No']
 PDF_SETTLEMENT_DATE_COL = ['Settlement Date', 'Daily Settlement Date', 'Obligation Date']
+# CPUs this process may run on: the affinity mask, which containers often restrict, where supported
+USABLE_CPUS = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+PDF_WORKERS = USABLE_CPUS  # processes used to extract PDF pages in parallel; 1 (serial) on a single CPU
+PDF_PARALLEL_MIN_PAGES = 8  # shorter PDFs are extracted serially
+PDF_LAYOUT_EXTRACTION = True  # extract annexure tables on cached column layouts instead of the table finder
+PDF_LAYOUT_CACHE = os.path.join(BASE_DIR, 'state', 'pdf_layouts.json')  # learned column edges per annexure
+PDF_TITLE_REGION = 0.25  # top share of a page searched for the "Annexure 'X'" title
+PDF_CATALOG_NAME = 'catalog.json'  # list of the files written by the last extraction, in NSE/<circular>/
+VALIDATION_WORKERS = USABLE_CPUS  # processes used to validate settlement files in parallel; 1 (serial) on a single CPU
+VALIDATION_PARALLEL_MIN_FILES = 4  # smaller folders are validated serially
+VALIDATION_REPORT_DIR = LOGS_DIR  # validation_report.json / .csv are written here
+# Start method of the PDF and validation process pools: they are created from the pipeline's
+# threads, and forking a process with running threads can copy held locks into the workers
+PROCESS_START_METHOD = 'forkserver' if os.name == 'posix' else 'spawn'
 SETTLEMENT_COLUMN = 0
 PAY_IN_OUT_COLUMN = 4
 
@@ -0,0 +1,236 @@
+import os
+import sys
+import gzip
+import hashlib
+import threading
+import collections
+import types
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(REPO_DIR, 'tests', 'fixtures')
+sys.path.insert(0, REPO_DIR)
+
+CALENDAR_FIELD = 'ctl00$ContentPlaceHolder1$ddlsetllementcal'
+GO_FIELD = 'ctl00$ContentPlaceHolder1$btnGo'
+DOWNLOAD_FIELD = 'ctl00$ContentPlaceHolder1$imgDownload'
+
+
+def fixture_bytes(*parts):
+    with open(os.path.join(FIXTURES_DIR, *parts), 'rb') as f:
+        return f.read()
+
+
+class BseStandIn(ThreadingHTTPServer):
+    """
+    Serves the saved setcal.aspx pages the way the BSE site answers the browser: the initial
+    page on GET, then the page matching each postback. Every posted form is recorded.
+    """
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _BseHandler)
+        self.posts = []
+        self.fail_next = 0  # number of upcoming posts answered with a 500
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/setcal.aspx"
+
+
+class _BseHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._send(fixture_bytes('bse', 'setcal_initial.html'))
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length'])).decode('utf-8')
+        form = {name: values[0] for name, values in urllib.parse.parse_qs(body, keep_blank_values=True).items()}
+        self.server.posts.append(form)
+        if self.server.fail_next:
+            self.server.fail_next -= 1
+            self.send_error(500)
+            return
+        if f'{DOWNLOAD_FIELD}.x' in form:
+            self._send(fixture_bytes('bse', 'settlement_2025_05.xls'), 'application/vnd.ms-excel')
+        elif GO_FIELD in form:
+            self._send(fixture_bytes('bse', 'setcal_2025_05.html'))
+        elif form.get('__EVENTTARGET') == CALENDAR_FIELD:
+            self._send(fixture_bytes('bse', 'setcal_calendar.html'))
+        else:
+            self.send_error(400)
+
+    def _send(self, body, content_type='text/html; charset=utf-8'):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class DocumentServer(ThreadingHTTPServer):
+    """
+    Serves documents set in `documents` (path -> bytes) with an ETag, answering conditional
+    requests with 304 and Range requests guarded by a matching If-Range with 206. Every
+    request's headers are recorded.
+    """
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _DocumentHandler)
+        self.documents = {}
+        self.requests = []
+        self.gzip = False  # gzip whole bodies for clients accepting it
+        self.range_shift = 0  # answer ranges starting this many bytes before the requested one
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server_address[1]}{path}"
+
+
+class _DocumentHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.server.requests.append((self.path, dict(self.headers)))
+        body = self.server.documents.get(self.path)
+        if body is None:
+            self.send_error(404)
+            return
+        etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        start = 0
+        if self.headers.get('Range') and self.headers.get('If-Range') == etag:
+            start = max(int(self.headers['Range'].split('=')[1].split('-')[0]) - self.server.range_shift, 0)
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {start}-{len(body) - 1}/{len(body)}")
+        else:
+            self.send_response(200)
+        self.send_header('ETag', etag)
+        body = body[start:]
+        if self.server.gzip and not start and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class SettlementBrowser:
+    """
+    Stands in for a Selenium driver on setcal.aspx, serving the saved pages: the Go click
+    loads the month page, or for the months in `empty_months` the page without the settlement
+    table, and the download click saves the XLS export to the download directory, except for
+    the months in `failing_months`. Elements of a page go stale once the next page is loaded.
+    Go clicks are counted by (year, month).
+    """
+
+    def __init__(self):
+        self.command_executor = types.SimpleNamespace(_commands={})
+        self.empty_months = set()
+        self.failing_months = set()
+        self.go_clicks = collections.Counter()
+        self.fields = {}
+        self.download_dir = None
+        self._load('setcal_initial.html')
+
+    def _load(self, page):
+        self.page_source = fixture_bytes('bse', page).decode('utf-8')
+        self.page = object()
+
+    def get(self, url):
+        self._load('setcal_initial.html')
+
+    def quit(self):
+        pass
+
+    def find_elements(self, by, value):
+        if by == 'tag name':
+            return [_BrowserElement(self, value)] if f'<{value}' in self.page_source else []
+        return [_BrowserElement(self, value)] if f'id="{value}"' in self.page_source else []
+
+    def find_element(self, by, value):
+        from selenium.common.exceptions import NoSuchElementException
+
+        found = self.find_elements(by, value)
+        if not found:
+            raise NoSuchElementException(f"No element {value}")
+        return found[0]
+
+    def execute_script(self, script, *args):
+        pass
+
+    def execute(self, command, params):
+        # Page.setDownloadBehavior
+        self.download_dir = params['params']['downloadPath']
+
+    def clicked(self, element_id):
+        year, month = int(self.fields['ContentPlaceHolder1_ddlYear']), int(self.fields['ContentPlaceHolder1_ddlMonth'])
+        if element_id == 'ContentPlaceHolder1_btnGo':
+            self.go_clicks[(year, month)] += 1
+            self._load('setcal_calendar.html' if (year, month) in self.empty_months else 'setcal_2025_05.html')
+        elif element_id == 'ContentPlaceHolder1_imgDownload' and (year, month) not in self.failing_months:
+            with open(os.path.join(self.download_dir, f"SettlementCalendar{month:02d}{year}.xls"), 'wb') as f:
+                f.write(fixture_bytes('bse', 'settlement_2025_05.xls'))
+
+
+class _BrowserElement:
+    def __init__(self, browser, element_id, value=None):
+        self.browser = browser
+        self.id = element_id
+        self.value = value
+        self.page = browser.page
+        self.tag_name = 'select' if '_ddl' in element_id else 'input'
+
+    def _check(self):
+        from selenium.common.exceptions import StaleElementReferenceException
+
+        if self.page is not self.browser.page:
+            raise StaleElementReferenceException(f"{self.id} is no longer on the page")
+
+    def is_enabled(self):
+        self._check()
+        return True
+
+    is_displayed = is_enabled
+
+    def is_selected(self):
+        return False
+
+    def get_dom_attribute(self, name):
+        return None
+
+    def find_elements(self, by, css):
+        # The options of a <select>, looked up by Select.select_by_value
+        return [_BrowserElement(self.browser, self.id, css.split('"')[1])]
+
+    def click(self):
+        self._check()
+        if self.value is not None:
+            self.browser.fields[self.id] = self.value
+        else:
+            self.browser.clicked(self.id)
+
+
+def _serve(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def document_server():
+    yield from _serve(DocumentServer())
+
+
+@pytest.fixture
+def bse_server():
+    yield from _serve(BseStandIn())
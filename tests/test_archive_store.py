@@ -0,0 +1,94 @@
+import os
+import time
+import logging
+
+import pytest
+
+from utils import archive_store
+from utils.archive_store import ArchiveStore
+
+
+def test_without_zstandard_blobs_fall_back_to_gzip_and_zstd_blobs_fail_clearly(tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(archive_store, 'zstandard', None)
+    source = tmp_path / 'settlement_2025_05.csv'
+    source.write_bytes(b'Settlement No,Trade Date\n2025089,02-05-2025\n')
+
+    with caplog.at_level(logging.WARNING, logger='utils.archive_store'):
+        store = ArchiveStore(str(tmp_path / 'archive'), str(tmp_path / 'archive' / 'index.sqlite3'), 'zstd')
+    assert store.codec == 'gzip' and 'zstandard is not installed' in caplog.text
+    store.archive_run({'settlement/settlement_2025_05.csv': str(source)}, remove=False)
+    assert store.get('settlement/settlement_2025_05.csv') == source.read_bytes()
+
+    with pytest.raises(RuntimeError, match='pip install'):
+        archive_store._open_blob(str(tmp_path / 'blob.zst'), 'zstd', 'rb')
+    store.close()
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ArchiveStore(str(tmp_path / 'archive'), str(tmp_path / 'archive' / 'index.sqlite3'), 'gzip')
+    yield store
+    store.close()
+
+
+def archive(store, tmp_path, contents):
+    files = {}
+    for name, content in contents.items():
+        path = tmp_path / 'run' / name.replace('/', '_')
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(content)
+        files[name] = str(path)
+    run_id = store.archive_run(files)
+    time.sleep(0.01)  # runs are ordered by creation time
+    return run_id
+
+
+def blob_files(tmp_path):
+    return sorted(name for _, _, names in os.walk(tmp_path / 'archive' / 'blobs') for name in names)
+
+
+def test_prune_keeps_recent_runs_and_the_latest_version_of_every_file(store, tmp_path):
+    v1, v2, timing = b'DR-621,02/05/2025\n', b'DR-621,05/05/2025\n', b'DR-626,09/05/2025\n'
+    first = archive(store, tmp_path, {'settlement/a.csv': v1, 'settlement/b.csv': timing,
+                                      'settlement/only_first.csv': b'DR-600\n'})
+    second = archive(store, tmp_path, {'settlement/a.csv': v1, 'settlement/b.csv': timing})
+    third = archive(store, tmp_path, {'settlement/a.csv': v2, 'settlement/b.csv': timing})
+
+    # Each content is stored once, however many runs archived it
+    assert store.stats()['blobs'] == 4 and len(blob_files(tmp_path)) == 4
+    assert store.get('settlement/a.csv') == v2
+    assert store.get('settlement/a.csv', run_id=first) == v1
+    restored = store.restore('settlement/a.csv', str(tmp_path / 'restored' / 'a.csv'), run_id=second)
+    assert open(restored, 'rb').read() == v1
+    assert not os.path.exists(tmp_path / 'run' / 'settlement_a.csv')  # archived files are removed
+
+    v1_blob = store._blob_path(store.run_index(first)['settlement/a.csv'], 'gzip')
+    v1_size = os.path.getsize(v1_blob)
+    assert store.prune(keep_runs=1, max_age_days=0) == {'runs': 1, 'blobs': 1, 'bytes': v1_size}
+    # The second run only held files archived again later; the first still holds the only copy
+    # of only_first.csv, v1 of a.csv is no longer referenced
+    assert [run['run_id'] for run in store.runs()] == [first, third]
+    assert list(store.run_index(first)) == ['settlement/only_first.csv']
+    assert not os.path.exists(v1_blob)
+    assert set(store.run_index(third)) == {'settlement/a.csv', 'settlement/b.csv'}
+    assert store.stats()['blobs'] == 3 and len(blob_files(tmp_path)) == 3
+    assert store.get('settlement/only_first.csv') == b'DR-600\n'
+    with pytest.raises(KeyError):
+        store.get('settlement/a.csv', run_id=second)
+
+    # Recent runs are kept whatever their age
+    assert store.prune(keep_runs=5, max_age_days=0) == {'runs': 0, 'blobs': 0, 'bytes': 0}
+
+
+def test_plain_directory_is_imported_as_one_run(store, tmp_path):
+    folder = tmp_path / 'old_archive'
+    (folder / '2025_05').mkdir(parents=True)
+    (folder / '2025_05' / 'settlement_2025_05.csv').write_bytes(b'DR-621\n')
+    (folder / 'settlement_2025_04.csv').write_bytes(b'DR-600\n')
+
+    run_id = archive_store.import_directory(store, str(folder), 'settlement')
+    assert set(store.run_index(run_id)) == {'settlement/2025_05/settlement_2025_05.csv',
+                                            'settlement/settlement_2025_04.csv'}
+    assert store.get('settlement/2025_05/settlement_2025_05.csv') == b'DR-621\n'
+    assert os.path.exists(folder / 'settlement_2025_04.csv')
+    assert archive_store.import_directory(store, str(tmp_path / 'empty'), 'settlement') is None
@@ -0,0 +1,43 @@
+import logging
+
+import pytest
+
+import backfill
+import main
+from conftest import SettlementBrowser
+from utils import instrumentation, retry_mechanism, run_manifest
+
+
+@pytest.fixture
+def browsers(tmp_path, monkeypatch):
+    monkeypatch.setattr(instrumentation, 'METRICS_PATH', str(tmp_path / 'metrics.jsonl'))
+    monkeypatch.setattr(retry_mechanism.time, 'sleep', lambda seconds: None)
+    monkeypatch.setattr(retry_mechanism, '_breakers', {})
+    monkeypatch.setattr(retry_mechanism, '_budget', None)
+    monkeypatch.setattr(run_manifest, '_default_manifest', run_manifest.RunManifest(str(tmp_path / 'manifest.json')))
+    monkeypatch.setattr(main, 'SETTLEMENT_DIR', str(tmp_path / 'settlement'))
+    monkeypatch.setattr(main, 'OUTPUT_DIR', str(tmp_path / 'output'))
+    monkeypatch.setattr(main, 'POSTBACK_TIMEOUT', 0.1)
+    monkeypatch.setattr(main, 'DOWNLOAD_TIMEOUT', 0.1)
+
+    browsers = []
+
+    def new_driver():
+        browser = SettlementBrowser()
+        browser.empty_months.add((2025, 6))
+        browser.failing_months.add((2025, 5))
+        browsers.append(browser)
+        return browser
+
+    monkeypatch.setattr(backfill, 'new_driver', new_driver)
+    return browsers
+
+
+def test_failed_selenium_month_is_reported_as_failed_not_empty(browsers, caplog):
+    with caplog.at_level(logging.INFO):
+        results = backfill.backfill((2025, 4), (2025, 6), workers=1, engine='selenium', min_interval=0)
+
+    assert results == {(2025, 4): True, (2025, 5): None, (2025, 6): False}
+    assert 'Failed months: 2025-05' in caplog.text
+    # The browser of the failed month is replaced before the next month
+    assert len(browsers) == 2
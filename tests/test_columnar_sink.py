@@ -0,0 +1,85 @@
+import os
+import sys
+
+import pytest
+
+from utils import columnar_sink
+from utils.date_utils import NSE_DATE_FORMAT, PUBLISH_DATE_FORMAT
+
+pytest.importorskip('pyarrow')
+
+NSE_HEADERS = ['Settlement Type', 'Settlement No.', 'Settlement Date']
+BSE_HEADERS = ['Sr. No.', 'Trade Date', 'Settlement No.']
+
+
+def test_consolidated_datasets_are_kept_per_exchange_with_one_type_per_column(tmp_path):
+    base_dir = str(tmp_path)
+    columnar_sink.write_partition(BSE_HEADERS, [['1', '02-01-2025', '2526001']],
+                                  'BSE', 2025, 1, 'settlement', PUBLISH_DATE_FORMAT, base_dir=base_dir)
+    columnar_sink.write_partition(NSE_HEADERS, [['M', '2025001', '20-Jan-25']],
+                                  'NSE', 2025, 1, 'settlement_CIRC1_M_2025001', NSE_DATE_FORMAT, base_dir=base_dir)
+    columnar_sink.write_partition(NSE_HEADERS, [['M', '2025031', 'To be announced']],
+                                  'NSE', 2025, 2, 'settlement_CIRC2_M_2025031', NSE_DATE_FORMAT, base_dir=base_dir)
+    stale = os.path.join(base_dir, 'consolidated', 'settlement.parquet')
+    os.makedirs(os.path.dirname(stale))
+    open(stale, 'wb').close()
+
+    written = columnar_sink.build_consolidated(base_dir=base_dir)
+
+    assert sorted(os.path.basename(path) for path in written) == ['bse_settlement.parquet', 'nse_settlement.parquet']
+    assert not os.path.exists(stale)
+    bse = columnar_sink._read(os.path.join(base_dir, 'consolidated', 'bse_settlement.parquet'), 'parquet')
+    nse = columnar_sink._read(os.path.join(base_dir, 'consolidated', 'nse_settlement.parquet'), 'parquet')
+    assert bse.column_names == BSE_HEADERS + columnar_sink.PARTITION_COLUMNS
+    assert str(bse.schema.field('Trade Date').type) == 'date32[day]'
+    assert str(nse.schema.field('Settlement Date').type) == 'string'
+    assert nse.column('Settlement Date').to_pylist() == ['20-Jan-25', 'To be announced']
+
+
+def test_a_blank_first_value_does_not_make_a_date_column_a_string_one():
+    table = columnar_sink.typed_table(NSE_HEADERS, [['M', '2025001', ''], ['M', '2025002', '21-Jan-25']],
+                                      NSE_DATE_FORMAT)
+    assert str(table.schema.field('Settlement Date').type) == 'date32[day]'
+
+
+def test_rows_before_the_first_date_go_to_the_first_dated_partition(tmp_path):
+    rows = [['M', '2025000', ''], ['M', '2025001', '31-Jan-25'], ['M', '2025002', 'Holiday'],
+            ['M', '2025003', '03-Feb-25']]
+    paths = columnar_sink.write_partitions_by_date(NSE_HEADERS, rows, 'NSE', 'Settlement Date', 'settlement_CIRC',
+                                                   NSE_DATE_FORMAT, base_dir=str(tmp_path))
+    january, february = (columnar_sink._read(path, 'parquet') for path in paths)
+    assert january.column('Settlement No.').to_pylist() == ['2025000', '2025001', '2025002']
+    assert february.column('Settlement No.').to_pylist() == ['2025003']
+
+
+def test_unchanged_partitions_and_datasets_are_not_rewritten(tmp_path):
+    base_dir = str(tmp_path)
+
+    def write(rows):
+        return columnar_sink.write_partition(NSE_HEADERS, rows, 'NSE', 2025, 1, 'settlement_CIRC',
+                                             NSE_DATE_FORMAT, base_dir=base_dir)
+
+    partition = write([['M', '2025001', '20-Jan-25']])
+    (dataset,) = columnar_sink.build_consolidated(base_dir=base_dir)
+    written_at = os.stat(partition).st_mtime_ns, os.stat(dataset).st_mtime_ns
+
+    write([['M', '2025001', '20-Jan-25']])
+    columnar_sink.build_consolidated(base_dir=base_dir)
+    assert (os.stat(partition).st_mtime_ns, os.stat(dataset).st_mtime_ns) == written_at
+
+    write([['M', '2025001', '21-Jan-25']])
+    columnar_sink.build_consolidated(base_dir=base_dir)
+    assert columnar_sink._read(dataset, 'parquet').column('Settlement Date').to_pylist()[0].day == 21
+
+
+def test_missing_pyarrow_is_reported_once(monkeypatch, caplog, tmp_path):
+    for name in ('pa', 'pa_ipc', 'pq', 'pc'):
+        monkeypatch.setattr(columnar_sink, name, None)
+    monkeypatch.setattr(columnar_sink, '_pyarrow_checked', False)
+    monkeypatch.setitem(sys.modules, 'pyarrow', None)
+
+    assert not columnar_sink.is_enabled('parquet')
+    assert columnar_sink.write_partition(BSE_HEADERS, [['1', '02-01-2025', '2526001']], 'BSE', 2025, 1,
+                                         'settlement', PUBLISH_DATE_FORMAT, base_dir=str(tmp_path)) is None
+    assert [record.levelname for record in caplog.records] == ['WARNING']
+    assert 'pyarrow is not installed' in caplog.text
@@ -0,0 +1,80 @@
+import pytest
+
+from conftest import fixture_bytes
+from utils import instrumentation
+from utils.clean_csv import clean_csv_date_columns, convert_date_format
+from utils.csv_pipeline import process_settlement_file
+
+SAMPLE = 'settlement_2025_05.csv'  # a BSE export, with the '@' BSE appends to some dates
+CLEANED = 'settlement_2025_05_cleaned.csv'
+PUBLISHED = "publish_settlement_number_edis bse_cm '621-2025-2026' '05-05-2025'.csv"
+
+SETTLEMENT_CSV = """\
+Settlement No.,Sett.No.for Depository purpose,Trading Date.,Remarks,Pay-in/ Pay-out +
+DR-621/2025-2026,2526621,,Holiday,05/05/2025
+DR-622/2025-2026,2526622,05/05/2025,,06/05/2025
+
+Settle.No.,Trade Date,Pay-in /Pay-out Date
+DR-626/2025-2026,09/05/2025,13/05/2025
+"""
+
+
+def test_date_columns_are_those_where_a_value_was_converted(tmp_path):
+    (tmp_path / 'settlement').mkdir()
+    (tmp_path / 'settlement' / 'settlement_2025_05.csv').write_text(SETTLEMENT_CSV, encoding='utf-8')
+
+    date_columns = convert_date_format('settlement_2025_05.csv', str(tmp_path / 'settlement'), str(tmp_path / 'ready'))
+    # Trading Date. is blank in the first row, which the columns used to be inferred from
+    assert date_columns == {'Trading Date.', 'Pay-in/ Pay-out +', 'Trade Date', 'Pay-in /Pay-out Date'}
+    (published,) = (tmp_path / 'ready').iterdir()
+    assert published.name == "publish_settlement_number_edis bse_cm '621-2025-2026' '05-05-2025'.csv"
+
+
+@pytest.fixture
+def bse_sample(tmp_path, monkeypatch):
+    monkeypatch.setattr(instrumentation, 'METRICS_PATH', str(tmp_path / 'metrics.jsonl'))
+    for name in ('settlement', 'output'):
+        (tmp_path / name).mkdir()
+    (tmp_path / 'settlement' / SAMPLE).write_bytes(fixture_bytes('bse', SAMPLE))
+    return tmp_path
+
+
+def test_cleaning_and_conversion_match_the_baseline_output(bse_sample):
+    # The golden files were written by the implementation that read whole files into memory
+    clean_csv_date_columns(str(bse_sample / 'settlement'))
+    assert (bse_sample / 'settlement' / SAMPLE).read_bytes() == fixture_bytes('bse', 'golden', CLEANED)
+
+    convert_date_format(SAMPLE, str(bse_sample / 'settlement'), str(bse_sample / 'ready'))
+    assert [path.name for path in (bse_sample / 'ready').iterdir()] == [PUBLISHED]
+    assert (bse_sample / 'ready' / PUBLISHED).read_bytes() == fixture_bytes('bse', 'golden', PUBLISHED)
+
+
+def test_a_match_is_published_and_its_settlement_file_cleaned(bse_sample):
+    (bse_sample / 'output' / SAMPLE).write_bytes(fixture_bytes('bse', 'golden', CLEANED))
+
+    result = process_settlement_file(SAMPLE, str(bse_sample / 'settlement'), str(bse_sample / 'output'),
+                                     str(bse_sample / 'ready'))
+
+    assert result.matched and result.diff is None
+    assert result.anomaly_columns == {'Trading Date.', 'Pay-in/ Pay-out +'}
+    assert result.dest_path == str(bse_sample / 'ready' / PUBLISHED)
+    # The temporary file was renamed, not copied
+    assert [path.name for path in (bse_sample / 'ready').iterdir()] == [PUBLISHED]
+    assert (bse_sample / 'ready' / PUBLISHED).read_bytes() == fixture_bytes('bse', 'golden', PUBLISHED)
+    assert (bse_sample / 'settlement' / SAMPLE).read_bytes() == fixture_bytes('bse', 'golden', CLEANED)
+
+
+def test_a_mismatch_publishes_nothing_and_gets_a_keyed_diff(bse_sample):
+    cleaned = fixture_bytes('bse', 'golden', CLEANED).decode('utf-8')
+    (bse_sample / 'output' / SAMPLE).write_text(cleaned.replace('RA-630/2025-2026', 'RA-631/2025-2026'),
+                                                encoding='utf-8', newline='')
+
+    result = process_settlement_file(SAMPLE, str(bse_sample / 'settlement'), str(bse_sample / 'output'),
+                                     str(bse_sample / 'ready'))
+
+    assert not result.matched and result.dest_path is None
+    assert list((bse_sample / 'ready').iterdir()) == []
+    assert result.settlement_lines == result.output_lines
+    assert result.total_diffs == 1
+    (section,) = result.diff.sections
+    assert section.changed == {'DR-630/2025-2026': {'Auction Sett.No. +++': ['RA-630/2025-2026', 'RA-631/2025-2026']}}
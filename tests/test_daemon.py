@@ -0,0 +1,99 @@
+import json
+import urllib.error
+import urllib.request
+from datetime import datetime
+
+import pytest
+
+from utils import instrumentation, retry_mechanism
+from utils.daemon import CronSchedule, Daemon, Job
+
+
+@pytest.mark.parametrize('expression, moment, expected', [
+    # Steps, lists and ranges
+    ('*/15 * * * *', datetime(2025, 5, 15, 10, 7, 30), datetime(2025, 5, 15, 10, 15)),
+    ('*/15 * * * *', datetime(2025, 5, 15, 10, 45), datetime(2025, 5, 15, 11, 0)),
+    ('5,10 * * * *', datetime(2025, 5, 15, 10, 5), datetime(2025, 5, 15, 10, 10)),
+    ('0 9-17/4 * * *', datetime(2025, 5, 15, 13, 0), datetime(2025, 5, 15, 17, 0)),
+    ('0 9-17/4 * * *', datetime(2025, 5, 15, 17, 0), datetime(2025, 5, 16, 9, 0)),
+    ('30 6 * * 1-5', datetime(2025, 5, 16, 7, 0), datetime(2025, 5, 19, 6, 30)),
+    # Day and weekday both restricted: either one matches
+    ('0 0 1 * 1', datetime(2025, 5, 15, 12, 0), datetime(2025, 5, 19, 0, 0)),
+    ('0 0 1 * 1', datetime(2025, 5, 27, 12, 0), datetime(2025, 6, 1, 0, 0)),
+    # 7 and 0 are both Sunday
+    ('0 12 * * 7', datetime(2025, 5, 15, 12, 0), datetime(2025, 5, 18, 12, 0)),
+    ('0 12 * * 0', datetime(2025, 5, 15, 12, 0), datetime(2025, 5, 18, 12, 0)),
+    # Month and year rollover
+    ('59 23 31 * *', datetime(2025, 5, 31, 23, 59), datetime(2025, 7, 31, 23, 59)),
+    ('*/15 * * * *', datetime(2025, 12, 31, 23, 50), datetime(2026, 1, 1, 0, 0)),
+    ('0 0 1 1 *', datetime(2025, 5, 15, 12, 0), datetime(2026, 1, 1, 0, 0)),
+    ('0 0 29 2 *', datetime(2025, 3, 1, 0, 0), datetime(2028, 2, 29, 0, 0)),
+])
+def test_next_after(expression, moment, expected):
+    assert CronSchedule(expression).next_after(moment) == expected
+
+
+@pytest.mark.parametrize('expression', ['* * * *', '60 * * * *', '* 8-6 * * *', '*/0 * * * *', 'x * * * *'])
+def test_malformed_expressions_are_rejected(expression):
+    with pytest.raises(ValueError):
+        CronSchedule(expression)
+
+
+def test_expression_that_never_matches_is_an_error():
+    with pytest.raises(ValueError):
+        CronSchedule('0 0 30 2 *').next_after(datetime(2025, 5, 15))
+
+
+@pytest.fixture
+def daemon(tmp_path, monkeypatch):
+    monkeypatch.setattr(instrumentation, 'METRICS_PATH', str(tmp_path / 'metrics.jsonl'))
+    monkeypatch.setattr(retry_mechanism, '_breakers', {})
+    monkeypatch.setattr(retry_mechanism, '_budget', None)
+
+    def fail():
+        raise RuntimeError('Stages did not complete: scrape')
+
+    daemon = Daemon([Job('bse', '0 9 * * 1-5', lambda: None), Job('nse', '0 18 * * 1-5', fail)],
+                    host='127.0.0.1', port=0)
+    yield daemon
+    if daemon.server:
+        daemon.server.shutdown()
+        daemon.server.server_close()
+
+
+def get(daemon, path):
+    with urllib.request.urlopen(f"http://127.0.0.1:{daemon.port}{path}", timeout=5) as response:
+        return response.read().decode('utf-8')
+
+
+def test_failed_job_degrades_health(daemon):
+    bse, nse = daemon.jobs
+    daemon.run_job(bse)
+    assert daemon.health()['status'] == 'ok'
+
+    daemon.run_job(nse)
+    health = daemon.health()
+    assert health['status'] == 'degraded'
+    assert [(job['job'], job['runs'], job['failures'], job['last_status']) for job in health['jobs']] == [
+        ('bse', 1, 0, 'ok'), ('nse', 1, 1, 'failed')]
+    assert health['jobs'][1]['last_error'] == 'Stages did not complete: scrape'
+    assert health['jobs'][1]['last_success'] is None
+
+    daemon.run_job(nse)
+    assert daemon.jobs[1].failures == 2
+
+
+def test_health_and_metrics_endpoints(daemon):
+    daemon.run_job(daemon.jobs[1])
+    retry_mechanism.get_circuit_breaker('bse_http')
+    daemon.serve()
+
+    assert json.loads(get(daemon, '/health')) == json.loads(json.dumps(daemon.health()))
+    metrics = get(daemon, '/metrics').splitlines()
+    assert 'settlement_daemon_job_runs_total{job="bse"} 0' in metrics
+    assert 'settlement_daemon_job_failures_total{job="nse"} 1' in metrics
+    assert 'settlement_daemon_circuit_open{circuit="bse_http"} 0' in metrics
+    assert not any('job_last_success_timestamp_seconds{' in line for line in metrics)
+    with pytest.raises(urllib.error.HTTPError) as error:
+        get(daemon, '/status')
+    assert error.value.code == 404
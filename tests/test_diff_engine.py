@@ -0,0 +1,60 @@
+from utils.diff_engine import diff_tables, split_sections
+
+HEADER = ['Settlement No.', 'Trading Date.', 'Pay-in/ Pay-out +']
+TIMING = [['Settle.No.', 'Trade Date'], ['DR-626/2025-2026', '09/05/2025']]
+ROWS = [['DR-621/2025-2026', '02/05/2025', '05/05/2025'],
+        ['DR-622/2025-2026', '05/05/2025', '06/05/2025'],
+        ['DR-623/2025-2026', '06/05/2025', '07/05/2025']]
+
+
+def table(rows, timing=True):
+    return [HEADER] + rows + ([[]] + TIMING if timing else [])
+
+
+def test_sections_are_split_on_blank_rows():
+    assert split_sections(table(ROWS)) == [(HEADER, ROWS), tuple(TIMING[:1]) + (TIMING[1:],)]
+    assert split_sections([['', ''], HEADER, ['', '']]) == [(HEADER, [])]
+
+
+def test_reordered_rows_are_no_difference():
+    diff = diff_tables(table(ROWS), table(ROWS[::-1]), 'settlement_2025_05.csv')
+    assert diff.total_diffs == 0 and diff.sections == []
+
+
+def test_changed_cell_is_one_changed_key():
+    changed = [row[:] for row in ROWS]
+    changed[1][2] = '07/05/2025'
+    diff = diff_tables(table(ROWS), table(changed), 'settlement_2025_05.csv')
+
+    assert diff.total_diffs == 1
+    (section,) = diff.to_dict()['sections']
+    assert section == {'section': 0, 'key_column': 'Settlement No.', 'columns_only_in_settlement': [],
+                       'columns_only_in_output': [], 'rows_only_in_settlement': [], 'rows_only_in_output': [],
+                       'duplicate_keys': [], 'changed_duplicates': [], 'changed': {'DR-622/2025-2026': {'Pay-in/ Pay-out +': ['06/05/2025', '07/05/2025']}}}
+
+
+def test_inserted_row_and_renamed_column_do_not_shift_the_other_rows():
+    renamed = [HEADER[:2] + ['Pay-in/Pay-out']] + [ROWS[0], ['DR-621A/2025-2026', '02/05/2025', '05/05/2025']] + ROWS[1:]
+    (section,) = diff_tables(table(ROWS), renamed + [[]] + TIMING).sections
+    assert section.rows_only_in_output == ['DR-621A/2025-2026']
+    assert section.columns_only_in_settlement == ['Pay-in/ Pay-out +']
+    assert section.columns_only_in_output == ['Pay-in/Pay-out']
+    assert section.changed == {} and section.total_diffs == 3
+
+
+def test_duplicate_key_is_reported_and_its_repeated_rows_compared():
+    duplicated = ROWS + [['DR-622/2025-2026', '05/05/2025', '09/05/2025']]
+    (section,) = diff_tables(table(duplicated), table(ROWS)).sections
+    assert section.duplicate_keys == ['DR-622/2025-2026'] and section.changed_duplicates == ['DR-622/2025-2026']
+    assert section.changed == {} and section.total_diffs == 1
+
+    # The same repeated row in both files is reported but is no difference
+    (section,) = diff_tables(table(duplicated), table(ROWS[::-1] + duplicated[3:])).sections
+    assert section.duplicate_keys == ['DR-622/2025-2026'] and section.total_diffs == 0
+
+
+def test_missing_timing_section_is_one_difference():
+    diff = diff_tables(table(ROWS), table(ROWS, timing=False))
+    assert (diff.settlement_sections, diff.output_sections) == (2, 1)
+    assert diff.total_diffs == 1 and diff.sections == []
+    assert diff.to_dict()['settlement_sections'] == 2
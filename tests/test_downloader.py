@@ -0,0 +1,53 @@
+import json
+import hashlib
+
+from utils.downloader import create_pooled_session, download
+
+
+def leave_partial(dest_path, body, size):
+    with open(dest_path + '.part', 'wb') as f:
+        f.write(body[:size])
+    with open(dest_path + '.part.json', 'w', encoding='utf-8') as f:
+        json.dump({'etag': f'"{hashlib.sha256(body).hexdigest()[:16]}"', 'last_modified': None}, f)
+
+
+def test_body_is_stored_as_sent_without_content_coding(tmp_path, document_server):
+    body = b'%PDF-1.4 ' + bytes(range(256)) * 40
+    document_server.documents['/circular.pdf'] = body
+    document_server.gzip = True
+    dest_path = str(tmp_path / 'circular.pdf')
+
+    result = download(document_server.url('/circular.pdf'), dest_path, session=create_pooled_session())
+    with open(dest_path, 'rb') as f:
+        assert f.read() == body
+    assert result.sha256 == hashlib.sha256(body).hexdigest()
+    assert document_server.requests[-1][1]['Accept-Encoding'] == 'identity'
+
+
+def test_partial_answer_starting_elsewhere_restarts_from_zero(tmp_path, document_server):
+    body = bytes(range(256)) * 40
+    document_server.documents['/circular.pdf'] = body
+    document_server.range_shift = 10
+    dest_path = str(tmp_path / 'circular.pdf')
+    leave_partial(dest_path, body, 1000)
+
+    result = download(document_server.url('/circular.pdf'), dest_path, session=create_pooled_session())
+    with open(dest_path, 'rb') as f:
+        assert f.read() == body
+    assert result.size == len(body)
+    resumed, restarted = document_server.requests
+    assert resumed[1]['Range'] == 'bytes=1000-'
+    assert 'Range' not in restarted[1]
+
+
+def test_partial_answer_starting_at_the_offset_is_appended(tmp_path, document_server):
+    body = bytes(range(256)) * 40
+    document_server.documents['/circular.pdf'] = body
+    dest_path = str(tmp_path / 'circular.pdf')
+    leave_partial(dest_path, body, 1000)
+
+    result = download(document_server.url('/circular.pdf'), dest_path, session=create_pooled_session())
+    with open(dest_path, 'rb') as f:
+        assert f.read() == body
+    assert result.sha256 == hashlib.sha256(body).hexdigest()
+    assert len(document_server.requests) == 1
@@ -0,0 +1,108 @@
+import threading
+
+import pytest
+
+from utils import driver_pool
+from utils.driver_pool import DriverPool
+
+
+class FakeDriver:
+    def __init__(self):
+        self.alive = True
+        self.resettable = True
+        self.calls = []
+
+    def execute_script(self, script):
+        if not self.alive:
+            raise ConnectionError('chrome not reachable')
+        return 1
+
+    def delete_all_cookies(self):
+        if not self.resettable:
+            raise ConnectionError('chrome not reachable')
+        self.calls.append('delete_all_cookies')
+
+    def get(self, url):
+        self.calls.append(url)
+
+    def quit(self):
+        self.calls.append('quit')
+
+
+@pytest.fixture
+def started(monkeypatch):
+    started = []
+
+    def new_driver():
+        started.append(FakeDriver())
+        return started[-1]
+
+    monkeypatch.setattr(driver_pool, 'new_driver', new_driver)
+    return started
+
+
+def test_released_browser_is_reset_and_reused(started):
+    pool = DriverPool(size=1)
+    with pool.session() as driver:
+        pass
+    assert driver.calls == ['delete_all_cookies', 'about:blank']
+
+    with pool.session() as reused:
+        assert reused is driver
+    assert len(started) == 1
+
+
+def test_unhealthy_browser_is_quit_and_replaced(started):
+    pool = DriverPool(size=1)
+    with pool.session() as driver:
+        pass
+    driver.alive = False
+
+    with pool.session() as replacement:
+        assert replacement is not driver
+    assert driver.calls[-1] == 'quit'
+    assert len(started) == 2
+
+
+def test_browser_that_cannot_be_reset_is_discarded(started):
+    pool = DriverPool(size=1)
+    driver = pool.acquire()
+    driver.resettable = False
+    pool.release(driver)
+
+    assert driver.calls == ['quit']
+    assert pool.acquire() is not driver
+
+
+def test_failed_start_frees_its_slot(monkeypatch):
+    def new_driver():
+        raise RuntimeError('session not created')
+
+    monkeypatch.setattr(driver_pool, 'new_driver', new_driver)
+    pool = DriverPool(size=1)
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            pool.acquire()
+    assert pool._in_use == 0
+
+
+def test_threads_share_one_pool(monkeypatch):
+    monkeypatch.setattr(driver_pool, '_default_pool', None)
+    created = []
+    init = DriverPool.__init__
+
+    def slow_init(self, *args, **kwargs):
+        created.append(self)
+        threading.Event().wait(0.05)  # widen the window between the check and the assignment
+        init(self, *args, **kwargs)
+
+    monkeypatch.setattr(DriverPool, '__init__', slow_init)
+    pools = []
+    threads = [threading.Thread(target=lambda: pools.append(driver_pool.get_driver_pool())) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1
+    assert all(pool is pools[0] for pool in pools)
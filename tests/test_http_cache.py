@@ -0,0 +1,40 @@
+import os
+import json
+import hashlib
+
+from utils.http_cache import HttpCache
+
+
+def test_pinned_blobs_are_not_evicted_until_released(tmp_path, document_server):
+    for name in 'abc':
+        document_server.documents[f'/{name}.pdf'] = name.encode() * 100
+    cache = HttpCache(str(tmp_path), max_bytes=150)
+
+    a = cache.fetch(document_server.url('/a.pdf'), pin=True)
+    cache.fetch(document_server.url('/b.pdf'))
+    assert os.path.exists(a.path)
+    again = cache.fetch(document_server.url('/a.pdf'))
+    assert again.not_modified and again.path == a.path
+
+    cache.release(a.sha256)
+    cache.fetch(document_server.url('/c.pdf'))
+    assert not os.path.exists(a.path)
+
+
+def test_partial_body_left_by_an_interrupted_fetch_is_resumed(tmp_path, document_server):
+    body = bytes(range(256)) * 40
+    document_server.documents['/circular.pdf'] = body
+    url = document_server.url('/circular.pdf')
+    cache = HttpCache(str(tmp_path))
+
+    resume_path = cache._resume_path(url)
+    with open(resume_path + '.part', 'wb') as f:
+        f.write(body[:1000])
+    with open(resume_path + '.part.json', 'w', encoding='utf-8') as f:
+        json.dump({'etag': f'"{hashlib.sha256(body).hexdigest()[:16]}"', 'last_modified': None}, f)
+
+    entry = cache.fetch(url)
+    with open(entry.path, 'rb') as f:
+        assert f.read() == body
+    assert document_server.requests[-1][1]['Range'] == 'bytes=1000-'
+    assert not [name for name in os.listdir(cache.blob_dir) if '.download' in name]
@@ -0,0 +1,74 @@
+import os
+import re
+import csv
+
+import pytest
+import requests
+
+from conftest import REPO_DIR, CALENDAR_FIELD, GO_FIELD, DOWNLOAD_FIELD, fixture_bytes
+from utils.http_scraper import (PostbackForm, create_session, open_settlement_form, fetch_settlement_month,
+                                SETTLEMENT_CAL_ID)
+
+# The May 2025 tables as saved by the Selenium scraper
+SAMPLE_CSV = os.path.join(REPO_DIR, 'archive', 'settlement', 'settlement_2025_05.csv')
+
+
+def hidden_state(page):
+    html = fixture_bytes('bse', page).decode('utf-8')
+    return {name: re.search(rf'name="{name}" id="{name}" value="([^"]*)"', html).group(1)
+            for name in ('__VIEWSTATE', '__EVENTVALIDATION')}
+
+
+def test_month_fetch_carries_the_form_state_between_postbacks(bse_server):
+    session = create_session()
+    form = open_settlement_form(session, bse_server.url)
+    table_data, xls = fetch_settlement_month(form, 2025, 5)
+
+    calendar, go, download = bse_server.posts
+    assert {name: calendar[name] for name in hidden_state('setcal_initial.html')} == hidden_state('setcal_initial.html')
+    assert calendar['__EVENTTARGET'] == CALENDAR_FIELD
+    assert calendar[CALENDAR_FIELD] == '0'
+
+    assert {name: go[name] for name in hidden_state('setcal_calendar.html')} == hidden_state('setcal_calendar.html')
+    assert go['ctl00$ContentPlaceHolder1$ddlYear'] == '2025'
+    assert go['ctl00$ContentPlaceHolder1$ddlMonth'] == '05'
+    assert go[GO_FIELD] == 'Go'
+
+    assert {name: download[name] for name in hidden_state('setcal_2025_05.html')} == hidden_state('setcal_2025_05.html')
+    assert f'{DOWNLOAD_FIELD}.x' in download and f'{DOWNLOAD_FIELD}.y' in download
+    assert GO_FIELD not in download
+
+    with open(SAMPLE_CSV, 'r', encoding='utf-8', newline='') as f:
+        assert table_data == list(csv.reader(f))
+    assert xls == fixture_bytes('bse', 'settlement_2025_05.xls')
+
+
+def test_failed_autopostback_leaves_the_selection_to_retry(bse_server):
+    session = create_session()
+    form = PostbackForm(session, bse_server.url, session.get(bse_server.url).text)
+
+    bse_server.fail_next = 1
+    with pytest.raises(requests.HTTPError):
+        form.select(SETTLEMENT_CAL_ID, '0')
+    assert form.fields[CALENDAR_FIELD] == '1'
+
+    form.select(SETTLEMENT_CAL_ID, '0')
+    assert len(bse_server.posts) == 2
+    assert bse_server.posts[1]['__VIEWSTATE'] == hidden_state('setcal_initial.html')['__VIEWSTATE']
+    assert form.fields['__VIEWSTATE'] == hidden_state('setcal_calendar.html')['__VIEWSTATE']
+
+
+class CountingLimiter:
+    def __init__(self):
+        self.waits = 0
+
+    def wait(self):
+        self.waits += 1
+
+
+def test_rate_limiter_is_waited_for_before_every_request(bse_server):
+    limiter = CountingLimiter()
+    session = create_session(limiter)
+    form = open_settlement_form(session, bse_server.url)
+    fetch_settlement_month(form, 2025, 5)
+    assert limiter.waits == 1 + len(bse_server.posts) == 4
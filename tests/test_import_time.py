@@ -0,0 +1,27 @@
+import re
+import sys
+import subprocess
+
+import pytest
+
+from conftest import REPO_DIR
+from benchmarks.bench_import_time import BUDGET_MS, COMMAND_MODULES, HEAVY_MODULES, probe
+
+_IMPORTTIME_RE = re.compile(r'^import time:\s+\d+ \|\s+\d+ \|\s*([\w.]+)$')
+
+
+@pytest.mark.parametrize('command', sorted(COMMAND_MODULES))
+def test_sub_command_start_up_stays_light(command):
+    results = [probe(COMMAND_MODULES[command]) for _ in range(3)]
+    assert results[-1]['heavy'] == []
+    assert min(result['ms'] for result in results) <= BUDGET_MS
+
+
+@pytest.mark.parametrize('command', sorted(COMMAND_MODULES))
+def test_sub_command_help_imports_no_heavy_library(command, tmp_path):
+    # Run from a scratch directory: settings resolves its folders against the working directory
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', f'{REPO_DIR}/cli.py', command, '--help'],
+                            cwd=tmp_path, check=True, capture_output=True, text=True).stderr
+    imported = {match.group(1).split('.')[0] for match in map(_IMPORTTIME_RE.match, stderr.splitlines()) if match}
+    assert 'settings' in imported
+    assert imported.isdisjoint(HEAVY_MODULES)
@@ -0,0 +1,88 @@
+import os
+import sys
+import json
+import threading
+import subprocess
+import tracemalloc
+
+import pytest
+
+from utils import instrumentation
+
+
+@pytest.fixture
+def metrics_path(tmp_path, monkeypatch):
+    path = str(tmp_path / 'metrics.jsonl')
+    monkeypatch.setattr(instrumentation, 'METRICS_PATH', path)
+    return path
+
+
+def read_metrics(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_memory_tracing_stops_with_the_last_traced_stage(metrics_path, monkeypatch):
+    monkeypatch.setattr(instrumentation, 'METRICS_TRACE_MEMORY', True)
+    assert not tracemalloc.is_tracing()
+    with instrumentation.measure('outer'):
+        with instrumentation.measure('inner') as inner:
+            data = [bytes(1024) for _ in range(256)]
+            assert tracemalloc.is_tracing()
+        del data
+        assert tracemalloc.is_tracing()
+    assert not tracemalloc.is_tracing()
+
+    records = {record['stage']: record for record in read_metrics(metrics_path)}
+    assert inner.peak >= 256 * 1024
+    assert records['outer']['peak_mem_bytes'] >= records['inner']['peak_mem_bytes']
+
+
+def test_untraced_stages_leave_tracemalloc_off(metrics_path, monkeypatch):
+    monkeypatch.setattr(instrumentation, 'METRICS_TRACE_MEMORY', False)
+    with instrumentation.measure('stage'):
+        assert not tracemalloc.is_tracing()
+    assert read_metrics(metrics_path)[0]['peak_mem_bytes'] is None
+
+
+def test_stages_running_in_other_threads_are_flagged_as_overlapping(metrics_path):
+    started, release = threading.Event(), threading.Event()
+
+    def background():
+        with instrumentation.measure('background'):
+            started.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=background)
+    thread.start()
+    started.wait(5)
+    with instrumentation.measure('foreground'):
+        release.set()
+    thread.join()
+    with instrumentation.measure('alone'):
+        pass
+
+    records = {record['stage']: record for record in read_metrics(metrics_path)}
+    assert records['foreground']['overlapping'] == ['background']
+    assert records['background']['overlapping'] == ['foreground']
+    assert 'overlapping' not in records['alone']
+
+
+def test_worker_process_cpu_is_recorded_as_child_cpu(metrics_path):
+    with instrumentation.measure('pool'):
+        subprocess.run([sys.executable, '-c', 'sum(i * i for i in range(3_000_000))'], check=True)
+    record = read_metrics(metrics_path)[0]
+    if instrumentation.resource is None:
+        assert record['children_cpu_s'] is None
+    else:
+        assert record['children_cpu_s'] > record['cpu_s']
+
+
+def test_metrics_file_is_rotated_past_its_size_limit(metrics_path, monkeypatch):
+    monkeypatch.setattr(instrumentation, 'METRICS_MAX_BYTES', 1000)
+    for i in range(50):
+        instrumentation.write_metric({'stage': 'stage', 'index': i})
+
+    rotated, current = read_metrics(metrics_path + '.1'), read_metrics(metrics_path)
+    assert os.path.getsize(metrics_path + '.1') >= 1000 > os.path.getsize(metrics_path)
+    assert [record['index'] for record in rotated + current] == list(range(50))[-len(rotated + current):]
@@ -0,0 +1,46 @@
+import pytest
+
+from conftest import fixture_bytes
+from utils import nse_batch
+from utils.downloader import create_pooled_session
+
+ARCHIVE = 'https://nsearchives.nseindia.com/content/circulars'
+
+
+def test_circulars_are_discovered_on_an_html_index(document_server):
+    document_server.documents['/circulars'] = fixture_bytes('nse', 'circulars.html')
+    urls = nse_batch.discover_from_index(document_server.url('/circulars'), create_pooled_session())
+    assert urls == [document_server.url('/content/circulars/CMPT67120.pdf'), f'{ARCHIVE}/CMPT67098.pdf',
+                    document_server.url('/content/circulars/CMPT66953.pdf')]
+    assert [nse_batch.circular_name(url) for url in urls] == ['CMPT67120', 'CMPT67098', 'CMPT66953']
+
+
+def test_circulars_are_discovered_in_the_circulars_api_json(document_server):
+    document_server.documents['/api/circulars'] = fixture_bytes('nse', 'circulars.json')
+    urls = nse_batch.discover_from_index(document_server.url('/api/circulars'), create_pooled_session())
+    assert urls == [f'{ARCHIVE}/CMPT67120.pdf', f'{ARCHIVE}/CMPT66953.pdf']
+
+
+def test_configured_circulars_add_the_discovered_ones(document_server, monkeypatch):
+    document_server.documents['/api/circulars'] = fixture_bytes('nse', 'circulars.json')
+    monkeypatch.setattr(nse_batch, 'NSE_CIRCULARS', [f'{ARCHIVE}/CMPT66953.pdf'])
+    monkeypatch.setattr(nse_batch, 'NSE_CIRCULAR_INDEX_URL', document_server.url('/api/circulars'))
+    assert nse_batch.configured_circulars(create_pooled_session()) == [
+        f'{ARCHIVE}/CMPT66953.pdf', f'{ARCHIVE}/CMPT67120.pdf', f'{ARCHIVE}/CMPT66953.pdf']
+
+
+@pytest.mark.parametrize('pdf_workers, workers, expected', [(8, 4, 2), (8, 2, 4), (2, 4, 1)])
+def test_circulars_are_loaded_once_with_a_share_of_the_pdf_workers(monkeypatch, pdf_workers, workers, expected):
+    loaded = []
+
+    def load_pdf(url, name, session, workers):
+        loaded.append((name, workers))
+        return name != 'CMPT67098'
+
+    monkeypatch.setattr(nse_batch, 'PDF_WORKERS', pdf_workers)
+    monkeypatch.setattr(nse_batch, 'load_pdf', load_pdf)
+
+    results = nse_batch.load_circulars(['CMPT67120', f'{ARCHIVE}/CMPT67120.pdf', 'CMPT67098.pdf', 'CMPT66953',
+                                        'CMPT66953', 'CMPT67000'], workers=workers, session=object())
+    assert results == {'CMPT67120': True, 'CMPT67098': False, 'CMPT66953': True, 'CMPT67000': True}
+    assert sorted(loaded) == sorted((name, expected) for name in results)
@@ -0,0 +1,149 @@
+import io
+import os
+
+import pytest
+
+from benchmarks.synthetic_pdf import build_annexure_a_pdf, build_settlement_pdf
+from utils import instrumentation, pdf_extraction
+from utils.pdf_layout import LayoutCache
+from utils.date_utils import reformat_date, NSE_DATE_FORMAT, PUBLISH_DATE_FORMAT
+
+
+@pytest.fixture
+def outbound(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(instrumentation, 'METRICS_PATH', str(tmp_path / 'metrics.jsonl'))
+    monkeypatch.setattr(pdf_extraction, 'write_partitions_by_date', lambda *args, **kwargs: None)
+    return tmp_path / pdf_extraction.PDF_OUTBOUND_FOLDER
+
+
+def written_files(folder):
+    files = {}
+    for name in sorted(os.listdir(folder)):
+        if name != pdf_extraction.PDF_CATALOG_NAME:
+            with open(os.path.join(folder, name), 'r', encoding='utf-8') as f:
+                files[name] = f.read()
+    return files
+
+
+def baseline_files(pdf_bytes, pdf_file_name):
+    """
+    The Annexure A handling of extract_pdf_data before the cached layouts, kept verbatim as the
+    reference: full-page text, the table finder, and the column surgery on its output.
+    """
+    import pandas as pd
+    import pdfplumber
+
+    files = {}
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        for page in pdf.pages[1:]:
+            is_annexure_a = "Annexure 'A'" in (page.extract_text() or '')
+            for table in page.extract_tables():
+                if len(table) < 4:
+                    continue
+                header = [(col or '').replace('\n', ' ').strip() for col in table[2]]
+                if is_annexure_a:
+                    header = [item for item in header if item != '']
+                    table[-1][0], table[-1][1] = table[-1][1], None
+                data_rows = []
+                for row in table[3:]:
+                    if not any(row):
+                        continue
+                    if is_annexure_a:
+                        clean_row = [row[0]]
+                        rest = [x for x in row[1:] if x and str(x).strip()]
+                        clean_row.extend(rest[:5])
+                        row = clean_row
+                    row = row[:len(header)]
+                    data_rows.append(row)
+                df = pd.DataFrame(data_rows, columns=header)
+                if is_annexure_a:
+                    df = df.dropna(axis=1, how='all')
+
+                last_value = str(df.iloc[-1, -1]).strip()
+                exempt = str(df.iloc[-1, 0]).strip()
+                if last_value is None or last_value == 'None':
+                    df = df.iloc[:-1]
+                    files[f"{pdf_file_name}_{table[0][0]}_exempt.txt"] = exempt
+
+                first_row = df.iloc[0]
+                formatted_date = reformat_date(str(first_row['Settlement Date']), NSE_DATE_FORMAT, PUBLISH_DATE_FORMAT)
+                name = (f"publish_settlement_number_edis nse_cm '{first_row['Settlement No.']}' "
+                        f"'{formatted_date}' '{first_row[df.columns[0]]}'.csv")
+                files[name] = df.to_csv(index=False)
+    return files
+
+
+def extract_files(pdf_bytes, folder, layout_cache=None):
+    for name in os.listdir(folder) if os.path.isdir(folder) else []:
+        os.remove(os.path.join(folder, name))
+    assert pdf_extraction.extract_pdf_data(io.BytesIO(pdf_bytes), 'CIRC', workers=1,
+                                           layout_cache=layout_cache or LayoutCache(None)) is not None
+    return written_files(folder)
+
+
+def test_annexure_a_layout_and_table_finder_match_the_baseline(outbound, monkeypatch):
+    pdf_bytes = build_annexure_a_pdf(rows_per_page=6)
+    expected = baseline_files(pdf_bytes, 'CIRC')
+    assert sorted(name.rsplit('.', 1)[-1] for name in expected) == ['csv', 'txt']
+
+    monkeypatch.setattr(pdf_extraction, 'PDF_LAYOUT_EXTRACTION', False)
+    assert extract_files(pdf_bytes, outbound / 'CIRC') == expected
+
+    monkeypatch.setattr(pdf_extraction, 'PDF_LAYOUT_EXTRACTION', True)
+    layout_cache = LayoutCache(None)
+    assert extract_files(pdf_bytes, outbound / 'CIRC', layout_cache) == expected  # layout learned
+    assert 'A' in layout_cache.layouts()
+    assert extract_files(pdf_bytes, outbound / 'CIRC', layout_cache) == expected  # layout cached
+
+
+def test_annexure_a_without_a_note_keeps_its_last_settlement_row(outbound, monkeypatch):
+    pdf_bytes = build_annexure_a_pdf(rows_per_page=6, note=False)
+
+    monkeypatch.setattr(pdf_extraction, 'PDF_LAYOUT_EXTRACTION', False)
+    files = extract_files(pdf_bytes, outbound / 'CIRC')
+    monkeypatch.setattr(pdf_extraction, 'PDF_LAYOUT_EXTRACTION', True)
+    assert extract_files(pdf_bytes, outbound / 'CIRC') == files
+
+    (csv,) = files.values()
+    assert len(files) == 1 and len(csv.splitlines()) == 1 + 6
+    # The baseline always moved the second cell of the last row into the first one, turning
+    # the last settlement row into an exemption note
+    assert any(name.endswith('_exempt.txt') for name in baseline_files(pdf_bytes, 'CIRC'))
+
+
+def test_layout_path_keeps_the_merged_note_cell_where_the_table_finder_puts_it():
+    import pdfplumber
+    from utils.pdf_layout import learn_layout, extract_with_layout
+
+    with pdfplumber.open(io.BytesIO(build_annexure_a_pdf(rows_per_page=4))) as pdf:
+        page = pdf.pages[1]
+        layout = learn_layout(page)
+        table = extract_with_layout(page, layout)
+    assert layout['header'] == ['Settlement Type', 'Settlement No.', 'Trade Start Date', 'Trade End Date',
+                                'Custodial Confirmation Date', 'Settlement Date']
+    assert table[-1] == ['', 'Auction of shortages will be conducted in the next settlement', None, None, None, None]
+    assert all(value for row in table[3:-1] for value in row)
+
+
+def test_annexure_a_columns_empty_in_every_row_are_dropped():
+    table = [["Annexure 'A'", '', '', None], ['Schedule', '', '', None],
+             ['Settlement Type', 'Settlement No.', 'Remarks', None],
+             ['M', '', '2025001', ''], ['M', '2025002', None, '']]
+    assert pdf_extraction._fold_annexure_a(table)[2:] == [['Settlement Type', 'Settlement No.'],
+                                                          ['M', '2025001'], ['M', '2025002']]
+
+
+def test_parallel_extraction_returns_the_serial_rows():
+    pdf_bytes = build_settlement_pdf(pdf_extraction.PDF_PARALLEL_MIN_PAGES + 2)
+
+    def tables(workers, layouts):
+        return [(page_index, page_tables)
+                for page_index, page_tables, _ in pdf_extraction._extract_pages(io.BytesIO(pdf_bytes), workers, layouts)]
+
+    # Table finder, then the layouts it learned
+    serial = pdf_extraction._extract_pages(io.BytesIO(pdf_bytes), 1, {})
+    layouts = dict(learned for _, _, learned in serial if learned)
+    assert layouts
+    assert tables(2, {}) == [(page_index, page_tables) for page_index, page_tables, _ in serial]
+    assert tables(2, layouts) == tables(1, layouts)
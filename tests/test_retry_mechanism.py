@@ -0,0 +1,83 @@
+import pytest
+
+from conftest import fixture_bytes
+from settings import RETRY_MAX_ATTEMPTS
+from utils import retry_mechanism
+from utils.retry_mechanism import RetryBudget, CircuitBreaker, CircuitOpenError, run_with_retries
+from utils.http_scraper import fetch_settlement_month
+
+
+@pytest.fixture(autouse=True)
+def fresh_retry_state(monkeypatch):
+    monkeypatch.setattr(retry_mechanism.time, 'sleep', lambda seconds: None)
+    monkeypatch.setattr(retry_mechanism, '_breakers', {})
+    monkeypatch.setattr(retry_mechanism, '_budget', None)
+
+
+class FlakyDownloadForm:
+    """A settlement form whose month page loads but whose download always drops the connection."""
+
+    def __init__(self):
+        self.downloads = 0
+
+    def select(self, element_id, value):
+        pass
+
+    def submit(self, element_id):
+        return fixture_bytes('bse', 'setcal_2025_05.html').decode('utf-8')
+
+    def download(self, element_id):
+        self.downloads += 1
+        raise ConnectionError('connection reset')
+
+
+def test_month_download_is_retried_at_one_layer_only():
+    form = FlakyDownloadForm()
+    with pytest.raises(ConnectionError):
+        fetch_settlement_month(form, 2025, 5)
+    assert form.downloads == RETRY_MAX_ATTEMPTS
+
+
+def test_run_with_retries_takes_its_retries_from_the_budget():
+    calls = []
+
+    def fail():
+        calls.append(1)
+        raise RuntimeError('failed')
+
+    budget = RetryBudget(1)
+    assert not run_with_retries(fail, max_retries=5, budget=budget)
+    assert len(calls) == 2 and budget.remaining == 0
+
+
+def test_half_open_circuit_lets_one_trial_call_through():
+    breaker = CircuitBreaker('target', failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == 'half_open'
+
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_failure()  # the trial failed: the circuit stays open for another period
+
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == 'closed'
+    breaker.before_call()
+    breaker.before_call()
+
+
+def test_non_retryable_trial_failure_hands_the_trial_to_the_next_caller(monkeypatch):
+    breaker = retry_mechanism.get_circuit_breaker('target')
+    monkeypatch.setattr(breaker, 'reset_timeout', 0)
+    monkeypatch.setattr(breaker, 'opened_at', 0)
+
+    def invalid():
+        raise ValueError('bad month')
+
+    with pytest.raises(ValueError):
+        retry_mechanism.call_with_retry(invalid, circuit='target')
+    assert retry_mechanism.call_with_retry(lambda: 'ok', circuit='target') == 'ok'
+    assert breaker.state == 'closed'
@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+import main
+from conftest import DOWNLOAD_FIELD
+from utils import instrumentation, retry_mechanism, run_manifest
+from utils.http_scraper import create_session, open_settlement_form
+from utils.run_manifest import STAGES, RunManifest
+
+
+@pytest.fixture
+def manifest(tmp_path, monkeypatch):
+    manifest = RunManifest(str(tmp_path / 'manifest.json'))
+    monkeypatch.setattr(instrumentation, 'METRICS_PATH', str(tmp_path / 'metrics.jsonl'))
+    monkeypatch.setattr(retry_mechanism, '_breakers', {})
+    monkeypatch.setattr(retry_mechanism, '_budget', None)
+    monkeypatch.setattr(run_manifest, '_default_manifest', manifest)
+    monkeypatch.setattr(main, 'SETTLEMENT_DIR', str(tmp_path / 'settlement'))
+    monkeypatch.setattr(main, 'OUTPUT_DIR', str(tmp_path / 'output'))
+    return manifest
+
+
+def scrape_may(bse_server):
+    """Scrapes 2025-05 from the stand-in and returns the number of XLS downloads it took."""
+    downloads = sum(f'{DOWNLOAD_FIELD}.x' in form for form in bse_server.posts)
+    form = open_settlement_form(create_session(), bse_server.url)
+    assert main.scrape_month_http(form, 2025, 5) is True
+    return sum(f'{DOWNLOAD_FIELD}.x' in form for form in bse_server.posts) - downloads
+
+
+def test_stages_are_ordered(manifest, tmp_path):
+    assert STAGES == ['scraped', 'converted', 'published', 'archived']
+    output = tmp_path / 'settlement_2025_05.csv'
+    output.write_text('Settlement No.\n', encoding='utf-8')
+    manifest.record('months', '2025-05', 'converted', source_hash='abc', outputs=[str(output)])
+
+    assert manifest.is_current('months', '2025-05', 'abc', 'scraped')
+    assert manifest.is_current('months', '2025-05', 'abc', 'converted')
+    assert not manifest.is_current('months', '2025-05', 'abc', 'published')
+    assert not manifest.is_current('months', '2025-05', 'def', 'scraped')
+    assert manifest.outputs_intact('months', '2025-05')
+
+    output.write_text('Settle.No.\n', encoding='utf-8')
+    assert not manifest.outputs_intact('months', '2025-05')
+    # A reloaded manifest sees the same entry
+    assert RunManifest(manifest.path).get('months', '2025-05')['stage'] == 'converted'
+
+
+def test_month_with_missing_outputs_is_scraped_again(manifest, bse_server, tmp_path):
+    assert scrape_may(bse_server) == 1
+    assert manifest.get('months', '2025-05')['stage'] == 'scraped'
+    assert manifest.outputs_intact('months', '2025-05')
+    assert scrape_may(bse_server) == 0
+
+    os.remove(tmp_path / 'output' / 'settlement_2025_05.xls')
+    assert not manifest.outputs_intact('months', '2025-05')
+    assert scrape_may(bse_server) == 1
+    assert os.path.exists(tmp_path / 'output' / 'settlement_2025_05.xls')
+    assert manifest.outputs_intact('months', '2025-05')
+
+
+def test_archived_month_is_skipped(manifest, bse_server, tmp_path):
+    scrape_may(bse_server)
+    manifest.record('months', '2025-05', 'archived')
+    # Archiving moved the files away, and the month is not fetched again for them
+    for name in ('settlement', 'output'):
+        for filename in os.listdir(tmp_path / name):
+            os.remove(tmp_path / name / filename)
+
+    assert scrape_may(bse_server) == 0
+    assert manifest.get('months', '2025-05')['stage'] == 'archived'
+    assert os.listdir(tmp_path / 'output') == []
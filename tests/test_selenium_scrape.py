@@ -0,0 +1,61 @@
+import os
+import types
+import contextlib
+
+import pytest
+
+import main
+from conftest import SettlementBrowser
+from settings import RETRY_MAX_ATTEMPTS
+from utils import instrumentation, retry_mechanism, run_manifest
+
+URL = 'https://www.bseindia.com/markets/equity/EQReports/setcal.aspx'
+
+
+@pytest.fixture
+def browser(tmp_path, monkeypatch):
+    monkeypatch.setattr(instrumentation, 'METRICS_PATH', str(tmp_path / 'metrics.jsonl'))
+    monkeypatch.setattr(retry_mechanism.time, 'sleep', lambda seconds: None)
+    monkeypatch.setattr(retry_mechanism, '_breakers', {})
+    monkeypatch.setattr(retry_mechanism, '_budget', None)
+    monkeypatch.setattr(run_manifest, '_default_manifest', run_manifest.RunManifest(str(tmp_path / 'manifest.json')))
+    monkeypatch.setattr(main, 'SETTLEMENT_DIR', str(tmp_path / 'settlement'))
+    monkeypatch.setattr(main, 'OUTPUT_DIR', str(tmp_path / 'output'))
+    monkeypatch.setattr(main, 'POSTBACK_TIMEOUT', 0.1)
+    monkeypatch.setattr(main, 'DOWNLOAD_TIMEOUT', 0.1)
+    browser = SettlementBrowser()
+    main.open_settlement_page(browser, URL)
+    return browser
+
+
+def test_month_is_saved(browser, tmp_path):
+    assert main.scrape_month_selenium(browser, 2025, 5) is True
+    assert os.path.exists(tmp_path / 'settlement' / 'settlement_2025_05.csv')
+    assert os.listdir(tmp_path / 'output') == ['settlement_2025_05.xls']
+
+
+def test_month_without_settlement_table_has_no_data(browser):
+    browser.empty_months.add((2025, 6))
+    assert main.scrape_month_selenium(browser, 2025, 6) is False
+    assert browser.go_clicks[(2025, 6)] == 1
+
+
+def test_failed_download_is_retried_and_raised(browser, tmp_path):
+    browser.failing_months.add((2025, 5))
+    with pytest.raises(TimeoutError):
+        main.scrape_month_selenium(browser, 2025, 5)
+    assert browser.go_clicks[(2025, 5)] == RETRY_MAX_ATTEMPTS
+    assert retry_mechanism.get_circuit_breaker('bse_selenium').failures == RETRY_MAX_ATTEMPTS
+    assert not os.path.exists(tmp_path / 'settlement')
+
+
+def test_open_http_circuit_does_not_stop_the_selenium_fallback(browser, bse_server, monkeypatch):
+    monkeypatch.setattr(main, 'SCRAPE_ENGINE', 'http')
+    monkeypatch.setattr(main, 'get_driver_pool', lambda: types.SimpleNamespace(session=lambda: contextlib.nullcontext(browser)))
+    bse_server.fail_next = 100
+
+    # Each run fails the HTTP engine RETRY_MAX_ATTEMPTS times, until its circuit opens
+    for _ in range(2):
+        main.run_scrape(bse_server.url, 2025, 5)
+    assert retry_mechanism.get_circuit_breaker('bse_http').state == 'open'
+    assert browser.go_clicks == {(2025, 5): 2, (2025, 6): 2}
@@ -0,0 +1,78 @@
+import os
+
+import pytest
+
+from utils.settlement_index import SettlementIndex
+
+BSE_HEADER = 'Settlement No.,Sett.No.for Depository purpose,Trading Date.,Entry of 6A/7A data by members.,' \
+             'Confirmation of 6A/7A Data,Pay-in/ Pay-out +\n'
+NSE_HEADER = 'Settlement Type,Settlement No.,Trade Start Date,Trade End Date,Custodial Confirmation Date,Settlement Date\n'
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(text)
+
+
+@pytest.fixture
+def folders(tmp_path):
+    bse, nse = tmp_path / 'BSE', tmp_path / 'NSE'
+    write(str(bse / 'dr621.csv'), BSE_HEADER + 'DR-621/2025-2026,2526621,02-05-2025,02-05-2025,05-05-2025,05-05-2025\n')
+    write(str(bse / 'dr622.csv'), BSE_HEADER + 'DR-622/2025-2026,2526622,05-05-2025,05-05-2025,06-05-2025,06-05-2025\n'
+                                             '\nSettle.No.,Trade Date,Pay-in /Pay-out Date\n'
+                                             'DR-626/2025-2026,09-05-2025,13-05-2025\n')
+    write(str(nse / 'CMPT66953' / 'M_2025085.csv'), NSE_HEADER + 'M,2025085,02-05-2025,05-05-2025,06-05-2025,06-05-2025\n')
+    return [('BSE', str(bse)), ('NSE', str(nse))]
+
+
+def numbers(records):
+    return [record['settlement_no'] for record in records]
+
+
+def test_lookups_by_trading_date_and_settlement_number(tmp_path, folders):
+    index = SettlementIndex(str(tmp_path / 'index.sqlite3'))
+    assert index.update(folders) == {'indexed': 3, 'unchanged': 0, 'removed': 0, 'rows': 3}
+
+    # 2025085 trades from 2 to 5 May; the timing table of dr622.csv is not indexed
+    assert numbers(index.by_trading_date('2025-05-03')) == ['2025085']
+    assert numbers(index.by_trading_date('05/05/2025')) == ['DR-622/2025-2026', '2025085']
+    assert numbers(index.by_trading_date('2025-05-05', exchange='NSE')) == ['2025085']
+    assert index.by_trading_date('2025-05-09') == []
+    (record,) = index.by_settlement_no('DR-621/2025-2026')
+    assert record == {'exchange': 'BSE', 'settlement_type': 'DR', 'settlement_no': 'DR-621/2025-2026',
+                      'trade_start': '2025-05-02', 'trade_end': '2025-05-02', 'pay_in_out': '2025-05-05',
+                      'auction_settlement_no': None, 'auction_offer_date': None, 'auction_pay_in_out': None}
+    assert numbers(index.by_settlement_no('2025085', settlement_type='M')) == ['2025085']
+    with pytest.raises(ValueError):
+        index.by_trading_date('not a date')
+    index.close()
+
+
+def test_update_reindexes_changed_files_and_drops_removed_ones(tmp_path, folders):
+    index = SettlementIndex(str(tmp_path / 'index.sqlite3'))
+    index.update(folders)
+
+    # Touched but identical: the hash matches, nothing is read again
+    path = str(tmp_path / 'BSE' / 'dr621.csv')
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert index.update(folders) == {'indexed': 0, 'unchanged': 3, 'removed': 0, 'rows': 0}
+
+    write(path, BSE_HEADER + 'DR-621/2025-2026,2526621,06-05-2025,06-05-2025,07-05-2025,07-05-2025\n')
+    os.remove(str(tmp_path / 'NSE' / 'CMPT66953' / 'M_2025085.csv'))
+    assert index.update(folders) == {'indexed': 1, 'unchanged': 1, 'removed': 1, 'rows': 1}
+
+    assert index.by_trading_date('2025-05-02') == []
+    assert numbers(index.by_trading_date('2025-05-06')) == ['DR-621/2025-2026']
+    assert index.by_settlement_no('2025085') == []
+    # The settlements and trading days of the removed file went with it
+    conn = index._conn
+    assert conn.execute('SELECT COUNT(*) FROM settlements').fetchone()[0] == 2
+    assert conn.execute('SELECT COUNT(*) FROM trading_days').fetchone()[0] == 2
+    index.close()
+
+    # The index persists: reopened, nothing needs indexing
+    reopened = SettlementIndex(str(tmp_path / 'index.sqlite3'))
+    assert reopened.update(folders) == {'indexed': 0, 'unchanged': 2, 'removed': 0, 'rows': 0}
+    reopened.close()
@@ -0,0 +1,21 @@
+import pytest
+
+from utils import table_parser
+
+NESTED = """<html><body>
+<table id="outer"><tr><th>A</th><th>B</th></tr>
+<tr><td>1</td><td><table id="inner"><tr><th>x</th></tr><tr><td>2</td></tr></table></td></tr></table>
+<table id="second"><tr><th>C</th></tr><tr><td>3</td></tr></table>
+</body></html>"""
+
+
+@pytest.mark.parametrize('parser', ['lxml', 'bs4'])
+def test_tables_taken_by_position_are_the_outermost_ones(monkeypatch, parser):
+    if parser == 'bs4':
+        monkeypatch.setattr(table_parser, 'etree', None)
+    elif table_parser.etree is None:
+        pytest.skip('lxml is not installed')
+
+    tables = table_parser.extract_tables(NESTED, limit=2)
+    assert [table_id for table_id, _ in tables] == ['outer', 'second']
+    assert tables[1][1] == [['C'], ['3']]
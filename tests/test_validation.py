@@ -0,0 +1,67 @@
+import csv
+import json
+
+import pytest
+
+from utils import columnar_sink, instrumentation, validation
+from utils.run_manifest import RunManifest
+
+SETTLEMENT_CSV = """\
+Settlement No.,Sett.No.for Depository purpose,Trading Date.,Remarks,Pay-in/ Pay-out +
+DR-621/2025-2026,2526621,02/05/2025,,05/05/2025
+DR-622/2025-2026,2526622,05/05/2025,,06/05/2025
+
+Settle.No.,Trade Date,Pay-in /Pay-out Date
+DR-626/2025-2026,09/05/2025,13/05/2025
+"""
+
+
+@pytest.fixture
+def folders(tmp_path, monkeypatch):
+    monkeypatch.setattr(instrumentation, 'METRICS_PATH', str(tmp_path / 'metrics.jsonl'))
+    monkeypatch.setattr(validation, 'write_published_csv',
+                        lambda *args: columnar_sink.write_published_csv(*args, base_dir=str(tmp_path / 'columnar')))
+    for name in ('settlement', 'output'):
+        (tmp_path / name).mkdir()
+    return tmp_path
+
+
+def test_matching_files_are_published_and_mismatches_reported(folders):
+    (folders / 'settlement' / 'settlement_2025_05.csv').write_text(SETTLEMENT_CSV, encoding='utf-8')
+    (folders / 'output' / 'settlement_2025_05.csv').write_text(SETTLEMENT_CSV, encoding='utf-8')
+    (folders / 'settlement' / 'settlement_2025_06.csv').write_text(SETTLEMENT_CSV, encoding='utf-8')
+    (folders / 'output' / 'settlement_2025_06.csv').write_text(
+        SETTLEMENT_CSV.replace('2526622', '2526699'), encoding='utf-8')
+    manifest = RunManifest(str(folders / 'run_manifest.json'))
+    for key in ('2025-05', '2025-06'):
+        manifest.record('months', key, 'converted', source_hash=key)
+
+    mismatches = validation.compare_folders(str(folders / 'output'), str(folders / 'settlement'), manifest,
+                                            workers=1, report_dir=str(folders / 'reports'),
+                                            dest_folder=str(folders / 'ready'))
+
+    assert mismatches == 1
+    (published,) = (folders / 'ready').iterdir()
+    assert published.name == "publish_settlement_number_edis bse_cm '621-2025-2026' '05-05-2025'.csv"
+    assert '02-05-2025' in published.read_text(encoding='utf-8')
+
+    report = json.loads((folders / 'reports' / 'validation_report.json').read_text(encoding='utf-8'))
+    assert (report['matches'], report['mismatches'], report['unique_files']) == (1, 1, 0)
+    matched, mismatched = report['files']
+    assert (matched['filename'], matched['status'], matched['dest_path']) == \
+        ('settlement_2025_05.csv', 'match', str(published))
+    assert (mismatched['filename'], mismatched['status'], mismatched['total_diffs']) == \
+        ('settlement_2025_06.csv', 'mismatch', 1)
+    assert mismatched['diff']['sections'][0]['changed'] == {
+        'DR-622/2025-2026': {'Sett.No.for Depository purpose': ['2526622', '2526699']}}
+
+    with open(folders / 'reports' / 'validation_report.csv', newline='', encoding='utf-8') as f:
+        lines = list(csv.DictReader(f))
+    assert [(line['filename'], line['status'], line['total_diffs']) for line in lines] == [
+        ('settlement_2025_05.csv', 'match', '0'), ('settlement_2025_06.csv', 'mismatch', '1')]
+
+    published_month = manifest.get('months', '2025-05')
+    assert published_month['stage'] == 'published'
+    assert str(published) in published_month['outputs']
+    assert manifest.outputs_intact('months', '2025-05')
+    assert manifest.get('months', '2025-06')['stage'] == 'converted'
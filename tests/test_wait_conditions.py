@@ -0,0 +1,49 @@
+import os
+import threading
+import time
+
+from utils.wait_conditions import wait_for_download
+
+FILENAME = 'SettlementCalendar052025.xls'
+CHUNKS = [b'<table>', b'<tr><td>DR-621/2025-2026</td></tr>' * 50, b'</table>']
+
+
+def chrome_download(directory, finished):
+    """Downloads like Chrome: an empty placeholder, the body growing in a .crdownload partial, then a rename."""
+    path = os.path.join(directory, FILENAME)
+    open(path, 'wb').close()
+    with open(path + '.crdownload', 'wb') as f:
+        for chunk in CHUNKS:
+            f.write(chunk)
+            f.flush()
+            time.sleep(0.05)
+    os.replace(path + '.crdownload', path)
+    finished.set()
+
+
+def test_download_is_complete_once_the_partial_is_renamed(tmp_path):
+    finished = threading.Event()
+    download = threading.Thread(target=chrome_download, args=(str(tmp_path), finished))
+    download.start()
+    try:
+        path = wait_for_download(str(tmp_path), FILENAME, timeout=5, poll_interval=0.01)
+        renamed = finished.is_set()
+        with open(path, 'rb') as f:
+            body = f.read()
+    finally:
+        download.join()
+
+    assert path == str(tmp_path / FILENAME)
+    assert renamed
+    assert body == b''.join(CHUNKS)
+
+
+def test_download_left_partial_times_out(tmp_path):
+    (tmp_path / FILENAME).write_bytes(b'')
+    (tmp_path / (FILENAME + '.crdownload')).write_bytes(CHUNKS[0])
+
+    assert wait_for_download(str(tmp_path), FILENAME, timeout=0.1, poll_interval=0.01) is None
+
+
+def test_missing_download_times_out(tmp_path):
+    assert wait_for_download(str(tmp_path), FILENAME, timeout=0.1, poll_interval=0.01) is None
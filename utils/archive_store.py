@@ -0,0 +1,303 @@
+import os
+import gzip
+import json
+import time
+import shutil
+import sqlite3
+import logging
+import argparse
+import threading
+from settings import (ARCHIVE_DIR, ARCHIVE_INDEX_PATH, ARCHIVE_COMPRESSION, ARCHIVE_KEEP_RUNS,
+                      ARCHIVE_MAX_AGE_DAYS)
+from utils.run_manifest import file_sha256
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional, blobs are gzip-compressed without it
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Codec -> blob file extension
+_EXTENSIONS = {'zstd': '.zst', 'gzip': '.gz'}
+_ZSTD_LEVEL = 10
+_GZIP_LEVEL = 9
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    stored_size INTEGER NOT NULL,
+    codec TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    run_id TEXT NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    sha256 TEXT NOT NULL REFERENCES blobs(sha256),
+    PRIMARY KEY (run_id, name)
+);
+CREATE INDEX IF NOT EXISTS idx_entries_name ON entries(name);
+CREATE INDEX IF NOT EXISTS idx_entries_sha256 ON entries(sha256);
+"""
+
+
+def _open_blob(path, codec, mode):
+    if codec == 'gzip':
+        return gzip.open(path, mode, compresslevel=_GZIP_LEVEL) if 'w' in mode else gzip.open(path, mode)
+    if zstandard is None:
+        raise RuntimeError(f"{path} is zstd-compressed and zstandard is not installed: install it "
+                           f"(pip install -r requirements.txt) to read blobs archived with zstd")
+    return zstandard.open(path, mode, cctx=zstandard.ZstdCompressor(level=_ZSTD_LEVEL) if 'w' in mode else None)
+
+
+class ArchiveStore:
+    """
+    Content-addressed archive of the run outputs.
+
+    Every file is stored once, compressed, as blobs/<sha256[:2]>/<sha256>.zst (or .gz), however
+    many runs archive the same content. Each run has an index of the logical names it archived
+    (e.g. 'settlement/settlement_2025_05.csv') and the blob holding each one, kept in SQLite
+    with the list of blobs, so a file is found with one indexed lookup.
+    """
+
+    def __init__(self, root=ARCHIVE_DIR, index_path=ARCHIVE_INDEX_PATH, compression=ARCHIVE_COMPRESSION):
+        self.root = root
+        self.codec = 'zstd' if compression == 'zstd' and zstandard is not None else 'gzip'
+        if self.codec != compression:
+            logger.warning(f"zstandard is not installed, new blobs are gzip-compressed instead of {compression}")
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+        self._conn = sqlite3.connect(index_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA foreign_keys = ON')
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _blob_path(self, sha256, codec):
+        return os.path.join(self.root, 'blobs', sha256[:2], sha256 + _EXTENSIONS[codec])
+
+    def _put(self, path):
+        """
+        Stores a file as a blob unless the same content is already stored.
+        Returns:
+            tuple: (sha256, whether a new blob was written)
+        """
+        sha256 = file_sha256(path)
+        if self._conn.execute('SELECT 1 FROM blobs WHERE sha256 = ?', (sha256,)).fetchone():
+            return sha256, False
+        blob_path = self._blob_path(sha256, self.codec)
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        tmp_path = blob_path + '.tmp'
+        with open(path, 'rb') as src, _open_blob(tmp_path, self.codec, 'wb') as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(tmp_path, blob_path)
+        self._conn.execute('INSERT INTO blobs (sha256, size, stored_size, codec) VALUES (?, ?, ?, ?)',
+                           (sha256, os.path.getsize(path), os.path.getsize(blob_path), self.codec))
+        return sha256, True
+
+    def archive_run(self, files, remove=True):
+        """
+        Archives the files of one run.
+        Args:
+            files (dict): Logical name -> path of the file to archive
+            remove (bool): Delete the files once they are archived
+        Returns:
+            str: The run id
+        """
+        run_id = time.strftime('%Y%m%dT%H%M%S') + f".{time.time_ns() % 10 ** 9:09d}"
+        written = 0
+        with self._lock, self._conn:
+            self._conn.execute('INSERT INTO runs (run_id, created) VALUES (?, ?)', (run_id, time.time()))
+            for name, path in sorted(files.items()):
+                sha256, new = self._put(path)
+                written += new
+                self._conn.execute('INSERT INTO entries (run_id, name, sha256) VALUES (?, ?, ?)',
+                                   (run_id, name, sha256))
+        if remove:
+            for path in files.values():
+                os.remove(path)
+        logger.info(f"Archived {len(files)} files as run {run_id} ({written} new blobs, "
+                    f"{len(files) - written} already stored)")
+        return run_id
+
+    def runs(self):
+        """
+        Returns:
+            list: One dict per run (run_id, created, files, size), oldest first
+        """
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(
+                'SELECT r.run_id, r.created, COUNT(e.name) AS files, COALESCE(SUM(b.size), 0) AS size '
+                'FROM runs r LEFT JOIN entries e ON e.run_id = r.run_id LEFT JOIN blobs b ON b.sha256 = e.sha256 '
+                'GROUP BY r.run_id ORDER BY r.created')]
+
+    def run_index(self, run_id):
+        """
+        Returns the index of a run: logical name -> sha256 of its blob.
+        """
+        with self._lock:
+            return {row['name']: row['sha256'] for row in self._conn.execute(
+                'SELECT name, sha256 FROM entries WHERE run_id = ? ORDER BY name', (run_id,))}
+
+    def _locate(self, name, run_id=None):
+        sql = ('SELECT b.sha256, b.codec FROM entries e JOIN runs r ON r.run_id = e.run_id '
+               'JOIN blobs b ON b.sha256 = e.sha256 WHERE e.name = ?')
+        params = [name]
+        if run_id:
+            sql += ' AND e.run_id = ?'
+            params.append(run_id)
+        with self._lock:
+            row = self._conn.execute(sql + ' ORDER BY r.created DESC LIMIT 1', params).fetchone()
+        if row is None:
+            raise KeyError(f"{name} is not archived" + (f" in run {run_id}" if run_id else ""))
+        return self._blob_path(row['sha256'], row['codec']), row['codec']
+
+    def get(self, name, run_id=None):
+        """
+        Returns the content of an archived file.
+        Args:
+            name (str): Logical name, e.g. 'settlement/settlement_2025_05.csv'
+            run_id (str): Run to read it from; the latest run that archived it if None
+        Raises:
+            KeyError: If the file was not archived (in that run)
+            RuntimeError: If the blob is zstd-compressed and zstandard is not installed
+        """
+        path, codec = self._locate(name, run_id)
+        with _open_blob(path, codec, 'rb') as f:
+            return f.read()
+
+    def restore(self, name, dest, run_id=None):
+        """
+        Writes an archived file to dest, streaming it out of its blob.
+        """
+        path, codec = self._locate(name, run_id)
+        os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+        with _open_blob(path, codec, 'rb') as src, open(dest, 'wb') as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        return dest
+
+    def prune(self, keep_runs=ARCHIVE_KEEP_RUNS, max_age_days=ARCHIVE_MAX_AGE_DAYS):
+        """
+        Applies the retention policy. Runs beyond the `keep_runs` most recent ones and older than
+        `max_age_days` are dropped, except for the entries still holding the latest version of
+        their file, so every file ever archived stays retrievable. Blobs no run refers to any
+        more are then deleted.
+        Returns:
+            dict: Counts of 'runs' and 'blobs' removed and 'bytes' freed on disk
+        """
+        stats = {'runs': 0, 'blobs': 0, 'bytes': 0}
+        cutoff = time.time() - max_age_days * 24 * 60 * 60
+        with self._lock, self._conn:
+            expired = [row['run_id'] for row in self._conn.execute(
+                'SELECT run_id FROM runs WHERE created < ? AND run_id NOT IN '
+                '(SELECT run_id FROM runs ORDER BY created DESC LIMIT ?)', (cutoff, keep_runs))]
+            for run_id in expired:
+                self._conn.execute(
+                    'DELETE FROM entries WHERE run_id = ? AND EXISTS (SELECT 1 FROM entries n JOIN runs r '
+                    'ON r.run_id = n.run_id WHERE n.name = entries.name AND r.created > '
+                    '(SELECT created FROM runs WHERE run_id = ?))', (run_id, run_id))
+                if not self._conn.execute('SELECT 1 FROM entries WHERE run_id = ?', (run_id,)).fetchone():
+                    self._conn.execute('DELETE FROM runs WHERE run_id = ?', (run_id,))
+                    stats['runs'] += 1
+
+            orphans = self._conn.execute(
+                'SELECT sha256, stored_size, codec FROM blobs '
+                'WHERE sha256 NOT IN (SELECT sha256 FROM entries)').fetchall()
+            for row in orphans:
+                self._conn.execute('DELETE FROM blobs WHERE sha256 = ?', (row['sha256'],))
+                try:
+                    os.remove(self._blob_path(row['sha256'], row['codec']))
+                except FileNotFoundError:
+                    pass
+                stats['blobs'] += 1
+                stats['bytes'] += row['stored_size']
+        if stats['runs'] or stats['blobs']:
+            logger.info(f"Archive pruned: {stats}")
+        return stats
+
+    def stats(self):
+        """
+        Returns:
+            dict: Number of runs, entries and blobs, logical size of all entries and size on disk
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT (SELECT COUNT(*) FROM runs) AS runs, (SELECT COUNT(*) FROM entries) AS entries, '
+                '(SELECT COUNT(*) FROM blobs) AS blobs, '
+                '(SELECT COALESCE(SUM(b.size), 0) FROM entries e JOIN blobs b ON b.sha256 = e.sha256) AS size, '
+                '(SELECT COALESCE(SUM(stored_size), 0) FROM blobs) AS stored_size').fetchone()
+        return dict(row)
+
+
+def import_directory(store, folder, prefix, remove=False):
+    """
+    Archives the files of a plain directory (e.g. an archive folder of the earlier file moves)
+    as one run, named <prefix>/<path relative to folder>.
+    Returns:
+        str: The run id, or None if the folder holds no file
+    """
+    files = {}
+    for root, _, names in os.walk(folder):
+        for name in names:
+            path = os.path.join(root, name)
+            files['/'.join([prefix] + os.path.relpath(path, folder).split(os.sep))] = path
+    return store.archive_run(files, remove=remove) if files else None
+
+
+_default_store = None
+
+
+def get_archive_store():
+    """
+    Returns the process-wide archive store, opening it on first use.
+    """
+    global _default_store
+    if _default_store is None:
+        _default_store = ArchiveStore()
+    return _default_store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect and maintain the archive store.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('runs', help="List the archived runs")
+    show = subparsers.add_parser('show', help="List the files of a run")
+    show.add_argument('run_id')
+    restore = subparsers.add_parser('restore', help="Restore an archived file")
+    restore.add_argument('name', help="Logical name, e.g. settlement/settlement_2025_05.csv")
+    restore.add_argument('dest')
+    restore.add_argument('--run', help="Run to restore it from (default: the latest)")
+    prune = subparsers.add_parser('prune', help="Apply the retention policy")
+    prune.add_argument('--keep-runs', type=int, default=ARCHIVE_KEEP_RUNS)
+    prune.add_argument('--max-age-days', type=float, default=ARCHIVE_MAX_AGE_DAYS)
+    subparsers.add_parser('stats', help="Show the deduplication and compression of the store")
+    migrate = subparsers.add_parser('import', help="Archive a plain directory as one run")
+    migrate.add_argument('folder')
+    migrate.add_argument('prefix', help="Logical name prefix, e.g. settlement")
+    migrate.add_argument('--remove', action='store_true', help="Delete the files once archived")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    store = get_archive_store()
+    if args.command == 'runs':
+        for run in store.runs():
+            print(json.dumps(run))
+    elif args.command == 'show':
+        for name, sha256 in store.run_index(args.run_id).items():
+            print(f"{sha256}  {name}")
+    elif args.command == 'restore':
+        print(store.restore(args.name, args.dest, args.run))
+    elif args.command == 'prune':
+        print(json.dumps(store.prune(args.keep_runs, args.max_age_days)))
+    elif args.command == 'stats':
+        print(json.dumps(store.stats()))
+    elif args.command == 'import':
+        print(import_directory(store, args.folder, args.prefix, args.remove))
+    store.close()
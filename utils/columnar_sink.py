@@ -0,0 +1,295 @@
+import os
+import glob
+import json
+import logging
+import threading
+from settings import COLUMNAR_FORMAT, COLUMNAR_DIR
+from utils.date_utils import parse_date, infer_date_columns
+from utils.csv_pipeline import read_rows
+from utils.diff_engine import split_sections
+from utils.run_manifest import rows_sha256
+
+pa = pa_ipc = pq = pc = None  # pyarrow modules, imported on first use by _load_pyarrow
+_pyarrow_checked = False
+_pyarrow_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {'parquet': '.parquet', 'arrow': '.arrow'}
+PARTITION_COLUMNS = ['exchange', 'year', 'month']
+SECTION_NAMES = ['settlement', 'timing']  # tables of a published BSE file, in order
+
+
+def _load_pyarrow():
+    """
+    Imports pyarrow the first time the sink is used, so runs that write no columnar output do
+    not pay for it. Returns False, warning once, if pyarrow is not installed.
+    """
+    global pa, pa_ipc, pq, pc, _pyarrow_checked
+    with _pyarrow_lock:
+        if not _pyarrow_checked:
+            try:
+                import pyarrow
+                import pyarrow.compute
+                import pyarrow.ipc
+                import pyarrow.parquet
+                pa, pa_ipc, pq, pc = pyarrow, pyarrow.ipc, pyarrow.parquet, pyarrow.compute
+                # The first pa.array() loads pyarrow's pandas shim (and pandas); pay it with the import
+                pa.array([], type=pa.string())
+            except ImportError:  # pyarrow is optional, the columnar sink is skipped without it
+                logger.warning(f"COLUMNAR_FORMAT is '{COLUMNAR_FORMAT}' but pyarrow is not installed, "
+                               f"no columnar output will be written")
+            _pyarrow_checked = True
+    return pa is not None
+
+
+def is_enabled(fmt=COLUMNAR_FORMAT):
+    """
+    Returns True if a columnar format is configured and pyarrow is installed.
+    """
+    return fmt in EXTENSIONS and _load_pyarrow()
+
+
+def typed_table(headers, rows, date_format):
+    """
+    Builds an Arrow table from string rows. Columns whose first non-empty value is a date in
+    date_format become date32 columns (values that do not parse become null), all others stay
+    strings. date_format is kept in the schema metadata.
+    Args:
+        headers (list): Column names
+        rows (list): Data rows
+        date_format (str): strptime format of the dates in rows
+    Returns:
+        pyarrow.Table: The typed table
+    """
+    _load_pyarrow()
+    # A blank first cell (a holiday, a merged note) must not turn a date column into a string one
+    sample = [next((row[idx] for row in rows if idx < len(row) and row[idx]), '') for idx in range(len(headers))]
+    date_columns = infer_date_columns(headers, sample, date_format)
+    arrays = []
+    for idx in range(len(headers)):
+        values = [row[idx] if idx < len(row) else None for row in rows]
+        if idx in date_columns:
+            dates = [parse_date(value, date_format) if value else None for value in values]
+            arrays.append(pa.array([value.date() if value else None for value in dates], type=pa.date32()))
+        else:
+            arrays.append(pa.array(values, type=pa.string()))
+    return pa.Table.from_arrays(arrays, names=_unique_names(headers), metadata={'date_format': date_format})
+
+
+def _unique_names(headers):
+    """Arrow allows duplicate names but Parquet readers do not, so repeats get a numeric suffix."""
+    seen = {}
+    names = []
+    for header in headers:
+        name = header or 'column'
+        seen[name] = seen.get(name, 0) + 1
+        names.append(name if seen[name] == 1 else f"{name}_{seen[name]}")
+    return names
+
+
+def _write(table, path, fmt):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    if fmt == 'parquet':
+        pq.write_table(table, tmp_path)
+    else:
+        with pa_ipc.new_file(tmp_path, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def _read(path, fmt):
+    if fmt == 'parquet':
+        return pq.read_table(path)
+    with pa_ipc.open_file(path) as reader:
+        return reader.read_all()
+
+
+def _read_metadata(path, fmt):
+    """
+    Returns the schema metadata of a file, reading only its footer, or {} if it cannot be read.
+    """
+    try:
+        if fmt == 'parquet':
+            schema = pq.read_schema(path)
+        else:
+            with pa_ipc.open_file(path) as reader:
+                schema = reader.schema
+    except (OSError, pa.ArrowInvalid):
+        return {}
+    return schema.metadata or {}
+
+
+def partition_path(exchange, year, month, name, fmt=COLUMNAR_FORMAT, base_dir=COLUMNAR_DIR):
+    """
+    Returns the hive-style path exchange=X/year=YYYY/month=MM/<name>.<ext> of a partition file.
+    """
+    return os.path.join(base_dir, f"exchange={exchange}", f"year={int(year)}", f"month={int(month):02d}",
+                        name + EXTENSIONS[fmt])
+
+
+def write_partition(headers, rows, exchange, year, month, name, date_format,
+                    fmt=COLUMNAR_FORMAT, base_dir=COLUMNAR_DIR):
+    """
+    Writes one table to its exchange/year/month partition. A partition already holding the
+    same rows is left as it is, so the consolidated dataset it belongs to is not rebuilt.
+    Args:
+        headers (list): Column names
+        rows (list): Data rows (strings, as published in the CSVs)
+        exchange (str): 'BSE' or 'NSE'
+        year (int): Partition year
+        month (int): Partition month
+        name (str): File name inside the partition, without extension
+        date_format (str): strptime format of the dates in rows
+    Returns:
+        str: Path written, or None if the columnar sink is disabled
+    """
+    if not is_enabled(fmt) or not headers:
+        return None
+    path = partition_path(exchange, year, month, name, fmt, base_dir)
+    source_hash = rows_sha256([list(headers), date_format] + list(rows))
+    if _read_metadata(path, fmt).get(b'source_sha256') == source_hash.encode('utf-8'):
+        logger.debug(f"Columnar partition {path} unchanged")
+        return path
+    table = typed_table(headers, rows, date_format)
+    _write(table.replace_schema_metadata(dict(table.schema.metadata, source_sha256=source_hash)), path, fmt)
+    logger.debug(f"Wrote columnar partition {path}")
+    return path
+
+
+def write_partitions_by_date(headers, rows, exchange, date_column, name, date_format,
+                             fmt=COLUMNAR_FORMAT, base_dir=COLUMNAR_DIR):
+    """
+    Splits a table over the year/month partitions of its date_column (a table spanning several
+    months lands in each of them). Rows whose date does not parse go with the previous row, and
+    those before the first date with the first dated row. A table without any date is not written.
+    Returns:
+        list: Paths written
+    """
+    if not is_enabled(fmt):
+        return []
+    idx = headers.index(date_column)
+    groups = {}
+    current = None
+    undated = []
+    for row in rows:
+        date = parse_date(row[idx], date_format) if idx < len(row) and row[idx] else None
+        if date:
+            current = (date.year, date.month)
+        if current is None:
+            undated.append(row)
+            continue
+        group = groups.setdefault(current, [])
+        if undated:
+            group.extend(undated)
+            undated = []
+        group.append(row)
+    if undated:
+        logger.warning(f"{name}: no {date_column} parses as {date_format}, {len(undated)} rows not written "
+                       f"to the columnar partitions")
+    return [write_partition(headers, group, exchange, year, month, name, date_format, fmt, base_dir)
+            for (year, month), group in groups.items()]
+
+
+def write_published_csv(csv_path, exchange, year, month, date_format, suffix='',
+                        fmt=COLUMNAR_FORMAT, base_dir=COLUMNAR_DIR):
+    """
+    Writes the tables of a published CSV (main table, then the timing table after a blank row)
+    to the partition of its month, as settlement<suffix> and timing<suffix>.
+    Returns:
+        list: Paths written
+    """
+    if not is_enabled(fmt):
+        return []
+    written = []
+    for kind, (headers, rows) in zip(SECTION_NAMES, split_sections(read_rows(csv_path))):
+        written.append(write_partition(headers, rows, exchange, year, month, kind + suffix,
+                                       date_format, fmt, base_dir))
+    return written
+
+
+def _unify_types(tables):
+    """
+    Gives every column one type across the tables of a dataset: a column that is a date in some
+    tables and a string in others becomes a string column in all of them, its dates written
+    back in the format of the file they came from.
+    """
+    types = {}
+    for table in tables:
+        for field in table.schema:
+            types.setdefault(field.name, set()).add(field.type)
+    mixed = {name for name, kinds in types.items() if len(kinds) > 1}
+    if not mixed:
+        return tables
+
+    unified = []
+    for table in tables:
+        date_format = (table.schema.metadata or {}).get(b'date_format', b'%Y-%m-%d').decode('utf-8')
+        for name in mixed.intersection(table.column_names):
+            idx = table.schema.get_field_index(name)
+            column = table.column(idx)
+            if pa.types.is_date32(column.type):
+                column = pc.strftime(column, format=date_format)
+            else:
+                column = column.cast(pa.string())
+            table = table.set_column(idx, pa.field(name, pa.string()), column)
+        unified.append(table)
+    return unified
+
+
+def build_consolidated(fmt=COLUMNAR_FORMAT, base_dir=COLUMNAR_DIR):
+    """
+    Concatenates the partition files into one dataset per exchange and table name prefix
+    (consolidated/bse_settlement, bse_timing, nse_settlement), adding the exchange/year/month
+    partition values as columns. Tables with different columns are merged with nulls for the
+    missing ones, and a column typed differently across partitions becomes a string column.
+    A dataset is only rebuilt when one of its partitions was written or removed since.
+    Returns:
+        list: Paths of the consolidated files
+    """
+    if not is_enabled(fmt):
+        return []
+
+    ext = EXTENSIONS[fmt]
+    grouped = {}
+    for path in sorted(glob.glob(os.path.join(base_dir, 'exchange=*', 'year=*', 'month=*', '*' + ext))):
+        exchange = os.path.relpath(path, base_dir).split(os.sep)[0].split('=', 1)[1]
+        kind = os.path.basename(path)[:-len(ext)].split('_', 1)[0]
+        grouped.setdefault((exchange, kind), []).append(path)
+
+    written = []
+    consolidated_dir = os.path.join(base_dir, 'consolidated')
+    for (exchange, kind), paths in grouped.items():
+        name = f"{exchange.lower()}_{kind}"
+        path = os.path.join(consolidated_dir, name + ext)
+        sources = json.dumps([os.path.relpath(source, base_dir) for source in paths]).encode('utf-8')
+        if os.path.exists(path) and os.path.getmtime(path) > max(os.path.getmtime(source) for source in paths) \
+                and _read_metadata(path, fmt).get(b'partitions') == sources:
+            logger.debug(f"Consolidated {name} dataset is up to date")
+            written.append(path)
+            continue
+
+        tables = []
+        for source in paths:
+            table = _read(source, fmt)
+            parts = dict(part.split('=', 1) for part in os.path.relpath(source, base_dir).split(os.sep)[:3])
+            for column in PARTITION_COLUMNS:
+                value = parts[column] if column == 'exchange' else int(parts[column])
+                table = table.append_column(column, pa.array([value] * table.num_rows))
+            tables.append(table)
+        try:
+            combined = pa.concat_tables(_unify_types(tables), promote_options='permissive')
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            logger.error(f"Could not consolidate {name} partitions: {e}")
+            continue
+        _write(combined.replace_schema_metadata({'partitions': sources}), path, fmt)
+        written.append(path)
+        logger.info(f"Consolidated {len(paths)} {name} partitions into {path} ({combined.num_rows} rows)")
+
+    # Datasets of an earlier layout (one per table across exchanges) or of removed partitions
+    current = {f"{exchange.lower()}_{kind}{ext}" for exchange, kind in grouped}
+    for path in glob.glob(os.path.join(consolidated_dir, '*' + ext)):
+        if os.path.basename(path) not in current:
+            os.remove(path)
+    return written
@@ -0,0 +1,206 @@
+import os
+import csv
+import re
+import logging
+import tempfile
+from settings import SETTLEMENT_COLUMN, PAY_IN_OUT_COLUMN
+from utils.date_utils import reformat_date
+from utils.diff_engine import RowDigest, digest_rows, diff_tables
+
+logger = logging.getLogger(__name__)
+
+MAX_LOGGED_DIFFS = 5
+
+
+class FileResult:
+    """
+    Outcome of running one settlement file through the pipeline.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.matched = False
+        self.dest_path = None
+        self.anomaly_columns = set()
+        self.date_columns = set()
+        self.settlement_digest = None
+        self.output_digest = None
+        self.settlement_lines = 0
+        self.output_lines = 0
+        self.diff = None  # SettlementDiff, only computed for mismatches
+        self.elapsed = 0.0
+
+    @property
+    def total_diffs(self):
+        return self.diff.total_diffs if self.diff is not None else 0
+
+    def to_dict(self):
+        return {
+            'filename': self.filename,
+            'status': 'match' if self.matched else 'mismatch',
+            'total_diffs': self.total_diffs,
+            'settlement_lines': self.settlement_lines,
+            'output_lines': self.output_lines,
+            'anomaly_columns': sorted(self.anomaly_columns),
+            'elapsed': round(self.elapsed, 4),
+            'dest_path': self.dest_path,
+            'diff': self.diff.to_dict() if self.diff is not None else None,
+        }
+
+
+def read_rows(path):
+    """
+    Yields the rows of a CSV file one at a time.
+    """
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        yield from csv.reader(f)
+
+
+def strip_anomalies(rows, result):
+    """
+    Removes the '@' suffix BSE appends to some dates, recording the affected columns.
+    """
+    headers = None
+    for row in rows:
+        if headers is None:
+            headers = row
+            yield row
+            continue
+        cleaned_row = []
+        for idx, value in enumerate(row):
+            if value.endswith('@'):
+                value = value.rstrip('@')
+                result.anomaly_columns.add(headers[idx] if idx < len(headers) else str(idx))
+            cleaned_row.append(value)
+        yield cleaned_row
+
+
+def output_digest(path):
+    """
+    Returns the RowDigest of a CSV file, hashing one parsed row at a time.
+    """
+    digest = RowDigest()
+    for row in read_rows(path):
+        digest.update(row)
+    return digest
+
+
+def diff_settlement_file(filename, settlement_folder, output_folder):
+    """
+    Builds the keyed diff of a settlement file (cleaned) against its output file.
+    Returns:
+        SettlementDiff: The structured differences
+    """
+    scratch = FileResult(filename)
+    settlement_rows = strip_anomalies(read_rows(os.path.join(settlement_folder, filename)), scratch)
+    output_rows = read_rows(os.path.join(output_folder, filename))
+    return diff_tables(settlement_rows, output_rows, filename)
+
+
+def convert_dates(rows, result, naming):
+    """
+    Converts dd/mm/YYYY values to dd-mm-YYYY and drops repeated header rows.
+    The first data row (before conversion) is stored in `naming` for the output file name, and
+    the headers of the columns where a value was converted in result.date_columns.
+    """
+    headers = None
+    section_headers = None
+    for row in rows:
+        if headers is None:
+            headers = section_headers = row
+            yield row
+            continue
+        if not row:
+            # A blank row separates the main table from the timing table, which has its own header
+            section_headers = None
+            yield row
+            continue
+        if section_headers is None:
+            section_headers = row
+        elif 'first_row' not in naming:
+            naming['first_row'] = row
+
+        modified_row = [reformat_date(value) or value for value in row]
+        if modified_row != row:
+            result.date_columns.update(section_headers[idx] for idx, value in enumerate(row)
+                                       if idx < len(section_headers) and modified_row[idx] != value)
+
+        if modified_row != headers:
+            yield modified_row
+
+
+def ready_filename(first_row):
+    """
+    Builds the publish file name from the first data row of a settlement file.
+    """
+    settlement_no = first_row[SETTLEMENT_COLUMN]
+    pay_in_out = first_row[PAY_IN_OUT_COLUMN]
+
+    # Remove any prefix consisting of letters followed by a hyphen
+    settlement_no = re.sub(r'^[A-Za-z]+-', '', settlement_no)  # Remove prefix like DR- or MJ-
+
+    # Sanitize the filename to remove invalid characters
+    settlement_no = settlement_no.replace("'", "").replace("/", "-")
+    pay_in_out = pay_in_out.replace("'", "").replace("/", "-")
+
+    return f"publish_settlement_number_edis bse_cm '{settlement_no}' '{pay_in_out}'.csv"
+
+
+def _rewrite_cleaned(path):
+    """
+    Writes the '@'-free version of a settlement file back in place (only needed when anomalies were found).
+    """
+    scratch = FileResult(os.path.basename(path))
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerows(strip_anomalies(read_rows(path), scratch))
+    os.replace(tmp_path, path)
+
+
+def process_settlement_file(filename, settlement_folder, output_folder, dest_folder):
+    """
+    Streams one settlement file through clean -> hash -> convert, holding a single row at a time.
+    The converted file is written to a temporary file in dest_folder and only moved to its final
+    name when the digest of the cleaned settlement rows equals the digest of the output file.
+    Only on a mismatch are both files read again to build the keyed diff (result.diff).
+    Args:
+        filename (str): Name of the CSV present in both folders
+        settlement_folder (str): Folder with the scraped settlement CSVs
+        output_folder (str): Folder with the CSVs converted from the XLS exports
+        dest_folder (str): Folder receiving the publish files (READY_DIR)
+    Returns:
+        FileResult: Match status, published path and statistics
+    """
+    os.makedirs(dest_folder, exist_ok=True)
+    result = FileResult(filename)
+    naming = {}
+    settlement_path = os.path.join(settlement_folder, filename)
+
+    settlement_digest = RowDigest()
+    rows = strip_anomalies(read_rows(settlement_path), result)
+    rows = digest_rows(rows, settlement_digest)
+    rows = convert_dates(rows, result, naming)
+
+    fd, tmp_path = tempfile.mkstemp(dir=dest_folder, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerows(rows)
+
+        other_digest = output_digest(os.path.join(output_folder, filename))
+        result.settlement_digest, result.settlement_lines = settlement_digest.hexdigest(), settlement_digest.lines
+        result.output_digest, result.output_lines = other_digest.hexdigest(), other_digest.lines
+        result.matched = result.settlement_digest == result.output_digest and 'first_row' in naming
+        if result.matched:
+            result.dest_path = os.path.join(dest_folder, ready_filename(naming['first_row']))
+            os.replace(tmp_path, result.dest_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    if not result.matched:
+        result.diff = diff_settlement_file(filename, settlement_folder, output_folder)
+
+    if result.anomaly_columns:
+        _rewrite_cleaned(settlement_path)
+
+    return result
@@ -0,0 +1,314 @@
+import json
+import time
+import importlib
+import signal
+import logging
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from settings import BASE_URL, DAEMON_SCHEDULES, DAEMON_HOST, DAEMON_PORT
+from utils.instrumentation import measure
+from utils.retry_mechanism import reset_retry_budget, get_retry_budget, circuit_breakers
+
+logger = logging.getLogger(__name__)
+
+# Modules the jobs import on their first run, imported by build_daemon at start-up instead
+_WARM_IMPORTS = ('main', 'utils.http_scraper', 'pandas', 'pdfplumber')
+
+# (name, lowest, highest value) of the five cron fields
+_CRON_FIELDS = [('minute', 0, 59), ('hour', 0, 23), ('day', 1, 31), ('month', 1, 12), ('weekday', 0, 7)]
+
+
+def _parse_cron_field(field, name, low, high):
+    """
+    Parses one cron field: '*', 'n', 'a-b', any of them with '/step', and comma-separated lists.
+    Returns:
+        set: The matching values
+    Raises:
+        ValueError: If the field is malformed or out of range
+    """
+    values = set()
+    for part in field.split(','):
+        try:
+            part, _, step = part.partition('/')
+            step = int(step) if step else 1
+            if part == '*':
+                start, end = low, high
+            elif '-' in part:
+                start, end = (int(value) for value in part.split('-'))
+            else:
+                start = int(part)
+                end = high if step > 1 else start
+        except ValueError:
+            raise ValueError(f"Invalid cron {name} field '{field}'")
+        if not (low <= start <= end <= high) or step < 1:
+            raise ValueError(f"Cron {name} field '{field}' out of range {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """
+    A five-field cron expression (minute hour day month weekday), evaluated in local time.
+    Weekdays run from 0 (Sunday) to 6, 7 being Sunday as well. As in cron, when both the day and
+    the weekday are restricted a time matches if either of them does.
+    """
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression '{expression}' must have 5 fields")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            _parse_cron_field(field, *spec) for field, spec in zip(fields, _CRON_FIELDS))
+        self.weekdays = {day % 7 for day in weekdays}
+        self._any_day = fields[2] == '*'
+        self._any_weekday = fields[4] == '*'
+
+    def _day_matches(self, moment):
+        day = moment.day in self.days
+        weekday = (moment.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next_after(self, moment):
+        """
+        Returns the first matching minute strictly after moment.
+        """
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=5 * 366)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                year, month = divmod(candidate.year * 12 + candidate.month, 12)
+                candidate = datetime(year, month + 1, 1)
+            elif not self._day_matches(candidate):
+                candidate = datetime(candidate.year, candidate.month, candidate.day) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Cron expression '{self.expression}' never matches")
+
+
+class Job:
+    """
+    A scheduled function and the outcome of its runs.
+    """
+
+    def __init__(self, name, schedule, func):
+        self.name = name
+        self.schedule = schedule if isinstance(schedule, CronSchedule) else CronSchedule(schedule)
+        self.func = func
+        self.next_run = None
+        self.runs = 0
+        self.failures = 0
+        self.last_status = None  # 'ok' or 'failed'
+        self.last_started = None
+        self.last_elapsed = None
+        self.last_success = None
+        self.last_error = None
+
+    def to_dict(self):
+        return {
+            'job': self.name,
+            'schedule': self.schedule.expression,
+            'next_run': self.next_run.isoformat() if self.next_run else None,
+            'runs': self.runs,
+            'failures': self.failures,
+            'last_status': self.last_status,
+            'last_started': self.last_started.isoformat() if self.last_started else None,
+            'last_elapsed': round(self.last_elapsed, 3) if self.last_elapsed is not None else None,
+            'last_success': self.last_success.isoformat() if self.last_success else None,
+            'last_error': self.last_error,
+        }
+
+
+class Daemon:
+    """
+    Runs jobs on their cron schedules in one long-lived process, so imports, the chromedriver
+    path, warm browsers, HTTP keep-alive connections, the download cache and the run manifest
+    survive from one run to the next. Jobs run one at a time in the calling thread; a run that
+    overlaps the next scheduled time simply runs once, right after.
+    """
+
+    def __init__(self, jobs, host=DAEMON_HOST, port=DAEMON_PORT):
+        self.jobs = list(jobs)
+        self.host = host
+        self.port = port
+        self.started = None
+        self.server = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def run_job(self, job):
+        """
+        Runs a job once, with a fresh retry budget, and records its outcome.
+        """
+        reset_retry_budget()
+        job.last_started = datetime.now()
+        start = time.perf_counter()
+        logger.info(f"Daemon job {job.name} started")
+        try:
+            with measure(f"daemon.{job.name}"):
+                job.func()
+            status, error = 'ok', None
+        except Exception as e:
+            status, error = 'failed', str(e)
+            logger.error(f"Daemon job {job.name} failed: {str(e)}", exc_info=True)
+        with self._lock:
+            job.runs += 1
+            job.last_elapsed = time.perf_counter() - start
+            job.last_status, job.last_error = status, error
+            if status == 'ok':
+                job.last_success = datetime.now()
+            else:
+                job.failures += 1
+        logger.info(f"Daemon job {job.name} {status} in {job.last_elapsed:.2f}s")
+
+    def run_forever(self, run_now=False):
+        """
+        Runs the jobs until stop() is called or SIGINT/SIGTERM is received.
+        Args:
+            run_now (bool): Run every job once at start-up instead of waiting for its schedule
+        """
+        self.started = time.time()
+        now = datetime.now()
+        for job in self.jobs:
+            job.next_run = now if run_now else job.schedule.next_after(now)
+        if threading.current_thread() is threading.main_thread():
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(sig, lambda *_: self.stop())
+        self.serve()
+        logger.info(f"Daemon started with jobs: "
+                    f"{', '.join(f'{job.name} ({job.schedule.expression})' for job in self.jobs)}")
+
+        try:
+            while not self._stop.is_set():
+                job = min(self.jobs, key=lambda j: j.next_run)
+                delay = (job.next_run - datetime.now()).total_seconds()
+                if delay > 0 and self._stop.wait(delay):
+                    break
+                self.run_job(job)
+                job.next_run = job.schedule.next_after(datetime.now())
+        finally:
+            if self.server:
+                self.server.shutdown()
+                self.server.server_close()
+            logger.info("Daemon stopped")
+
+    def stop(self):
+        self._stop.set()
+
+    def serve(self):
+        """
+        Starts the /health and /metrics endpoint in a background thread, if a port is configured.
+        """
+        if self.port is None:
+            return
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/health':
+                    body, content_type = json.dumps(daemon.health(), indent=2), 'application/json'
+                elif self.path == '/metrics':
+                    body, content_type = daemon.metrics(), 'text/plain; version=0.0.4'
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                logger.debug(f"Health endpoint: {format % args}")
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, name='daemon-health', daemon=True).start()
+        logger.info(f"Health endpoint on http://{self.host}:{self.port}/health")
+
+    def health(self):
+        """
+        Returns:
+            dict: 'ok' if the last run of every job succeeded ('degraded' otherwise), uptime,
+                  job states and circuit breaker states
+        """
+        with self._lock:
+            jobs = [job.to_dict() for job in self.jobs]
+        return {
+            'status': 'degraded' if any(job['last_status'] == 'failed' for job in jobs) else 'ok',
+            'uptime': round(time.time() - self.started, 1) if self.started else 0.0,
+            'jobs': jobs,
+            'circuits': {name: breaker.state for name, breaker in circuit_breakers().items()},
+        }
+
+    def metrics(self):
+        """
+        Returns the job counters and timings in the Prometheus text format.
+        """
+        lines = [
+            '# TYPE settlement_daemon_uptime_seconds gauge',
+            f'settlement_daemon_uptime_seconds {time.time() - self.started if self.started else 0:.1f}',
+            '# TYPE settlement_daemon_retry_budget_remaining gauge',
+            f'settlement_daemon_retry_budget_remaining {get_retry_budget().remaining}',
+        ]
+        series = [
+            ('job_runs_total', 'counter', lambda job: job.runs),
+            ('job_failures_total', 'counter', lambda job: job.failures),
+            ('job_last_duration_seconds', 'gauge', lambda job: job.last_elapsed),
+            ('job_last_success_timestamp_seconds', 'gauge',
+             lambda job: job.last_success.timestamp() if job.last_success else None),
+            ('job_next_run_timestamp_seconds', 'gauge',
+             lambda job: job.next_run.timestamp() if job.next_run else None),
+        ]
+        with self._lock:
+            for name, kind, value in series:
+                lines.append(f'# TYPE settlement_daemon_{name} {kind}')
+                for job in self.jobs:
+                    if value(job) is not None:
+                        lines.append(f'settlement_daemon_{name}{{job="{job.name}"}} {value(job)}')
+        lines.append('# TYPE settlement_daemon_circuit_open gauge')
+        for name, breaker in circuit_breakers().items():
+            lines.append(f'settlement_daemon_circuit_open{{circuit="{name}"}} {int(breaker.state == "open")}')
+        return '\n'.join(lines) + '\n'
+
+
+def _run_branch(branch, url, session):
+    from main import build_pipeline
+
+    results = build_pipeline(url, branches=(branch,), session=session, publish_unchanged=False).run()
+    failed = [name for name, result in results.items() if result.status != 'ok']
+    if failed:
+        raise RuntimeError(f"Stages did not complete: {', '.join(failed)}")
+
+
+def build_daemon(url=BASE_URL, schedules=DAEMON_SCHEDULES, host=DAEMON_HOST, port=DAEMON_PORT):
+    """
+    Builds the daemon of the pipeline: a 'bse' job scraping, validating and publishing the
+    current and next month, and an 'nse' job checking the circulars. Both share one pooled
+    HTTP session. The heavy imports are paid here, once, instead of on the first run.
+    Args:
+        schedules (dict): Job name ('bse', 'nse') -> cron expression; jobs left out are not run
+    Returns:
+        Daemon: The daemon, ready to run_forever()
+    """
+    from utils.downloader import create_pooled_session
+
+    # Pay the imports once, at start-up, rather than on the first run of each job
+    for name in _WARM_IMPORTS:
+        importlib.import_module(name)
+
+    session = create_pooled_session()
+    branches = {'bse': lambda: _run_branch('bse', url, session),
+                'nse': lambda: _run_branch('nse', url, session)}
+    unknown = set(schedules) - set(branches)
+    if unknown:
+        raise ValueError(f"Unknown daemon jobs: {', '.join(sorted(unknown))}")
+    return Daemon([Job(name, expression, branches[name]) for name, expression in schedules.items()], host, port)
@@ -0,0 +1,66 @@
+import re
+from datetime import datetime
+from functools import lru_cache
+
+BSE_DATE_FORMAT = '%d/%m/%Y'
+NSE_DATE_FORMAT = '%d-%b-%y'
+PUBLISH_DATE_FORMAT = '%d-%m-%Y'
+
+# Regex fragments for the strptime directives used in this project
+_DIRECTIVE_PATTERNS = {
+    '%d': r'\d{1,2}',
+    '%m': r'\d{1,2}',
+    '%Y': r'\d{4}',
+    '%y': r'\d{2}',
+    '%b': r'[A-Za-z]{3}',
+}
+
+
+@lru_cache(maxsize=None)
+def date_pattern(fmt):
+    """
+    Compiles a regex that matches the shape of a strptime format, used to reject
+    non-dates before calling strptime.
+    """
+    pattern = re.escape(fmt)
+    for directive, fragment in _DIRECTIVE_PATTERNS.items():
+        pattern = pattern.replace(re.escape(directive), fragment)
+    return re.compile(f'^{pattern}$')
+
+
+@lru_cache(maxsize=4096)
+def parse_date(value, fmt=BSE_DATE_FORMAT):
+    """
+    Parses a date string, memoized since settlement files repeat the same few dates.
+    Returns:
+        datetime: The parsed date, or None if the value is not a date in this format
+    """
+    if not date_pattern(fmt).match(value):
+        return None
+    try:
+        return datetime.strptime(value, fmt)
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=4096)
+def reformat_date(value, in_fmt=BSE_DATE_FORMAT, out_fmt=PUBLISH_DATE_FORMAT):
+    """
+    Converts a date string from one format to another.
+    Returns:
+        str: The reformatted date, or None if the value is not a date in in_fmt
+    """
+    date_obj = parse_date(value, in_fmt)
+    return date_obj.strftime(out_fmt) if date_obj else None
+
+
+def infer_date_columns(headers, row, fmt=BSE_DATE_FORMAT):
+    """
+    Infers which columns hold dates from a sample row, e.g. the first non-empty value of
+    each column.
+    Returns:
+        dict: Column index -> header name for every column whose value is a date in fmt
+    """
+    return {idx: headers[idx] for idx, value in enumerate(row)
+            if idx < len(headers) and parse_date(value, fmt) is not None}
+
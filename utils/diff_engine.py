@@ -0,0 +1,212 @@
+import hashlib
+import json
+import logging
+from settings import SETTLEMENT_COLUMN
+
+logger = logging.getLogger(__name__)
+
+
+class RowDigest:
+    """
+    Streaming hash of parsed CSV rows, so files that only differ in quoting or line endings compare equal.
+    """
+
+    def __init__(self):
+        self._digest = hashlib.sha256()
+        self.lines = 0
+
+    def update(self, row):
+        self._digest.update(json.dumps(row, ensure_ascii=False).encode('utf-8'))
+        self._digest.update(b'\n')
+        self.lines += 1
+
+    def hexdigest(self):
+        return self._digest.hexdigest()
+
+
+def digest_rows(rows, digest):
+    """
+    Passes rows through unchanged while feeding them to a RowDigest.
+    """
+    for row in rows:
+        digest.update(row)
+        yield row
+
+
+class SectionDiff:
+    """
+    Keyed, column-by-column differences of one table section (main table or timing table).
+    """
+
+    def __init__(self, index, key_column):
+        self.index = index
+        self.key_column = key_column
+        self.columns_only_in_settlement = []
+        self.columns_only_in_output = []
+        self.rows_only_in_settlement = []
+        self.rows_only_in_output = []
+        self.duplicate_keys = []
+        self.changed_duplicates = []  # duplicate keys whose repeated rows differ between the files
+        self.changed = {}  # key -> {column: [settlement value, output value]}
+
+    @property
+    def total_diffs(self):
+        return (len(self.columns_only_in_settlement) + len(self.columns_only_in_output)
+                + len(self.rows_only_in_settlement) + len(self.rows_only_in_output)
+                + len(self.changed_duplicates)
+                + sum(len(columns) for columns in self.changed.values()))
+
+    def to_dict(self):
+        return {
+            'section': self.index,
+            'key_column': self.key_column,
+            'columns_only_in_settlement': self.columns_only_in_settlement,
+            'columns_only_in_output': self.columns_only_in_output,
+            'rows_only_in_settlement': self.rows_only_in_settlement,
+            'rows_only_in_output': self.rows_only_in_output,
+            'duplicate_keys': self.duplicate_keys,
+            'changed_duplicates': self.changed_duplicates,
+            'changed': self.changed,
+        }
+
+
+class SettlementDiff:
+    """
+    Structured difference between a settlement CSV and the CSV converted from its XLS export.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.sections = []
+        self.settlement_sections = 0
+        self.output_sections = 0
+
+    @property
+    def total_diffs(self):
+        return (sum(section.total_diffs for section in self.sections)
+                + abs(self.settlement_sections - self.output_sections))
+
+    def to_dict(self):
+        return {
+            'filename': self.filename,
+            'total_diffs': self.total_diffs,
+            'settlement_sections': self.settlement_sections,
+            'output_sections': self.output_sections,
+            'sections': [section.to_dict() for section in self.sections],
+        }
+
+
+def split_sections(rows):
+    """
+    Splits a settlement CSV into its tables. Tables are separated by a blank row and each
+    starts with its own header row.
+    Returns:
+        list: (headers, data_rows) per section
+    """
+    sections = []
+    current = None
+    for row in rows:
+        if not any(row):
+            current = None
+            continue
+        if current is None:
+            current = (row, [])
+            sections.append(current)
+        else:
+            current[1].append(row)
+    return sections
+
+
+def _keyed(headers, rows):
+    """
+    Indexes rows by the settlement number column, mapping each to {column name: value}.
+    Returns:
+        tuple: (first row by key, later rows by repeated key)
+    """
+    keyed = {}
+    repeated = {}
+    for row in rows:
+        key = row[SETTLEMENT_COLUMN] if len(row) > SETTLEMENT_COLUMN else ''
+        if key in keyed:
+            repeated.setdefault(key, []).append(dict(zip(headers, row)))
+            continue
+        keyed[key] = dict(zip(headers, row))
+    return keyed, repeated
+
+
+def _values(rows, columns):
+    return [[row.get(col, '') for col in columns] for row in rows]
+
+
+def diff_tables(settlement_rows, output_rows, filename=''):
+    """
+    Diffs two settlement tables keyed by settlement number, so an inserted or removed row shows up
+    as that single row instead of shifting every following line. Columns are matched by header name.
+    Args:
+        settlement_rows (iterable): Rows of the (cleaned) settlement CSV
+        output_rows (iterable): Rows of the CSV converted from the XLS export
+        filename (str): Name recorded on the diff
+    Returns:
+        SettlementDiff: The structured differences
+    """
+    diff = SettlementDiff(filename)
+    settlement_sections = split_sections(settlement_rows)
+    output_sections = split_sections(output_rows)
+    diff.settlement_sections = len(settlement_sections)
+    diff.output_sections = len(output_sections)
+
+    for index, ((s_headers, s_rows), (o_headers, o_rows)) in enumerate(zip(settlement_sections, output_sections)):
+        section = SectionDiff(index, s_headers[SETTLEMENT_COLUMN] if s_headers else '')
+        section.columns_only_in_settlement = [col for col in s_headers if col not in o_headers]
+        section.columns_only_in_output = [col for col in o_headers if col not in s_headers]
+        columns = [col for col in s_headers if col in o_headers]
+
+        s_keyed, s_repeated = _keyed(s_headers, s_rows)
+        o_keyed, o_repeated = _keyed(o_headers, o_rows)
+        # Rows after the first of a key are compared as a whole, in file order
+        section.duplicate_keys = list(dict.fromkeys(list(s_repeated) + list(o_repeated)))
+        section.changed_duplicates = [key for key in section.duplicate_keys
+                                      if _values(s_repeated.get(key, []), columns) != _values(o_repeated.get(key, []), columns)]
+        section.rows_only_in_settlement = [key for key in s_keyed if key not in o_keyed]
+        section.rows_only_in_output = [key for key in o_keyed if key not in s_keyed]
+
+        for key, s_values in s_keyed.items():
+            o_values = o_keyed.get(key)
+            if o_values is None:
+                continue
+            changed = {col: [s_values.get(col, ''), o_values.get(col, '')] for col in columns
+                       if s_values.get(col, '') != o_values.get(col, '')}
+            if changed:
+                section.changed[key] = changed
+
+        if section.total_diffs or section.duplicate_keys:
+            diff.sections.append(section)
+
+    return diff
+
+
+def log_diff(diff, max_logged=5):
+    """
+    Logs a summary of a SettlementDiff, with the first few changed cells at debug level.
+    """
+    if diff.settlement_sections != diff.output_sections:
+        logger.debug(f"Table count difference: {diff.settlement_sections} vs {diff.output_sections}")
+    logged = 0
+    for section in diff.sections:
+        if section.columns_only_in_settlement or section.columns_only_in_output:
+            logger.debug(f"Section {section.index}: columns only in settlement {section.columns_only_in_settlement}, "
+                         f"only in output {section.columns_only_in_output}")
+        if section.rows_only_in_settlement:
+            logger.debug(f"Section {section.index}: rows only in settlement file: {section.rows_only_in_settlement}")
+        if section.rows_only_in_output:
+            logger.debug(f"Section {section.index}: rows only in output file: {section.rows_only_in_output}")
+        if section.changed_duplicates:
+            logger.debug(f"Section {section.index}: repeated rows differ for {section.changed_duplicates}")
+        for key, columns in section.changed.items():
+            for col, (v1, v2) in columns.items():
+                if logged < max_logged:
+                    logger.debug(f"    {key} / {col}: '{v1}' vs '{v2}'")
+                logged += 1
+    if logged > max_logged:
+        logger.debug(f"\n... and {logged - max_logged} more changed values")
+    logger.debug(f"Total differences found: {diff.total_diffs}")
@@ -0,0 +1,183 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import namedtuple
+from settings import (REQUEST_HEADERS, HTTP_TIMEOUT, DOWNLOAD_CHUNK_SIZE, DOWNLOAD_RESUME_ATTEMPTS,
+                      DOWNLOAD_POOL_SIZE)
+
+logger = logging.getLogger(__name__)
+
+Download = namedtuple('Download', ['status', 'path', 'sha256', 'size', 'etag', 'last_modified'])
+
+
+def create_pooled_session(pool_size=DOWNLOAD_POOL_SIZE):
+    """
+    Creates a session with browser-like headers whose connection pool keeps up to pool_size
+    keep-alive connections per host, so concurrent and repeated downloads reuse connections.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    session.headers.update(REQUEST_HEADERS)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+_default_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Returns the process-wide pooled session, creating it on first use.
+    """
+    global _default_session
+    with _session_lock:
+        if _default_session is None:
+            _default_session = create_pooled_session()
+        return _default_session
+
+
+def _load_validators(part_path):
+    try:
+        with open(part_path + '.json', 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_validators(part_path, etag, last_modified):
+    with open(part_path + '.json', 'w', encoding='utf-8') as f:
+        json.dump({'etag': etag, 'last_modified': last_modified}, f)
+
+
+def _remove_partial(part_path):
+    for path in (part_path, part_path + '.json'):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _hash_existing(path, chunk_size):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest
+
+
+def _range_start(content_range):
+    """
+    Returns the first byte position of a "bytes start-end/size" Content-Range, or None.
+    """
+    unit, _, spec = (content_range or '').partition(' ')
+    start = spec.split('-', 1)[0]
+    return int(start) if unit == 'bytes' and start.isdigit() else None
+
+
+def download(url, dest_path, session=None, headers=None, timeout=HTTP_TIMEOUT,
+             chunk_size=DOWNLOAD_CHUNK_SIZE, attempts=DOWNLOAD_RESUME_ATTEMPTS):
+    """
+    Streams a URL to dest_path in chunks, so memory use does not depend on the file size.
+
+    The body is written to dest_path + '.part' and renamed once complete. When the connection
+    drops mid-transfer, or a previous run left a .part file behind, the download resumes with
+    a Range request guarded by If-Range, so a file that changed on the server is fetched again
+    from the start instead of being spliced. The body is requested without content coding and
+    written as received, so the byte offsets of the .part file are those of the Range request;
+    a partial answer is only appended when its Content-Range starts where the file ends,
+    anything else restarts the download from zero.
+    Args:
+        url (str): The URL to download
+        dest_path (str): Final path of the file
+        session (requests.Session): Session to use; the pooled process-wide session if None
+        headers (dict): Extra request headers (e.g. If-None-Match for the first request)
+        timeout: (connect, read) timeout in seconds
+        chunk_size (int): Bytes read from the socket and written at a time
+        attempts (int): Connection attempts before giving up
+    Returns:
+        Download: status 304 (nothing written) or 200, with the file path, sha256, size and validators
+    Raises:
+        RuntimeError: If the server answers a request for the whole file with part of it
+    """
+    import requests
+    from urllib3.exceptions import ProtocolError, ReadTimeoutError
+
+    session = session or get_session()
+    part_path = dest_path + '.part'
+    os.makedirs(os.path.dirname(os.path.abspath(dest_path)), exist_ok=True)
+
+    attempt = 1
+    while True:
+        request_headers = dict(headers or {}, **{'Accept-Encoding': 'identity'})
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        validators = _load_validators(part_path) if offset else {}
+        validator = validators.get('etag') or validators.get('last_modified')
+        if offset and validator:
+            request_headers.pop('If-None-Match', None)
+            request_headers.pop('If-Modified-Since', None)
+            request_headers['Range'] = f"bytes={offset}-"
+            request_headers['If-Range'] = validator
+        elif offset:
+            # Without a validator a partial file cannot be trusted
+            _remove_partial(part_path)
+            offset = 0
+
+        try:
+            with session.get(url, headers=request_headers, timeout=timeout, stream=True) as response:
+                if response.status_code == 304:
+                    return Download(304, None, None, 0, response.headers.get('ETag'),
+                                    response.headers.get('Last-Modified'))
+                response.raise_for_status()
+
+                etag = response.headers.get('ETag')
+                last_modified = response.headers.get('Last-Modified')
+                # A server ignoring Accept-Encoding sends a coded body whose offsets are not those
+                # of the decoded file: it is decoded, and not kept for resuming
+                encoded = response.headers.get('Content-Encoding', 'identity').lower() != 'identity'
+                if response.status_code == 206:
+                    start = _range_start(response.headers.get('Content-Range'))
+                    if not offset and start != 0:
+                        raise RuntimeError(f"{url} answered bytes from {start} when the whole file was requested")
+                    if start != offset or encoded:
+                        logger.warning(f"{url} did not resume at byte {offset} "
+                                       f"(Content-Range {response.headers.get('Content-Range')}), downloading it again")
+                        _remove_partial(part_path)
+                        continue
+
+                if offset and response.status_code == 206:
+                    logger.info(f"Resuming {url} at byte {offset}")
+                    digest = _hash_existing(part_path, chunk_size)
+                    mode = 'ab'
+                else:
+                    digest = hashlib.sha256()
+                    mode = 'wb'
+                    _remove_partial(part_path)
+                    if not encoded:
+                        _save_validators(part_path, etag, last_modified)
+
+                if encoded:
+                    chunks = response.iter_content(chunk_size=chunk_size)
+                else:
+                    chunks = response.raw.stream(chunk_size, decode_content=False)
+                with open(part_path, mode) as f:
+                    for chunk in chunks:
+                        f.write(chunk)
+                        digest.update(chunk)
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError,
+                ProtocolError, ReadTimeoutError) as e:
+            if attempt == attempts:
+                raise
+            logger.warning(f"Download of {url} interrupted ({e}), attempt {attempt}/{attempts}")
+            attempt += 1
+            continue
+
+        size = os.path.getsize(part_path)
+        os.replace(part_path, dest_path)
+        _remove_partial(part_path)
+        logger.debug(f"Downloaded {url} ({size} bytes)")
+        return Download(200, dest_path, digest.hexdigest(), size, etag, last_modified)
@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from settings import (CHROME_OPTIONS, HEADLESS_MODE, DRIVER_CACHE_FILE, DRIVER_CACHE_MAX_AGE,
+                      DRIVER_POOL_SIZE)
+
+logger = logging.getLogger(__name__)
+
+
+def resolve_chromedriver_path(cache_file=DRIVER_CACHE_FILE, max_age=DRIVER_CACHE_MAX_AGE):
+    """
+    Returns the chromedriver path, resolving it through ChromeDriverManager only when the
+    cached path is missing, stale or no longer on disk.
+    Args:
+        cache_file (str): JSON file holding the last resolved path
+        max_age (float): Seconds after which the cached path is resolved again
+    Returns:
+        str: Path of the chromedriver executable
+    """
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if os.path.exists(cached['path']) and time.time() - cached['resolved_at'] < max_age:
+            return cached['path']
+    except (OSError, ValueError, KeyError):
+        pass
+
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    path = ChromeDriverManager().install()
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    with open(cache_file, 'w', encoding='utf-8') as f:
+        json.dump({'path': path, 'resolved_at': time.time()}, f)
+    logger.info(f"Resolved chromedriver at {path}")
+    return path
+
+
+def build_chrome_options():
+    """
+    Builds the incognito Chrome options with automatic downloads into OUTPUT_DIR.
+    """
+    from selenium.webdriver.chrome.options import Options
+
+    options = Options()
+    options.add_argument("--incognito")
+    options.add_argument("--headless=new" if HEADLESS_MODE else "--start-maximized")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    # Setting desired resolution
+    options.add_argument("window-size=1920,1080")
+    # Add these new preferences for automatic downloads
+    options.add_experimental_option("prefs", CHROME_OPTIONS)
+    return options
+
+
+def new_driver():
+    """
+    Starts a new Chrome browser using the cached chromedriver path.
+    Returns:
+        webdriver.Chrome: A new WebDriver instance
+    """
+    # Selenium is imported with the first browser, not with the module
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+
+    service = Service(resolve_chromedriver_path())
+    return webdriver.Chrome(service=service, options=build_chrome_options())
+
+
+def is_healthy(driver):
+    """
+    Checks that the browser session still answers commands.
+    """
+    try:
+        driver.execute_script("return 1")
+        return True
+    except Exception as e:
+        logger.debug(f"Browser session unhealthy: {str(e)}")
+        return False
+
+
+def reset_driver(driver):
+    """
+    Clears the session state so the browser can be reused without relaunching.
+    """
+    driver.delete_all_cookies()
+    driver.get("about:blank")
+
+
+class DriverPool:
+    """
+    Keeps up to `size` warm browsers. Sessions are health-checked before reuse and reset by
+    clearing cookies and navigating away instead of being relaunched.
+    """
+
+    def __init__(self, size=DRIVER_POOL_SIZE):
+        self.size = size
+        self._idle = []
+        self._in_use = 0
+        self._lock = threading.Condition()
+
+    def acquire(self):
+        """
+        Returns a healthy browser, reusing an idle one when possible. Blocks while `size`
+        browsers are in use.
+        """
+        with self._lock:
+            while self._in_use >= self.size:
+                self._lock.wait()
+            self._in_use += 1
+
+        while True:
+            with self._lock:
+                driver = self._idle.pop() if self._idle else None
+            if driver is None:
+                break
+            if is_healthy(driver):
+                logger.info("Reusing warm browser session")
+                return driver
+            self._quit(driver)
+
+        try:
+            start = time.monotonic()
+            driver = new_driver()
+            logger.info(f"Started new browser session in {time.monotonic() - start:.2f}s")
+            return driver
+        except Exception:
+            with self._lock:
+                self._in_use -= 1
+                self._lock.notify()
+            raise
+
+    def release(self, driver, discard=False):
+        """
+        Returns a browser to the pool, or quits it if it is discarded or cannot be reset.
+        """
+        if not discard:
+            try:
+                reset_driver(driver)
+            except Exception as e:
+                logger.warning(f"Could not reset browser session, discarding it: {str(e)}")
+                discard = True
+        if discard:
+            self._quit(driver)
+
+        with self._lock:
+            self._in_use -= 1
+            if not discard:
+                self._idle.append(driver)
+            self._lock.notify()
+
+    @contextmanager
+    def session(self):
+        """
+        Context manager form of acquire/release.
+        """
+        driver = self.acquire()
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def _quit(self, driver):
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.debug(f"Error closing browser: {str(e)}")
+
+    def close(self):
+        """
+        Quits all idle browsers.
+        """
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for driver in idle:
+            self._quit(driver)
+
+
+_default_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_driver_pool():
+    """
+    Returns the process-wide driver pool, creating it on first use.
+    """
+    global _default_pool
+    with _pool_lock:
+        if _default_pool is None:
+            _default_pool = DriverPool()
+        return _default_pool
@@ -1,12 +1,13 @@
 import os
-import pandas as pd
-from bs4 import BeautifulSoup
 import csv
 import logging
 from settings import OUTPUT_DIR, LOGS_DIR
+from utils.table_parser import parse_xls_export
+from utils.instrumentation import instrumented
 
 logger = logging.getLogger(__name__)
 
+@instrumented()
 def clean_xls_files():
     """
     Converts all XLS files in output folder to CSVs with cleaned data, replacing original files
@@ -20,46 +21,15 @@ def clean_xls_files():
             csv_path = os.path.join(output_folder, csv_filename)
             
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
+                with open(file_path, 'rb') as f:
                     html_content = f.read()
                 
                 # Extract year and month from filename
                 year = filename.split('_')[1]
                 month = filename.split('_')[2].split('.')[0]
                 
-                # Parse HTML tables
-                soup = BeautifulSoup(html_content, 'html.parser')
-                tables = soup.find_all('table')
-                
-                # Process main table
-                main_table_data = []
-                main_table = tables[0]
-                main_table_data.append([
-                    th.get_text(strip=True)
-                    .replace('\n', ' ')
-                    for th in main_table.find('tr').find_all('th')
-                ])
-                for row in main_table.find_all('tr')[1:]:
-                    main_table_data.append([
-                        td.get_text(strip=True) 
-                        for td in row.find_all('td')
-                    ])
-                
-                # Process timing table
-                timing_table_data = []
-                if len(tables) > 1:
-                    timing_table = tables[1]
-                    timing_table_data.append([
-                        th.get_text(strip=True)
-                        .replace('\n', ' ')
-                        .replace(',', ';')
-                        for th in timing_table.find('tr').find_all('th')
-                    ])
-                    for row in timing_table.find_all('tr')[1:]:
-                        timing_table_data.append([
-                            td.get_text(strip=True) 
-                            for td in row.find_all('td')
-                        ])
+                # Parse the main and timing tables
+                main_table_data, timing_table_data = parse_xls_export(html_content)
                 
                 # Write to CSV with proper formatting
                 with open(csv_path, 'w', newline='', encoding='utf-8') as csvfile:
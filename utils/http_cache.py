@@ -0,0 +1,198 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import namedtuple, Counter
+from settings import HTTP_CACHE_DIR, HTTP_CACHE_MAX_BYTES, HTTP_TIMEOUT
+from utils.downloader import download
+
+logger = logging.getLogger(__name__)
+
+CacheEntry = namedtuple('CacheEntry', ['path', 'sha256', 'not_modified'])
+
+
+class HttpCache:
+    """
+    On-disk cache of downloaded documents keyed by URL.
+
+    Bodies are stored once per content hash under `blobs/`. The index keeps, per URL, the
+    content hash and the ETag and Last-Modified used for conditional requests. Blobs are
+    evicted least recently used first once the cache grows beyond `max_bytes`, except those
+    pinned by a fetch in progress or by a caller still reading them (fetch with pin=True).
+    """
+
+    def __init__(self, cache_dir=HTTP_CACHE_DIR, max_bytes=HTTP_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.blob_dir = os.path.join(cache_dir, 'blobs')
+        self.index_path = os.path.join(cache_dir, 'index.json')
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._pins = Counter()  # sha256 -> number of fetches and callers using the blob
+        os.makedirs(self.blob_dir, exist_ok=True)
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self._index = json.load(f)
+        except (OSError, ValueError):
+            self._index = {}
+
+    def _save_index(self):
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def _blob_path(self, sha256):
+        return os.path.join(self.blob_dir, sha256)
+
+    def _record(self, key, sha256, size, etag=None, last_modified=None):
+        entry = self._index.setdefault(key, {})
+        entry.update(sha256=sha256, size=size, etag=etag, last_modified=last_modified,
+                     last_access=time.time())
+        self._evict()
+        self._save_index()
+
+    def _pin(self, sha256):
+        self._pins[sha256] += 1
+
+    def release(self, sha256):
+        """
+        Releases a blob pinned by fetch(pin=True), so it can be evicted again.
+        """
+        with self._lock:
+            self._pins[sha256] -= 1
+            if self._pins[sha256] <= 0:
+                del self._pins[sha256]
+
+    def _resume_path(self, url):
+        return os.path.join(self.blob_dir, hashlib.sha256(url.encode('utf-8')).hexdigest() + '.download')
+
+    @staticmethod
+    def _move_partial(src, dst):
+        """
+        Moves the partial body (and its validators) that utils.downloader keeps next to a
+        download path. The rename is atomic, so only one fetch can take over a partial body.
+        """
+        for suffix in ('.part', '.part.json'):
+            try:
+                os.replace(src + suffix, dst + suffix)
+            except FileNotFoundError:
+                if suffix == '.part':
+                    return
+
+    def _adopt_blob(self, tmp_path, sha256):
+        """
+        Moves a downloaded file to its content-addressed blob path (or drops it if the blob exists).
+        """
+        path = self._blob_path(sha256)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, path)
+
+    def fetch(self, url, session=None, headers=None, timeout=HTTP_TIMEOUT, pin=False):
+        """
+        Downloads a URL, sending If-None-Match / If-Modified-Since when a cached copy exists.
+        The body is streamed to disk in chunks (see utils.downloader) and an interrupted
+        download is resumed on the next fetch.
+        Args:
+            url (str): The URL to fetch
+            session (requests.Session): Optional session to send the request with
+            headers (dict): Extra request headers
+            timeout: Request timeout passed to requests
+            pin (bool): Keep the returned blob from being evicted until release(sha256) is called
+        Returns:
+            CacheEntry: Path of the cached body, its sha256 and whether the server answered 304
+        """
+        request_headers = dict(headers or {})
+        with self._lock:
+            entry = self._index.get(url, {})
+            cached = entry.get('sha256') and os.path.exists(self._blob_path(entry['sha256']))
+            if cached:
+                # Another fetch could evict the cached copy while this one waits for a 304
+                cached = entry['sha256']
+                self._pin(cached)
+                if entry.get('etag'):
+                    request_headers['If-None-Match'] = entry['etag']
+                if entry.get('last_modified'):
+                    request_headers['If-Modified-Since'] = entry['last_modified']
+
+        # Every fetch downloads to its own file. A partial body left by an interrupted fetch of
+        # the URL is taken over and resumed, and handed back if this fetch is interrupted too.
+        fd, tmp_path = tempfile.mkstemp(suffix='.download', dir=self.blob_dir)
+        os.close(fd)
+        resume_path = self._resume_path(url)
+        self._move_partial(resume_path, tmp_path)
+        try:
+            result = download(url, tmp_path, session=session, headers=request_headers, timeout=timeout)
+        except BaseException:
+            self._move_partial(tmp_path, resume_path)
+            os.remove(tmp_path)
+            if cached:
+                self.release(cached)
+            raise
+
+        if result.status == 304:
+            os.remove(tmp_path)
+            if not cached:
+                raise RuntimeError(f"{url} answered 304 but no cached copy exists")
+            logger.info(f"Not modified, using cached copy of {url}")
+            with self._lock:
+                entry['last_access'] = time.time()
+                self._save_index()
+                if not pin:
+                    self.release(cached)
+            return CacheEntry(self._blob_path(cached), cached, True)
+
+        with self._lock:
+            self._adopt_blob(result.path, result.sha256)
+            self._pin(result.sha256)
+            if cached:
+                self.release(cached)
+            self._record(url, result.sha256, result.size, etag=result.etag, last_modified=result.last_modified)
+            if not pin:
+                self.release(result.sha256)
+        return CacheEntry(self._blob_path(result.sha256), result.sha256, False)
+
+    def _evict(self):
+        """
+        Deletes least recently used blobs until the cache fits in max_bytes, skipping pinned ones.
+        Evicted entries lose their validators, so the next fetch is unconditional.
+        """
+        blobs = {}
+        for key, entry in self._index.items():
+            sha256 = entry.get('sha256')
+            if sha256:
+                blob = blobs.setdefault(sha256, {'size': entry.get('size', 0), 'last_access': 0, 'keys': []})
+                blob['last_access'] = max(blob['last_access'], entry.get('last_access', 0))
+                blob['keys'].append(key)
+
+        total = sum(blob['size'] for blob in blobs.values())
+        for sha256, blob in sorted(blobs.items(), key=lambda item: item[1]['last_access']):
+            if total <= self.max_bytes:
+                break
+            if self._pins[sha256]:
+                continue
+            try:
+                os.remove(self._blob_path(sha256))
+            except FileNotFoundError:
+                pass
+            total -= blob['size']
+            for key in blob['keys']:
+                del self._index[key]
+            logger.debug(f"Evicted cached blob {sha256}")
+
+
+_default_cache = None
+
+
+def get_http_cache():
+    """
+    Returns the process-wide HTTP cache, creating it on first use.
+    """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = HttpCache()
+    return _default_cache
@@ -0,0 +1,204 @@
+import re
+import logging
+import requests
+from bs4 import BeautifulSoup
+from settings import REQUEST_HEADERS, HTTP_TIMEOUT
+from utils.table_parser import parse_settlement_tables
+from utils.retry_mechanism import retry, register_error_kind
+
+logger = logging.getLogger(__name__)
+
+SETTLEMENT_CAL_ID = 'ContentPlaceHolder1_ddlsetllementcal'
+YEAR_ID = 'ContentPlaceHolder1_ddlYear'
+MONTH_ID = 'ContentPlaceHolder1_ddlMonth'
+GO_BUTTON_ID = 'ContentPlaceHolder1_btnGo'
+DOWNLOAD_ID = 'ContentPlaceHolder1_imgDownload'
+
+_DO_POSTBACK_RE = re.compile(r"__doPostBack\('([^']*)','([^']*)'\)")
+
+
+class ElementNotFoundError(RuntimeError):
+    """A control is missing from the returned page, usually an error or maintenance page."""
+
+
+register_error_kind(ElementNotFoundError, 'element_not_found')
+
+
+class PostbackForm:
+    """
+    Replays an ASP.NET WebForms page over plain HTTP.
+
+    Keeps the hidden state fields (__VIEWSTATE, __EVENTVALIDATION, ...) and the current
+    control values of the last response, so each postback is sent exactly like the browser would.
+    """
+
+    def __init__(self, session, url, html):
+        self.session = session
+        self.url = url
+        self._load(html)
+
+    def _load(self, html):
+        self.html = html
+        self.soup = BeautifulSoup(html, 'html.parser')
+        form = self.soup.find('form') or self.soup
+        self.fields = {}
+        for tag in form.find_all('input'):
+            name = tag.get('name')
+            if name and tag.get('type', 'text').lower() in ('hidden', 'text'):
+                self.fields[name] = tag.get('value', '')
+        for tag in form.find_all('select'):
+            name = tag.get('name')
+            if not name:
+                continue
+            selected = tag.find('option', selected=True) or tag.find('option')
+            self.fields[name] = selected.get('value', '') if selected else ''
+
+    def _element(self, element_id):
+        tag = self.soup.find(id=element_id)
+        if tag is None:
+            raise ElementNotFoundError(f"Element {element_id} not found on {self.url}")
+        return tag
+
+    def _post(self, data):
+        wait_turn(self.session)
+        response = self.session.post(self.url, data=data, headers=REQUEST_HEADERS, timeout=HTTP_TIMEOUT)
+        response.raise_for_status()
+        return response
+
+    def select(self, element_id, value):
+        """
+        Selects a dropdown value, posting back if the dropdown has AutoPostBack enabled.
+        Args:
+            element_id (str): The id attribute of the <select>
+            value (str): The option value to select
+        """
+        tag = self._element(element_id)
+        name = tag['name']
+        values = [option.get('value') for option in tag.find_all('option')]
+        if value not in values:
+            raise ValueError(f"Value '{value}' not available in {element_id}")
+        if self.fields.get(name) == value:
+            return
+
+        if '__doPostBack' in tag.get('onchange', ''):
+            # The field is only updated by the page the postback returns, so a failed post
+            # leaves the form as it was and a retry posts back again
+            data = dict(self.fields, **{name: value}, __EVENTTARGET=name, __EVENTARGUMENT='')
+            self._load(self._post(data).text)
+        else:
+            self.fields[name] = value
+
+    def _submit_data(self, element_id):
+        tag = self._element(element_id)
+        data = dict(self.fields)
+        if tag.name == 'a':
+            match = _DO_POSTBACK_RE.search(tag.get('href', ''))
+            if not match:
+                raise RuntimeError(f"Element {element_id} does not trigger a postback")
+            data['__EVENTTARGET'], data['__EVENTARGUMENT'] = match.groups()
+        elif tag.get('type', '').lower() == 'image':
+            data[f"{tag['name']}.x"] = '1'
+            data[f"{tag['name']}.y"] = '1'
+        else:
+            data[tag['name']] = tag.get('value', '')
+        return data
+
+    def submit(self, element_id):
+        """
+        Clicks a submit control and loads the returned page as the new form state.
+        Args:
+            element_id (str): The id attribute of the button/link to click
+        Returns:
+            str: HTML of the returned page
+        """
+        self._load(self._post(self._submit_data(element_id)).text)
+        return self.html
+
+    def download(self, element_id):
+        """
+        Clicks a control that answers with a file instead of a page. The form state is kept.
+        Args:
+            element_id (str): The id attribute of the download button/link
+        Returns:
+            bytes: The raw response body
+        """
+        return self._post(self._submit_data(element_id)).content
+
+
+def create_session(rate_limiter=None):
+    """
+    Creates a requests session carrying the browser-like default headers.
+    Args:
+        rate_limiter: Object whose wait() is called before every request of the session
+                      (e.g. backfill.RateLimiter), or None
+    Returns:
+        requests.Session: A new session
+    """
+    session = requests.Session()
+    session.headers.update(REQUEST_HEADERS)
+    session.rate_limiter = rate_limiter
+    return session
+
+
+def wait_turn(session):
+    """
+    Waits for the rate limiter of a session created by create_session, if it has one.
+    """
+    limiter = getattr(session, 'rate_limiter', None)
+    if limiter is not None:
+        limiter.wait()
+
+
+@retry('open_settlement_form', circuit='bse_http')
+def open_settlement_form(session, url):
+    """
+    Loads the settlement calendar page and selects the Equity T + 1 calendar.
+    Args:
+        session (requests.Session): HTTP session used for all postbacks
+        url (str): The settlement calendar URL
+    Returns:
+        PostbackForm: Form ready for month selection
+    """
+    wait_turn(session)
+    response = session.get(url, headers=REQUEST_HEADERS, timeout=HTTP_TIMEOUT)
+    response.raise_for_status()
+    form = PostbackForm(session, url, response.text)
+
+    # Equity T + 1
+    form.select(SETTLEMENT_CAL_ID, "0")
+    return form
+
+
+@retry('scrape_month', circuit='bse_http')
+def fetch_settlement_month(form, year, month, download=True):
+    """
+    Replays the Year/Month selection and Go click, then parses the settlement tables.
+    Args:
+        form (PostbackForm): Form returned by open_settlement_form
+        year (int): The year to fetch
+        month (int): The month to fetch (1-12)
+        download (bool): Also replay the download click for the XLS export
+    Returns:
+        tuple: (table_data, xls_bytes) where xls_bytes is None when no data or download is False
+    """
+    form.select(YEAR_ID, str(year))
+    form.select(MONTH_ID, str(month).zfill(2))
+    html = form.submit(GO_BUTTON_ID)
+
+    table_data = parse_settlement_tables(html)
+    if not table_data or len(table_data) <= 1 or not download:
+        return table_data, None
+
+    # The download is part of this attempt; the retried download_settlement_xls would retry it
+    # again inside each attempt
+    return table_data, form.download(DOWNLOAD_ID)
+
+
+@retry('download_xls', circuit='bse_http')
+def download_settlement_xls(form):
+    """
+    Replays the download click for the month currently shown on the form.
+    Returns:
+        bytes: The XLS (HTML) export
+    """
+    return form.download(DOWNLOAD_ID)
@@ -0,0 +1,243 @@
+import os
+import json
+import shutil
+import time
+import cProfile
+import logging
+import functools
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from settings import METRICS_PATH, METRICS_MAX_BYTES, METRICS_TRACE_MEMORY, PROFILE_DIR
+
+try:
+    import resource
+except ImportError:  # not available on Windows, max RSS is then left out
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+RUN_ID = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+
+_write_lock = threading.Lock()
+_state_lock = threading.Lock()
+_active = []  # measurements in progress, to carry tracemalloc peaks across nested stages
+_running = []  # every measurement in progress, to flag stages overlapping from other threads
+_owns_tracing = False  # tracemalloc was started by measure(), and is stopped when no stage is traced
+_local = threading.local()
+_profile_dir = None
+
+
+def _max_rss_bytes():
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _children_cpu():
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def write_metric(record, path=None):
+    """
+    Appends one JSON record to the metrics file (METRICS_PATH by default). Past
+    METRICS_MAX_BYTES the file is moved to <path>.1, so a long-running process keeps at most
+    twice that on disk.
+    """
+    path = path or METRICS_PATH
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    line = json.dumps(record, default=str)
+    with _write_lock:
+        if METRICS_MAX_BYTES and os.path.exists(path) and os.path.getsize(path) >= METRICS_MAX_BYTES:
+            os.replace(path, path + '.1')
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+
+class _Measurement:
+    def __init__(self, stage, labels):
+        self.stage = stage
+        self.labels = labels
+        self.peak = 0
+        self.wall = None
+        self.cpu = None
+        self.children_cpu = None
+        self.status = None
+        self.thread = threading.get_ident()
+        self.overlapping = set()  # stages that ran in other threads at the same time
+
+    def observe_peak(self, peak):
+        self.peak = max(self.peak, peak)
+
+
+def _observe_peak():
+    """
+    Hands the tracemalloc peak so far to every active measurement and starts a new peak window.
+    Called on each stage boundary, so outer stages keep the peaks seen inside inner ones.
+    """
+    peak = tracemalloc.get_traced_memory()[1]
+    for measurement in _active:
+        measurement.observe_peak(peak)
+    tracemalloc.reset_peak()
+
+
+@contextmanager
+def measure(stage, **labels):
+    """
+    Records wall time, CPU time of the calling thread and peak memory of a block, and appends
+    them to METRICS_PATH as one JSON line. With METRICS_TRACE_MEMORY the peak is the highest
+    Python allocation total (tracemalloc) during the block, tracing only while a measured block
+    runs; the process max RSS is always added
+    where the platform provides it. Failures are recorded too, and re-raised. The yielded
+    measurement holds the wall, cpu and peak values once the block has exited.
+
+    Two values are approximations. cpu_s is the CPU time of the calling thread only; the CPU
+    of worker processes reaped during the block (process pools) is added as children_cpu_s.
+    The peak, max RSS and children_cpu_s are process-wide: when stages run at the same time in
+    other threads they are shared, and the record lists those stages under 'overlapping'.
+
+        with measure('compare_folders', files=12):
+            ...
+    """
+    global _owns_tracing
+    trace = METRICS_TRACE_MEMORY
+    measurement = _Measurement(stage, labels)
+    if trace:
+        with _state_lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _owns_tracing = True
+            _observe_peak()
+            _active.append(measurement)
+
+    with _state_lock:
+        for other in _running:
+            if other.thread != measurement.thread:
+                other.overlapping.add(stage)
+                measurement.overlapping.add(other.stage)
+        _running.append(measurement)
+
+    profiler = _start_stage_profiler()
+    status, error = 'ok', None
+    wall_start, cpu_start, children_start = time.perf_counter(), time.thread_time(), _children_cpu()
+    try:
+        yield measurement
+    except BaseException as e:
+        status, error = 'error', str(e)
+        raise
+    finally:
+        wall = time.perf_counter() - wall_start
+        cpu = time.thread_time() - cpu_start
+        measurement.wall, measurement.cpu, measurement.status = wall, cpu, status
+        if children_start is not None:
+            measurement.children_cpu = _children_cpu() - children_start
+        with _state_lock:
+            _running.remove(measurement)
+        if profiler:
+            _stop_stage_profiler(profiler, stage)
+        if trace:
+            with _state_lock:
+                _observe_peak()
+                _active.remove(measurement)
+                if not _active and _owns_tracing:
+                    # Tracing slows every allocation, so it only runs while a traced stage does
+                    tracemalloc.stop()
+                    _owns_tracing = False
+
+        record = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'run_id': RUN_ID,
+            'stage': stage,
+            'status': status,
+            'wall_s': round(wall, 6),
+            'cpu_s': round(cpu, 6),
+            'children_cpu_s': round(measurement.children_cpu, 6) if measurement.children_cpu is not None else None,
+            'peak_mem_bytes': measurement.peak if trace else None,
+            'max_rss_bytes': _max_rss_bytes(),
+        }
+        if labels:
+            record['labels'] = labels
+        if measurement.overlapping:
+            record['overlapping'] = sorted(measurement.overlapping)
+        if error:
+            record['error'] = error
+        try:
+            write_metric(record)
+        except OSError as e:
+            logger.warning(f"Could not write metrics for {stage}: {e}")
+        logger.debug(f"{stage}: {wall:.3f}s wall, {cpu:.3f}s cpu")
+
+
+def instrumented(stage=None):
+    """
+    Decorator form of measure(); the stage name defaults to the function name.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with measure(stage or func.__name__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _start_stage_profiler():
+    """
+    While a profiled run is active, profiles the outermost stage of each thread (cProfile only
+    sees the thread it is enabled in, and only one profiler can be active per thread).
+    """
+    if _profile_dir is None or getattr(_local, 'profiling', False):
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:  # another profiler is already active in this thread
+        return None
+    _local.profiling = True
+    return profiler
+
+
+def _stop_stage_profiler(profiler, stage):
+    profiler.disable()
+    _local.profiling = False
+    path = os.path.join(_profile_dir, f"{stage}-{threading.get_ident()}-{time.perf_counter_ns()}.prof")
+    profiler.dump_stats(path)
+
+
+@contextmanager
+def profile_run(enabled=True, profile_dir=PROFILE_DIR):
+    """
+    Profiles a whole run with cProfile. Each instrumented stage running in another thread is
+    profiled separately, and the per-stage dumps are merged into <profile_dir>/<run id>.prof at the end
+    (open it with `python -m pstats` or snakeviz).
+    """
+    global _profile_dir
+    if not enabled:
+        yield None
+        return
+
+    import pstats
+
+    run_dir = os.path.join(profile_dir, RUN_ID)
+    os.makedirs(run_dir, exist_ok=True)
+    _profile_dir = run_dir
+    profiler = _start_stage_profiler()
+    try:
+        yield run_dir
+    finally:
+        if profiler:
+            _stop_stage_profiler(profiler, 'run')
+        _profile_dir = None
+        parts = [os.path.join(run_dir, name) for name in sorted(os.listdir(run_dir)) if name.endswith('.prof')]
+        if parts:
+            stats = pstats.Stats(parts[0])
+            for part in parts[1:]:
+                stats.add(part)
+            path = os.path.join(profile_dir, f"{RUN_ID}.prof")
+            stats.dump_stats(path)
+            logger.info(f"Profile written to {path}")
+        shutil.rmtree(run_dir, ignore_errors=True)
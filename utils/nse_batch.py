@@ -0,0 +1,140 @@
+import os
+import re
+import logging
+import argparse
+from urllib.parse import urljoin, urlparse
+from concurrent.futures import ThreadPoolExecutor
+from settings import (LOGS_DIR, PDF_WORKERS, REQUEST_HEADERS, HTTP_TIMEOUT, NSE_CIRCULARS,
+                      NSE_CIRCULAR_INDEX_URL, NSE_CIRCULAR_URL_TEMPLATE, NSE_CIRCULAR_PATTERN, NSE_BATCH_WORKERS)
+from utils.pdf_extraction import load_pdf
+from utils.downloader import create_pooled_session, get_session
+
+logger = logging.getLogger(__name__)
+
+# A .pdf link in a quoted attribute or JSON string, or an unquoted href/src; not link text
+_PDF_LINK_RE = re.compile(r'(?:["\']|\b(?:href|src)=)([^\s"\'<>()]+\.pdf)(?=["\'\s>])', re.IGNORECASE)
+
+
+def circular_url(ref):
+    """
+    Returns the PDF URL of a circular given either its URL or its id (e.g. 'CMPT66953').
+    """
+    ref = ref.strip()
+    if urlparse(ref).scheme:
+        return ref
+    return NSE_CIRCULAR_URL_TEMPLATE.format(re.sub(r'\.pdf$', '', ref, flags=re.IGNORECASE))
+
+
+def circular_name(url):
+    """
+    Returns the circular id of a PDF URL, used as its output folder name under NSE/.
+    """
+    return url.split("/")[-1].split(".")[0]
+
+
+def read_circular_list(path):
+    """
+    Reads circular URLs or ids from a text file, one per line. Blank lines and # comments are ignored.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+
+def discover_circulars(content, base_url, pattern=NSE_CIRCULAR_PATTERN):
+    """
+    Finds the circular PDFs linked from an NSE circular index page. Both HTML pages and the JSON
+    returned by the circulars API work, since links are matched in the raw text.
+    Args:
+        content (str): The index page
+        base_url (str): URL of the page, to resolve relative links
+        pattern (str): Regex a PDF file name must match to count as a settlement circular
+    Returns:
+        list: Absolute PDF URLs, in page order without duplicates
+    """
+    name_re = re.compile(pattern, re.IGNORECASE)
+    urls = []
+    for link in _PDF_LINK_RE.findall(content.replace('\\/', '/')):
+        url = urljoin(base_url, link)
+        if name_re.search(url.rsplit('/', 1)[-1]) and url not in urls:
+            urls.append(url)
+    return urls
+
+
+def discover_from_index(index_url, session=None, pattern=NSE_CIRCULAR_PATTERN):
+    """
+    Downloads a circular index page and returns the circular URLs it links to.
+    """
+    response = (session or get_session()).get(index_url, headers=REQUEST_HEADERS, timeout=HTTP_TIMEOUT)
+    response.raise_for_status()
+    urls = discover_circulars(response.text, index_url, pattern)
+    logger.info(f"Discovered {len(urls)} circulars on {index_url}")
+    return urls
+
+
+def load_circulars(refs, workers=NSE_BATCH_WORKERS, session=None):
+    """
+    Downloads and extracts several circulars concurrently, each into NSE/<circular>/.
+    All downloads share one pooled session, with a keep-alive connection per thread. The PDF
+    page workers are divided between the circulars running at the same time so the machine
+    is not oversubscribed.
+    Args:
+        refs (list): Circular URLs or ids
+        workers (int): Circulars processed at the same time
+        session (requests.Session): Session to reuse; a pooled one is created if None
+    Returns:
+        dict: Circular name -> True if it was extracted (or unchanged), False otherwise
+    """
+    urls = list(dict.fromkeys(circular_url(ref) for ref in refs))
+    if not urls:
+        return {}
+    workers = max(1, min(workers, len(urls)))
+    session = session or create_pooled_session(workers)
+    pdf_workers = max(1, PDF_WORKERS // workers)
+
+    logger.info(f"Loading {len(urls)} circulars with {workers} workers")
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {circular_name(url): executor.submit(load_pdf, url, circular_name(url), session, pdf_workers)
+                   for url in urls}
+        results = {name: bool(future.result()) for name, future in futures.items()}
+
+    failed = [name for name, ok in results.items() if not ok]
+    if failed:
+        logger.error(f"Failed circulars: {', '.join(failed)}")
+    return results
+
+
+def configured_circulars(session=None):
+    """
+    Returns the circulars of a scheduled run: NSE_CIRCULARS plus those discovered on NSE_CIRCULAR_INDEX_URL.
+    """
+    refs = list(NSE_CIRCULARS)
+    if NSE_CIRCULAR_INDEX_URL:
+        refs += discover_from_index(NSE_CIRCULAR_INDEX_URL, session)
+    return refs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download and extract NSE settlement circulars.")
+    parser.add_argument('circulars', nargs='*', help="Circular URLs or ids (default: NSE_CIRCULARS)")
+    parser.add_argument('--file', help="Text file with one circular URL or id per line")
+    parser.add_argument('--index', help="Circular index page to discover circulars from")
+    parser.add_argument('--workers', type=int, default=NSE_BATCH_WORKERS)
+    args = parser.parse_args()
+
+    os.makedirs(LOGS_DIR, exist_ok=True)
+    logging.basicConfig(
+        filename=os.path.join(LOGS_DIR, 'nse_batch.log'),
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        filemode='a'
+    )
+    session = create_pooled_session(args.workers)
+    refs = list(args.circulars)
+    if args.file:
+        refs += read_circular_list(args.file)
+    if args.index:
+        refs += discover_from_index(args.index, session)
+    if not (args.circulars or args.file or args.index):
+        refs = configured_circulars(session)
+    results = load_circulars(refs, workers=args.workers, session=session)
+    print(f"{sum(results.values())}/{len(results)} circulars extracted")
@@ -1,160 +1,331 @@
-import pdfplumber
-import pandas as pd
-import requests 
 import io 
 import os
-from datetime import datetime
+import json
+import mmap
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
 import logging
-from settings import (PDF_URL,PDF_OUTBOUND_FOLDER,PDF_SETTLEMENT_COL,PDF_SETTLEMENT_DATE_COL)
+from settings import (PDF_OUTBOUND_FOLDER,PDF_SETTLEMENT_COL,PDF_SETTLEMENT_DATE_COL,
+                      PDF_WORKERS,PDF_PARALLEL_MIN_PAGES,PDF_LAYOUT_EXTRACTION,PDF_CATALOG_NAME,
+                      REQUEST_HEADERS,PROCESS_START_METHOD)
+from utils.http_cache import get_http_cache
+from utils.run_manifest import get_run_manifest
+from utils.retry_mechanism import call_with_retry
+from utils.date_utils import reformat_date, NSE_DATE_FORMAT, PUBLISH_DATE_FORMAT
+from utils.columnar_sink import write_partitions_by_date
+from utils.instrumentation import instrumented
+from utils.pdf_layout import ANNEXURE_RE, find_annexure, learn_layout, extract_with_layout, get_layout_cache
 
 logger = logging.getLogger(__name__)
 
-def extract_pdf_data(pdf_file, pdf_file_name, outbound=PDF_OUTBOUND_FOLDER):
+def _fold_annexure_a(table):
+    """
+    Folds the unlabelled sub-columns of an Annexure A table into its labelled columns: the
+    header keeps the labelled cells, each row keeps its first cell and the next five non-empty
+    ones, the note of a last row with an empty first cell moves from the second cell to the
+    first, and columns left empty in every row are dropped.
+    """
+    if len(table) < 4:
+        return table
+    header = [col for col in table[2] if (col or '').replace('\n', ' ').strip()]
+    rows = [list(row) for row in table[3:]]
+    if not rows[-1][0]:
+        # A table without a note ends on a settlement row, which must stay as it is
+        rows[-1][0], rows[-1][1] = rows[-1][1], None
+    folded = []
+    for row in rows:
+        if not any(row):
+            continue
+        rest = [x for x in row[1:] if x and str(x).strip()]
+        row = ([row[0]] + rest[:5])[:len(header)]
+        folded.append(row + [None] * (len(header) - len(row)))
+    keep = [column for column in range(len(header)) if any(row[column] is not None for row in folded)]
+    return table[:2] + [[header[column] for column in keep]] + [[row[column] for column in keep] for row in folded]
+
+
+def _extract_page_full(page):
+    """
+    Extracts the tables of a page the slow way: full-page text and the table finder with
+    default settings. Used for pages without an annexure title at the top or that no layout fits.
+    """
+    tables = page.extract_tables()
+    if "Annexure 'A'" in (page.extract_text() or ''):
+        tables = [_fold_annexure_a(table) for table in tables]
+    return tables
+
+
+def _fold(annexure, table):
+    # Folded on both paths, so they write the same rows as the table finder did
+    return _fold_annexure_a(table) if annexure == 'A' else table
+
+
+def _extract_page(page, layouts):
+    """
+    Extracts the tables of a single page. A page whose top carries an annexure title is
+    extracted on the cached layout of that annexure, learned from the page first when there
+    is none yet or the page no longer matches it.
+    Args:
+        layouts (dict): Annexure name -> layout; newly learned layouts are added to it
+    Returns:
+        tuple: (tables, learned) where learned is (annexure, layout) if a layout was learned
+    """
+    annexure = find_annexure(page) if PDF_LAYOUT_EXTRACTION else None
+    if annexure:
+        layout = layouts.get(annexure)
+        table = extract_with_layout(page, layout) if layout else None
+        if table is not None:
+            return [_fold(annexure, table)], None
+        layout = learn_layout(page)
+        table = extract_with_layout(page, layout) if layout else None
+        if table is not None:
+            layouts[annexure] = layout
+            return [_fold(annexure, table)], (annexure, layout)
+        logger.warning(f"No table layout fits page {page.page_number} (Annexure '{annexure}'), "
+                       f"extracting it with the table finder")
+    return _extract_page_full(page), None
+
+
+@contextmanager
+def _open_pdf(source):
+    """
+    Opens a PDF given as a path or as bytes. Files are memory-mapped, so pdfplumber reads pages
+    straight from the OS page cache instead of from a copy of the whole file.
+    """
+    import pdfplumber
+
+    if isinstance(source, (bytes, bytearray)):
+        with pdfplumber.open(io.BytesIO(source)) as pdf:
+            yield pdf
+        return
+    with open(source, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        with pdfplumber.open(mapped) as pdf:
+            yield pdf
+
+
+def _extract_page_range(source, start, stop, layouts):
+    """
+    Worker entry point: opens the PDF (path or bytes) and extracts the pages in [start, stop).
+    Returns:
+        list: (page_index, tables, learned) for every page in the range
+    """
+    results = []
+    with _open_pdf(source) as pdf:
+        for page_index in range(start, stop):
+            results.append((page_index, *_extract_page(pdf.pages[page_index], layouts)))
+    return results
+
+
+def _page_ranges(first, last, chunks):
+    """
+    Splits the pages [first, last) into at most `chunks` contiguous ranges.
+    """
+    total = last - first
+    size, extra = divmod(total, chunks)
+    ranges = []
+    start = first
+    for i in range(min(chunks, total)):
+        stop = start + size + (1 if i < extra else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+def _extract_pages(pdf_file, workers, layouts):
+    """
+    Extracts the tables of every page except the first one, in page order.
+    With more than one worker and at least PDF_PARALLEL_MIN_PAGES pages, the pages are
+    sharded across a process pool. Given a path, each worker maps the file itself and only
+    the path is sent to it; in-memory PDFs are sent as bytes.
+    Args:
+        pdf_file (str or io.BytesIO): Path of the PDF, or the PDF in memory
+        workers (int): Number of worker processes
+        layouts (dict): Known annexure layouts; each worker learns missing ones on its own
+    Returns:
+        list: (page_index, tables, learned) sorted by page_index
+    """
+    source = pdf_file.getvalue() if isinstance(pdf_file, io.BytesIO) else pdf_file
+
+    with _open_pdf(source) as pdf:
+        page_count = len(pdf.pages)
+        if workers <= 1 or page_count < PDF_PARALLEL_MIN_PAGES:
+            # Skip the first page
+            return [(page_index, *_extract_page(pdf.pages[page_index], layouts))
+                    for page_index in range(1, page_count)]
+
+    logging.info(f"Extracting {page_count - 1} pages with {workers} workers")
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(PROCESS_START_METHOD)) as executor:
+        futures = [executor.submit(_extract_page_range, source, start, stop, layouts)
+                   for start, stop in _page_ranges(1, page_count, workers)]
+        for future in futures:
+            results.extend(future.result())
+    return sorted(results, key=lambda result: result[0])
+
+
+def _write_catalog(folder_path, catalog):
+    path = os.path.join(folder_path, PDF_CATALOG_NAME)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(catalog, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_catalog(pdf_file_name):
+    """
+    Returns the catalog written by the last extraction of a circular, or None if there is none.
+    """
+    try:
+        with open(os.path.join(PDF_OUTBOUND_FOLDER, pdf_file_name, PDF_CATALOG_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+@instrumented()
+def extract_pdf_data(pdf_file, pdf_file_name, outbound=PDF_OUTBOUND_FOLDER, workers=PDF_WORKERS, layout_cache=None):
+    """
+    Extracts the annexure tables of a circular into NSE/<circular>/, one CSV per table, and
+    writes the catalog of those files next to them (PDF_CATALOG_NAME).
+    Returns:
+        list: The catalog, one dict per CSV written: path, annexure, settlement_type,
+              settlement_no, settlement_date (publish format), rows and exempt (path of the
+              exemption note, or None). None if the extraction failed.
+    """
+    # pandas and pdfplumber are imported by the functions that use them, not with the module
+    import pandas as pd
 
     folder_path = f"{PDF_OUTBOUND_FOLDER}/{pdf_file_name}"
     os.makedirs(folder_path, exist_ok=True)
+    catalog = []
     try:
-        with pdfplumber.open(pdf_file) as pdf:
-            logging.info("Initializing PDF extraction...")
-            for page_index, page in enumerate(pdf.pages):
-                if page_index == 0:  # Skip the first page
-                    continue
-
-                # Extract the text to check if this is Annexure A (which has different structure)
-                text = page.extract_text()
-                is_annexure_a = "Annexure 'A'" in text
-                
-                tables = page.extract_tables()
-                if tables:
-                    for table in tables:
-                        if len(table) < 4:
-                            continue  # Skip if not enough rows for header + data
-
-                        # Clean header: use 3rd row, replace '\n' with space, handle None
-                        raw_header = table[2]
-                        header = [(col or '').replace('\n', ' ').strip() for col in raw_header]
-                        
-                        # For Annexure A, we need to handle the extra columns
-                        if is_annexure_a:
-                            header = [item for item in header if item != '']
-                            table[-1][0], table[-1][1] = table[-1][1], None
-
-                        # Normalize rows to header length
-                        data_rows = []
-                        for row in table[3:]:
-                            if not any(row):
-                                continue
-                                
-                            # For Annexure A, clean up the row structure
-                            if is_annexure_a:
-        
-                                clean_row = [row[0]]  # Start with 'M'
-                                rest = [x for x in row[1:] if x and str(x).strip()]
-                                clean_row.extend(rest[:5])  # Take next 5 elements
-                                row = clean_row
-                            
-            
-                            row = row[:len(header)]
-                            data_rows.append(row)
-
-                        df = pd.DataFrame(data_rows, columns=header)
-                        
-                        # For Annexure A, drop any empty columns
-                        if is_annexure_a:
-                            df = df.dropna(axis=1, how='all')
-                    
-
-                        last_value = str(df.iloc[-1, -1]).strip()
-                        exempt = str(df.iloc[-1, 0]).strip()
-
-                        # If the last value is blank, drop the last row
-                        if last_value is None or last_value == 'None':
-                            df = df.iloc[:-1]
-                            with open(f"{PDF_OUTBOUND_FOLDER}/{pdf_file_name}/{pdf_file_name}_{table[0][0]}_exempt.txt", 'w') as file:
-                                file.write(exempt)
-
-                        # Extract settlement number and date from the first record
-                        settlement_no_cols = PDF_SETTLEMENT_COL
-                        settlement_date_cols = PDF_SETTLEMENT_DATE_COL
-                        settlement_no_col = next((col for col in settlement_no_cols if col in df.columns), None)
-                        settlement_date_col = next((col for col in settlement_date_cols if col in df.columns), None)
-
-                        if settlement_no_col and settlement_date_col:
-                            first_row = df.iloc[0]
-                            settlement_no = str(first_row[settlement_no_col])
-                            original_date = str(first_row[settlement_date_col])
-                            try:
-                                date_obj = datetime.strptime(original_date, "%d-%b-%y")
-                                formatted_date = date_obj.strftime("%d-%m-%Y")
-                            except ValueError:
-                                formatted_date = original_date  # fallback if parsing fails
-                            # annexure_name = str(table[0][0])
-                            settlement_type = str(first_row[df.columns[0]])
-                            csv_filename = f"{PDF_OUTBOUND_FOLDER}/{pdf_file_name}/publish_settlement_number_edis nse_cm '{settlement_no}' '{formatted_date}' '{settlement_type}'.csv"
-                            
-                        else:
-                            # fallback to old naming if columns not found
-                            csv_filename = f"{PDF_OUTBOUND_FOLDER}/{pdf_file_name}/{pdf_file_name}{table[0][0]}{table[1][0]}.csv"
-
-                        df.to_csv(csv_filename, index=False)
-    except Exception as e:
-        logging.error(f"Failed PDF extraction! Error : {e}")
+        logging.info("Initializing PDF extraction...")
+        layout_cache = layout_cache or get_layout_cache()
+        pages = _extract_pages(pdf_file, workers, layout_cache.layouts())
+        layout_cache.update(dict(learned for _, _, learned in pages if learned))
+        for page_index, tables, _ in pages:
+            if tables:
+                for table in tables:
+                    if len(table) < 4:
+                        continue  # Skip if not enough rows for header + data
 
-def load_pdf(pdf_url,pdf_file_name):
+                    # Clean header: use 3rd row, replace '\n' with space, handle None
+                    raw_header = table[2]
+                    header = [(col or '').replace('\n', ' ').strip() for col in raw_header]
 
-    try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                    "AppleWebKit/537.36 (KHTML, like Gecko) "
-                    "Chrome/120.0.0.0 Safari/537.36"
-        }
-
-        response = requests.get(headers=headers, url=pdf_url)
-        pdf_file = io.BytesIO(response.content) 
-        logging.info("Loading PDF")
-        extract_pdf_data(pdf_file, pdf_file_name) 
-        extract_first_record_settlement_info(PDF_OUTBOUND_FOLDER)
-        return True
-    except Exception as e:
-        logger.error(f"Failed to load PDF : {e}")
+                    # Normalize rows to header length
+                    data_rows = []
+                    for row in table[3:]:
+                        if not any(row):
+                            continue
+                        row = row[:len(header)]
+                        data_rows.append(row)
 
+                    df = pd.DataFrame(data_rows, columns=header)
 
-def extract_first_record_settlement_info(folder_path):
-    # Possible column names for each field
-    settlement_no_cols = PDF_SETTLEMENT_COL
-    settlement_date_cols = PDF_SETTLEMENT_DATE_COL
-    try:
-        for root, dirs, files in os.walk(folder_path):
-            for file in files:
-                if file.endswith('.csv'):
-                    file_path = os.path.join(root, file)
-                    df = pd.read_csv(file_path)
-                    if df.shape[0] == 0:
-                        continue  # skip empty files
-
-                    # Find the correct columns
+                    last_value = str(df.iloc[-1, -1]).strip()
+                    exempt = str(df.iloc[-1, 0]).strip()
+
+                    # If the last value is blank, drop the last row
+                    exempt_path = None
+                    if last_value is None or last_value == 'None':
+                        df = df.iloc[:-1]
+                        exempt_path = f"{PDF_OUTBOUND_FOLDER}/{pdf_file_name}/{pdf_file_name}_{table[0][0]}_exempt.txt"
+                        with open(exempt_path, 'w') as file:
+                            file.write(exempt)
+
+                    # Extract settlement number and date from the first record
+                    settlement_no_cols = PDF_SETTLEMENT_COL
+                    settlement_date_cols = PDF_SETTLEMENT_DATE_COL
                     settlement_no_col = next((col for col in settlement_no_cols if col in df.columns), None)
                     settlement_date_col = next((col for col in settlement_date_cols if col in df.columns), None)
 
+                    settlement_type = settlement_no = formatted_date = None
                     if settlement_no_col and settlement_date_col:
                         first_row = df.iloc[0]
-                        # Format the date
+                        settlement_no = str(first_row[settlement_no_col])
                         original_date = str(first_row[settlement_date_col])
-                        try:
-                            formatted_date = datetime.strptime(original_date, "%d-%b-%y").strftime("%d-%m-%y")
-                        except ValueError:
-                            formatted_date = original_date  # fallback if parsing fails
+                        # fallback to the original value if parsing fails
+                        formatted_date = reformat_date(original_date, NSE_DATE_FORMAT, PUBLISH_DATE_FORMAT) or original_date
+                        # annexure_name = str(table[0][0])
+                        settlement_type = str(first_row[df.columns[0]])
+                        csv_filename = f"{PDF_OUTBOUND_FOLDER}/{pdf_file_name}/publish_settlement_number_edis nse_cm '{settlement_no}' '{formatted_date}' '{settlement_type}'.csv"
+                        
                     else:
-                        logger.error(f"\nFile: {file} - Required columns not found.")
+                        # fallback to old naming if columns not found
+                        csv_filename = f"{PDF_OUTBOUND_FOLDER}/{pdf_file_name}/{pdf_file_name}{table[0][0]}{table[1][0]}.csv"
+
+                    df.to_csv(csv_filename, index=False)
+                    annexure = ANNEXURE_RE.match(str(table[0][0] or ''))
+                    catalog.append({
+                        'path': csv_filename,
+                        'annexure': annexure.group(1) if annexure else table[0][0],
+                        'settlement_type': settlement_type,
+                        'settlement_no': settlement_no,
+                        'settlement_date': formatted_date,
+                        'rows': len(df),
+                        'exempt': exempt_path,
+                    })
+
+                    if settlement_no_col and settlement_date_col:
+                        write_partitions_by_date(list(df.columns), df.values.tolist(), 'NSE', settlement_date_col,
+                                                 f"settlement_{pdf_file_name}_{settlement_type}_{settlement_no}", NSE_DATE_FORMAT)
+        _write_catalog(folder_path, catalog)
+        return catalog
     except Exception as e:
-        logger.error(f"Error extracting information columns {e}")
+        logging.error(f"Failed PDF extraction! Error : {e}")
+        return None
+
+def load_pdf(pdf_url,pdf_file_name,session=None,workers=PDF_WORKERS):
+
+    try:
+        cache = get_http_cache()
+        # Pinned, so concurrent downloads cannot evict the PDF while it is extracted
+        cached = call_with_retry(cache.fetch, pdf_url, stage=f'download {pdf_file_name}',
+                                 circuit='nse', session=session, headers=REQUEST_HEADERS, pin=True)
+        try:
+            manifest = get_run_manifest()
+            if manifest.is_current('circulars', pdf_file_name, cached.sha256, 'published') \
+                    and manifest.outputs_intact('circulars', pdf_file_name):
+                logger.info(f"{pdf_file_name} unchanged since last extraction, skipping")
+                return True
+
+            logging.info("Loading PDF")
+            catalog = extract_pdf_data(cached.path, pdf_file_name, workers=workers)
+        finally:
+            cache.release(cached.sha256)
+        if catalog is None:
+            return False
+
+        # Only the files of this extraction, not whatever earlier runs left in the folder
+        outputs = [entry['path'] for entry in catalog] + [entry['exempt'] for entry in catalog if entry['exempt']]
+        outputs.append(os.path.join(PDF_OUTBOUND_FOLDER, pdf_file_name, PDF_CATALOG_NAME))
+        manifest.record('circulars', pdf_file_name, 'published', source_hash=cached.sha256, outputs=sorted(set(outputs)))
+        check_catalog(catalog)
+        return True
+    except Exception as e:
+        logger.error(f"Failed to load PDF : {e}")
+
+
+def check_catalog(catalog):
+    """
+    Checks the files of an extraction from its catalog, without reading them back: every
+    table with rows must have had its settlement number and date columns.
+    Returns:
+        list: The catalog entries that failed the check
+    """
+    failed = []
+    for entry in catalog:
+        if entry['rows'] and (entry['settlement_no'] is None or entry['settlement_date'] is None):
+            logger.error(f"File: {entry['path']} - Required columns not found.")
+            failed.append(entry)
+    return failed
+
 
+if __name__ == "__main__":
+    # Kept for existing scripts; same as `python cli.py extract-nse`
+    import sys
+    from cli import main
 
-if __name__ == "__main__":  
-    pdf_url = PDF_URL
-    pdf_file_name = pdf_url.split("/")[-1].split(".")[0]
-    pdf_file = load_pdf(pdf_url,pdf_file_name)
-    if pdf_file:
-        logger.info("Extraction Complete")
-    else:
-        logger.error("PDF Extraction Failed")
+    sys.exit(main(['extract-nse'] + sys.argv[1:]))
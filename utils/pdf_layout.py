@@ -0,0 +1,199 @@
+import os
+import re
+import json
+import bisect
+import logging
+import threading
+from settings import PDF_LAYOUT_CACHE, PDF_TITLE_REGION
+
+logger = logging.getLogger(__name__)
+
+ANNEXURE_RE = re.compile(r"Annexure\s*'([^']+)'")
+
+HEADER_ROW = 2  # annexure title row, description row, then the column headers
+_TOLERANCE = 3  # points, as pdfplumber's default snap tolerance
+_MIN_RULE_COVERAGE = 0.9  # share of the table width a horizontal rule must cover to end a row
+
+
+def _text(chars):
+    from pdfplumber.utils import extract_text
+
+    return extract_text(chars)
+
+
+def _label(text):
+    return (text or '').replace('\n', ' ').strip()
+
+
+def find_annexure(page, region=PDF_TITLE_REGION):
+    """
+    Looks for the "Annexure 'X'" title in the top `region` (share of the page height) of a
+    page, reading only the characters there instead of laying out the text of the whole page.
+    Returns:
+        str: The annexure name ('A', 'B', ...), or None
+    """
+    limit = page.height * region
+    match = ANNEXURE_RE.search(_text([char for char in page.chars if char['top'] < limit]))
+    return match.group(1) if match else None
+
+
+def learn_layout(page):
+    """
+    Learns the layout of the annexure table of a page with pdfplumber's table finder. The column
+    edges are those of the labelled header cells: an unlabelled sub-column (Annexure A) becomes
+    part of the labelled column on its left.
+    Returns:
+        dict: {'columns': column edges from left to right, 'header': column labels}, or None if
+              the page does not hold exactly one table with a header row
+    """
+    tables = [table for table in page.find_tables() if len(table.rows) > HEADER_ROW]
+    if len(tables) != 1:
+        return None
+    table = tables[0]
+    columns, header = [], []
+    for cell, text in zip(table.rows[HEADER_ROW].cells, table.extract()[HEADER_ROW]):
+        if cell is not None and _label(text):
+            columns.append(round(cell[0], 2))
+            header.append(_label(text))
+    if not columns:
+        return None
+    columns[0] = round(table.bbox[0], 2)
+    columns.append(round(table.bbox[2], 2))
+    return {'columns': columns, 'header': header}
+
+
+def _row_edges(horizontal_edges, left, right, top, bottom):
+    """
+    Returns the y positions of the horizontal rules crossing (nearly) the whole table width,
+    whether drawn as one line or as one segment per cell.
+    """
+    rules = sorted((edge for edge in horizontal_edges
+                    if top - _TOLERANCE <= edge['top'] <= bottom + _TOLERANCE),
+                   key=lambda edge: edge['top'])
+    groups = []
+    for edge in rules:
+        if groups and edge['top'] - groups[-1][-1]['top'] <= _TOLERANCE:
+            groups[-1].append(edge)
+        else:
+            groups.append([edge])
+
+    ys = []
+    for group in groups:
+        covered, end = 0, left
+        for edge in sorted(group, key=lambda edge: edge['x0']):
+            start, stop = max(edge['x0'], end), min(edge['x1'], right)
+            if stop > start:
+                covered += stop - start
+                end = stop
+        if covered >= _MIN_RULE_COVERAGE * (right - left):
+            ys.append(group[0]['top'])
+    return ys
+
+
+def extract_with_layout(page, layout):
+    """
+    Extracts the annexure table of a page on a known layout, without running the table finder:
+    the cells are laid out from the cached column edges and the horizontal rules of the table,
+    and every character is dropped into its cell by position. Where a row misses an inner
+    column rule (a merged note row), the merged cell has its text in its first column and None
+    in the others, as the table finder returns merged cells.
+    Returns:
+        list: The table rows, or None if the page does not match the layout (another header,
+              or a second annexure table in the same frame)
+    """
+    columns = layout['columns']
+    left, right = columns[0], columns[-1]
+    vertical_edges = page.vertical_edges
+    border = [edge for edge in vertical_edges if abs(edge['x0'] - left) <= _TOLERANCE]
+    if not border:
+        return None
+    rows = _row_edges(page.horizontal_edges, left, right,
+                      min(edge['top'] for edge in border), max(edge['bottom'] for edge in border))
+    if len(rows) < HEADER_ROW + 3:  # header and at least one data row
+        return None
+
+    cells = {}
+    for char in page.chars:
+        row = bisect.bisect(rows, (char['top'] + char['bottom']) / 2) - 1
+        column = bisect.bisect(columns, (char['x0'] + char['x1']) / 2) - 1
+        if 0 <= row < len(rows) - 1 and 0 <= column < len(columns) - 1:
+            cells.setdefault((row, column), []).append(char)
+
+    inner_rules = [[edge for edge in vertical_edges if abs(edge['x0'] - x) <= _TOLERANCE]
+                   for x in columns[1:-1]]
+    table = []
+    for row, (top, bottom) in enumerate(zip(rows, rows[1:])):
+        # Cells are closed by the inner rules crossing the row, and by the right border
+        ends = [column for column, rules in enumerate(inner_rules)
+                if any(edge['top'] <= top + _TOLERANCE and edge['bottom'] >= bottom - _TOLERANCE
+                       for edge in rules)]
+        ends.append(len(columns) - 2)
+        values, start = [], 0
+        for end in ends:
+            chars = [char for column in range(start, end + 1) for char in cells.get((row, column), [])]
+            values += [_text(chars)] + [None] * (end - start)
+            start = end + 1
+        table.append(values)
+
+    if [_label(text) for text in table[HEADER_ROW]] != layout['header']:
+        return None
+    if any(ANNEXURE_RE.match(row[0] or '') for row in table[HEADER_ROW + 1:]):
+        return None
+    return table
+
+
+class LayoutCache:
+    """
+    Table layouts of the circular annexures (column edges and header), learned once per
+    annexure and kept in a JSON file so later runs skip the table finder. With path None the
+    layouts are only kept in memory.
+    """
+
+    def __init__(self, path=PDF_LAYOUT_CACHE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._layouts = {}
+        if path:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._layouts = json.load(f)
+            except (OSError, ValueError):
+                pass
+
+    def layouts(self):
+        """
+        Returns a copy of the layouts by annexure name.
+        """
+        with self._lock:
+            return dict(self._layouts)
+
+    def update(self, layouts):
+        """
+        Stores newly learned layouts, replacing those of the same annexures.
+        """
+        with self._lock:
+            changed = {name: layout for name, layout in layouts.items() if self._layouts.get(name) != layout}
+            if not changed:
+                return
+            self._layouts.update(changed)
+            logger.info(f"Learned the table layout of annexure {', '.join(sorted(changed))}")
+            if not self.path:
+                return
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._layouts, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+
+_default_cache = None
+
+
+def get_layout_cache():
+    """
+    Returns the process-wide layout cache, loading it on first use.
+    """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = LayoutCache()
+    return _default_cache
@@ -0,0 +1,130 @@
+import time
+import asyncio
+import logging
+from utils.instrumentation import measure
+
+logger = logging.getLogger(__name__)
+
+
+class StageResult:
+    """
+    Outcome and timing of one pipeline stage.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.status = 'pending'  # 'ok', 'failed' or 'skipped'
+        self.value = None
+        self.error = None
+        self.started = None  # seconds since the pipeline started
+        self.elapsed = 0.0
+
+    def to_dict(self):
+        return {
+            'stage': self.name,
+            'status': self.status,
+            'started': round(self.started, 4) if self.started is not None else None,
+            'elapsed': round(self.elapsed, 4),
+            'error': str(self.error) if self.error else None,
+        }
+
+
+class Stage:
+    def __init__(self, name, func, deps=(), after=()):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.after = list(after)
+
+
+class PipelineRunner:
+    """
+    Runs pipeline stages as a DAG on an asyncio loop.
+
+    Each stage is a blocking callable run in a worker thread once its dependencies are done, so
+    independent branches (the BSE browser session and the NSE PDF download, for instance) overlap.
+    A stage receives the return values of its `deps` as positional arguments and is skipped if any
+    of them failed or was skipped; `after` stages only order it and may fail without skipping it.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.results = {}
+        self.elapsed = 0.0
+
+    def add(self, name, func, deps=(), after=()):
+        """
+        Adds a stage. Dependencies must already be added, which keeps the graph acyclic.
+        Args:
+            name (str): Unique stage name
+            func (callable): Blocking callable taking the values of deps
+            deps (list): Stages whose success is required
+            after (list): Stages that only have to finish first
+        """
+        if name in self.stages:
+            raise ValueError(f"Stage {name} already added")
+        unknown = [dep for dep in list(deps) + list(after) if dep not in self.stages]
+        if unknown:
+            raise ValueError(f"Stage {name} depends on unknown stages: {unknown}")
+        self.stages[name] = Stage(name, func, deps, after)
+
+    async def _run_stage(self, stage, tasks, started):
+        await asyncio.gather(*(tasks[dep] for dep in stage.deps + stage.after))
+        result = self.results[stage.name]
+
+        blocked = [dep for dep in stage.deps if self.results[dep].status != 'ok']
+        if blocked:
+            result.status = 'skipped'
+            logger.warning(f"Stage {stage.name} skipped, dependencies did not complete: {', '.join(blocked)}")
+            return
+
+        result.started = time.perf_counter() - started
+        logger.info(f"Stage {stage.name} started")
+        try:
+            args = [self.results[dep].value for dep in stage.deps]
+            result.value = await asyncio.to_thread(self._call, stage, args)
+            result.status = 'ok'
+        except Exception as e:
+            result.status = 'failed'
+            result.error = e
+            logger.error(f"Stage {stage.name} failed: {e}", exc_info=True)
+        result.elapsed = time.perf_counter() - started - result.started
+        logger.info(f"Stage {stage.name} {result.status} in {result.elapsed:.2f}s")
+
+    @staticmethod
+    def _call(stage, args):
+        with measure(f"pipeline.{stage.name}"):
+            return stage.func(*args)
+
+    async def run_async(self):
+        started = time.perf_counter()
+        self.results = {name: StageResult(name) for name in self.stages}
+        tasks = {}
+        for name, stage in self.stages.items():
+            tasks[name] = asyncio.ensure_future(self._run_stage(stage, tasks, started))
+        await asyncio.gather(*tasks.values())
+        self.elapsed = time.perf_counter() - started
+        return self.results
+
+    def run(self):
+        """
+        Runs every stage and logs the per-stage timings.
+        Returns:
+            dict: Stage name -> StageResult
+        """
+        results = asyncio.run(self.run_async())
+        self.log_timings()
+        return results
+
+    def log_timings(self):
+        logger.info(f"\nPipeline finished in {self.elapsed:.2f}s:")
+        for result in self.results.values():
+            timing = f"{result.elapsed:.2f}s (started at +{result.started:.2f}s)" if result.started is not None else '-'
+            logger.info(f"  {result.name:<20} {result.status:<8} {timing}")
+
+    def timings(self):
+        """
+        Returns:
+            list: StageResult.to_dict() per stage, in the order the stages were added
+        """
+        return [result.to_dict() for result in self.results.values()]
@@ -1,24 +1,315 @@
+import sys
+import time
+import random
 import logging
+import functools
+import threading
+from settings import (RETRY_MAX_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY, RETRY_BUDGET,
+                      CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT)
 
 
 logger = logging.getLogger(__name__)
-def run_with_retries(func, max_retries=3):
+
+# Failure kinds worth retrying: the same call can succeed a moment later
+RETRYABLE_KINDS = {'timeout', 'connection', 'http_5xx', 'http_429', 'element_not_found', 'stale_element'}
+
+# (exception type, kind) registered with register_error_kind, checked first
+_ERROR_KINDS = []
+
+# Built-in exception types, checked after those of the libraries
+_BUILTIN_KINDS = [
+    (TimeoutError, 'timeout'),
+    (ConnectionError, 'connection'),
+]
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a target whose circuit breaker is open."""
+
+
+def register_error_kind(exc_type, kind):
+    """
+    Classifies a project-specific exception type as one of the failure kinds.
+    """
+    _ERROR_KINDS.insert(0, (exc_type, kind))
+
+
+def _library_error_kinds():
+    """
+    (exception type, kind) pairs of requests and selenium, in the order they are checked.
+    They are only looked up in libraries that are already loaded: a run that never imported
+    selenium cannot raise its exceptions, and importing it here would slow every start-up.
+    """
+    kinds = []
+    exceptions = sys.modules.get('selenium.common.exceptions')
+    if exceptions:
+        kinds += [(exceptions.TimeoutException, 'timeout'),
+                  (exceptions.NoSuchElementException, 'element_not_found'),
+                  (exceptions.StaleElementReferenceException, 'stale_element'),
+                  (exceptions.WebDriverException, 'connection')]
+    requests = sys.modules.get('requests')
+    if requests:
+        kinds += [(requests.Timeout, 'timeout'), (requests.ConnectionError, 'connection')]
+    return kinds
+
+
+def classify_error(error):
+    """
+    Returns the failure kind of an exception: 'timeout', 'connection', 'http_5xx', 'http_429',
+    'http_4xx', 'element_not_found', 'stale_element', 'circuit_open', 'invalid' or 'other'.
+    """
+    if isinstance(error, CircuitOpenError):
+        return 'circuit_open'
+    requests = sys.modules.get('requests')
+    if requests and isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        if status == 429:
+            return 'http_429'
+        return 'http_5xx' if status >= 500 else 'http_4xx'
+    for exc_type, kind in _ERROR_KINDS + _library_error_kinds() + _BUILTIN_KINDS:
+        if isinstance(error, exc_type):
+            return kind
+    if isinstance(error, (ValueError, TypeError, KeyError)):
+        return 'invalid'
+    return 'other'
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter: attempt n waits a random time in
+    [0, min(max_delay, base_delay * 2 ** (n - 1))].
+    """
+
+    def __init__(self, max_attempts=RETRY_MAX_ATTEMPTS, base_delay=RETRY_BASE_DELAY,
+                 max_delay=RETRY_MAX_DELAY, retry_on=RETRYABLE_KINDS):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_on = set(retry_on)
+
+    def delay(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class RetryBudget:
+    """
+    Caps the number of retries of a whole run, so a widespread outage fails fast instead of
+    every stage spending its full backoff schedule.
+    """
+
+    def __init__(self, max_retries=RETRY_BUDGET):
+        self.remaining = max_retries
+        self._lock = threading.Lock()
+
+    def consume(self):
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+
+class CircuitBreaker:
+    """
+    Stops calling a target after `failure_threshold` consecutive retryable failures. After
+    `reset_timeout` seconds one trial call is let through (half-open), while concurrent callers
+    keep getting CircuitOpenError; its success closes the circuit again, its failure keeps it
+    open for another period.
+    """
+
+    def __init__(self, name, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_timeout=CIRCUIT_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False  # a half-open trial call is running
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        return 'half_open' if time.monotonic() - self.opened_at >= self.reset_timeout else 'open'
+
+    def before_call(self):
+        with self._lock:
+            state = self.state
+            if state == 'open' or (state == 'half_open' and self.trial_in_flight):
+                raise CircuitOpenError(f"Circuit '{self.name}' is open, not calling it")
+            if state == 'half_open':
+                self.trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def end_trial(self):
+        """
+        Ends a call that neither closes nor reopens the circuit (a non-retryable failure), so
+        the next caller can make the trial call.
+        """
+        with self._lock:
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.trial_in_flight = False
+            self.failures += 1
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                if self.opened_at is None:
+                    logger.error(f"Circuit '{self.name}' opened after {self.failures} consecutive failures")
+                self.opened_at = time.monotonic()
+
+
+_budget = None
+_breakers = {}
+_registry_lock = threading.Lock()
+
+
+def get_retry_budget():
+    """
+    Returns the process-wide retry budget.
+    """
+    global _budget
+    with _registry_lock:
+        if _budget is None:
+            _budget = RetryBudget()
+        return _budget
+
+
+def reset_retry_budget():
+    """
+    Starts a new process-wide retry budget. Called at the start of each run of a long-running
+    process, since the budget is meant to cap the retries of one run.
+    """
+    global _budget
+    with _registry_lock:
+        _budget = RetryBudget()
+        return _budget
+
+
+def circuit_breakers():
+    """
+    Returns the circuit breakers created so far, by name.
+    """
+    with _registry_lock:
+        return dict(_breakers)
+
+
+def get_circuit_breaker(name):
+    """
+    Returns the process-wide circuit breaker of a target (e.g. 'bse_http', 'nse').
+    """
+    with _registry_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+
+def call_with_retry(func, *args, stage=None, policy=None, circuit=None, budget=None, **kwargs):
+    """
+    Calls func, retrying retryable failures with backoff.
+    Args:
+        func (callable): The function to call with *args and **kwargs
+        stage (str): Name used in the logs; defaults to the function name
+        policy (RetryPolicy): Attempts, delays and retryable kinds
+        circuit (str): Name of the circuit breaker guarding the target, if any
+        budget (RetryBudget): Budget the retries are taken from; the process-wide one if None
+    Returns:
+        The return value of func
+    Raises:
+        The last exception, immediately for non-retryable kinds or once attempts or budget run out.
+        CircuitOpenError if the circuit is open.
+    """
+    stage = stage or getattr(func, '__name__', 'call')
+    policy = policy or RetryPolicy()
+    budget = budget or get_retry_budget()
+    breaker = get_circuit_breaker(circuit) if circuit else None
+
+    for attempt in range(1, policy.max_attempts + 1):
+        if breaker:
+            breaker.before_call()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            kind = classify_error(e)
+            retryable = kind in policy.retry_on
+            if breaker and retryable:
+                breaker.record_failure()
+            elif breaker:
+                breaker.end_trial()
+            if not retryable:
+                logger.error(f"{stage} failed ({kind}), not retrying: {str(e)}")
+                raise
+            if attempt == policy.max_attempts:
+                logger.error(f"{stage} failed ({kind}) after {attempt} attempts: {str(e)}")
+                raise
+            if not budget.consume():
+                logger.error(f"{stage} failed ({kind}), retry budget exhausted: {str(e)}")
+                raise
+            delay = policy.delay(attempt)
+            logger.warning(f"{stage} failed ({kind}) on attempt {attempt}/{policy.max_attempts}, "
+                           f"retrying in {delay:.1f}s: {str(e)}")
+            time.sleep(delay)
+            continue
+        if breaker:
+            breaker.record_success()
+        return result
+
+
+def retry(stage=None, policy=None, circuit=None):
+    """
+    Decorator form of call_with_retry, for per-stage retries (one month, one download, one PDF).
+    A retried function must not call another retried one, or each of its attempts would run
+    the full retries of the inner one.
+
+        @retry('scrape_month', circuit='bse_http')
+        def scrape_month_http(form, year, month): ...
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return call_with_retry(func, *args, stage=stage or func.__name__, policy=policy,
+                                   circuit=circuit, **kwargs)
+        return wrapper
+    return decorator
+
+
+def run_with_retries(func, max_retries=RETRY_MAX_ATTEMPTS, policy=None, budget=None):
     """
     Runs a function with a specified number of retries in case of failure.
-    
+    Attempts are spaced with exponential backoff and jitter. Unlike call_with_retry every
+    failure kind is retried, except an open circuit, which ends the retries at once. Each
+    retry is taken from the retry budget, like those of call_with_retry. Do not wrap functions
+    that retry on their own (@retry) with it.
+
     Args:
         func (callable): The function to run.
-        max_retries (int): The maximum number of retries. Defaults to 3.
-    
+        max_retries (int): The maximum number of attempts. Defaults to RETRY_MAX_ATTEMPTS.
+        policy (RetryPolicy): Backoff delays; defaults to the settings values.
+        budget (RetryBudget): Budget the retries are taken from; the process-wide one if None.
+
     Returns:
         bool: True if the function succeeded, False if it failed after retries.
     """
+    policy = policy or RetryPolicy(max_attempts=max_retries)
+    budget = budget or get_retry_budget()
     for attempt in range(max_retries):
         try:
             func()  # Call the function
             return True  # If successful, return True
         except Exception as e:
             logger.error(f"Attempt {attempt + 1} failed: {str(e)}")
+            if isinstance(e, CircuitOpenError):
+                break
             if attempt < max_retries - 1:
-                logger.info("Retrying...")
-    return False  # If all attempts fail, return False
\ No newline at end of file
+                if not budget.consume():
+                    logger.error("Retry budget exhausted, not retrying")
+                    break
+                delay = policy.delay(attempt + 1)
+                logger.info(f"Retrying in {delay:.1f}s...")
+                time.sleep(delay)
+    return False  # If all attempts fail, return False
@@ -0,0 +1,139 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from settings import RUN_MANIFEST_PATH
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stages in the order they are reached
+STAGES = ['scraped', 'converted', 'published', 'archived']
+
+_MONTH_FILE_RE = re.compile(r'settlement_(\d{4})_(\d{2})\.')
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """
+    Returns the sha256 of a file, read in chunks.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def rows_sha256(rows):
+    """
+    Returns a sha256 of table rows, independent of how they are serialized to disk.
+    """
+    digest = hashlib.sha256()
+    for row in rows:
+        digest.update(json.dumps(row, ensure_ascii=False).encode('utf-8'))
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+def month_key(year, month):
+    return f"{int(year)}-{int(month):02d}"
+
+
+def month_key_from_filename(filename):
+    """
+    Returns the month key of a settlement_YYYY_MM file, or None for other names.
+    """
+    match = _MONTH_FILE_RE.match(filename)
+    return month_key(*match.groups()) if match else None
+
+
+class RunManifest:
+    """
+    Persistent record of what previous runs produced.
+
+    For every month and every NSE circular it keeps the hash of the source content, the last
+    pipeline stage reached and the hashes of the files written at that stage. This lets a run
+    skip work whose source has not changed and resume from the last incomplete stage.
+    """
+
+    def __init__(self, path=RUN_MANIFEST_PATH):
+        self.path = path
+        self.revision = 0  # bumped on every record, tells whether a run changed anything
+        self._lock = threading.RLock()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self._data = json.load(f)
+        except (OSError, ValueError):
+            self._data = {}
+        self._data.setdefault('months', {})
+        self._data.setdefault('circulars', {})
+
+    def save(self):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._data, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+    def get(self, kind, key):
+        """
+        Returns the recorded entry for a month ('months') or circular ('circulars'), or None.
+        """
+        with self._lock:
+            entry = self._data[kind].get(key)
+            return dict(entry) if entry else None
+
+    def is_current(self, kind, key, source_hash, stage):
+        """
+        Returns True if the same source content already reached at least the given stage.
+        """
+        entry = self.get(kind, key)
+        return (entry is not None and entry.get('source_hash') == source_hash
+                and STAGES.index(entry['stage']) >= STAGES.index(stage))
+
+    def outputs_intact(self, kind, key):
+        """
+        Returns True if every file recorded for the entry still exists with the recorded hash.
+        """
+        entry = self.get(kind, key)
+        if not entry or not entry.get('outputs'):
+            return False
+        return all(os.path.exists(path) and file_sha256(path) == sha256
+                   for path, sha256 in entry['outputs'].items())
+
+    def record(self, kind, key, stage, source_hash=None, outputs=None):
+        """
+        Records that an entry reached a stage. Output paths are hashed and stored with it.
+        Args:
+            kind (str): 'months' or 'circulars'
+            key (str): Month key (YYYY-MM) or circular name
+            stage (str): One of STAGES
+            source_hash (str): Hash of the source content; kept from the previous record if None
+            outputs (list): Paths of the files written at this stage
+        """
+        with self._lock:
+            entry = self._data[kind].setdefault(key, {})
+            if source_hash is not None:
+                entry['source_hash'] = source_hash
+            entry['stage'] = stage
+            entry['outputs'] = {path: file_sha256(path) for path in (outputs or []) if os.path.exists(path)}
+            entry['updated_at'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+            self.revision += 1
+            self.save()
+        logger.debug(f"{kind} {key} reached stage '{stage}'")
+
+
+_default_manifest = None
+
+
+def get_run_manifest():
+    """
+    Returns the process-wide run manifest, loading it on first use.
+    """
+    global _default_manifest
+    if _default_manifest is None:
+        _default_manifest = RunManifest()
+    return _default_manifest
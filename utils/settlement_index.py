@@ -0,0 +1,304 @@
+import os
+import re
+import json
+import sqlite3
+import logging
+import argparse
+import threading
+from datetime import date, datetime, timedelta
+from settings import (SETTLEMENT_INDEX_PATH, READY_DIR, PDF_OUTBOUND_FOLDER,
+                      PDF_SETTLEMENT_COL, PDF_SETTLEMENT_DATE_COL, SETTLEMENT_INDEX_MAX_SPAN)
+from utils.csv_pipeline import read_rows
+from utils.diff_engine import split_sections
+from utils.date_utils import parse_date, BSE_DATE_FORMAT, NSE_DATE_FORMAT, PUBLISH_DATE_FORMAT
+from utils.run_manifest import file_sha256
+
+logger = logging.getLogger(__name__)
+
+# (exchange, folder) scanned for processed outputs. Archived months stay published in
+# READY_DIR; the archive store keeps compressed copies only
+DEFAULT_SOURCES = [
+    ('BSE', READY_DIR),
+    ('NSE', PDF_OUTBOUND_FOLDER),
+]
+
+# Index field -> header names it is read from, across the BSE calendar and the NSE annexures
+FIELD_COLUMNS = {
+    'settlement_type': ['Settlement Type'],
+    'settlement_no': PDF_SETTLEMENT_COL,
+    'trade_start': ['Trading Date.', 'Trade Start Date', 'Trade Date'],
+    'trade_end': ['Trade End Date', 'Trading Date.', 'Trade Date'],
+    'pay_in_out': ['Pay-in/ Pay-out +'] + PDF_SETTLEMENT_DATE_COL,
+    'auction_settlement_no': ['Auction Sett.No. +++'],
+    'auction_offer_date': ['Submission of auctionoffers on'],
+    'auction_pay_in_out': ['AuctionPay-in/ Pay-out ++'],
+}
+DATE_FIELDS = {'trade_start', 'trade_end', 'pay_in_out', 'auction_offer_date', 'auction_pay_in_out'}
+DATE_FORMATS = [PUBLISH_DATE_FORMAT, BSE_DATE_FORMAT, NSE_DATE_FORMAT]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY,
+    exchange TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS settlements (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL REFERENCES sources(path) ON DELETE CASCADE,
+    exchange TEXT NOT NULL,
+    settlement_type TEXT,
+    settlement_no TEXT NOT NULL,
+    trade_start TEXT,
+    trade_end TEXT,
+    pay_in_out TEXT,
+    auction_settlement_no TEXT,
+    auction_offer_date TEXT,
+    auction_pay_in_out TEXT
+);
+CREATE TABLE IF NOT EXISTS trading_days (
+    trade_date TEXT NOT NULL,
+    settlement_id INTEGER NOT NULL REFERENCES settlements(id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_trading_days_date ON trading_days(trade_date);
+CREATE INDEX IF NOT EXISTS idx_trading_days_settlement ON trading_days(settlement_id);
+CREATE INDEX IF NOT EXISTS idx_settlements_no ON settlements(settlement_no);
+CREATE INDEX IF NOT EXISTS idx_settlements_source ON settlements(source);
+"""
+
+RESULT_FIELDS = ['exchange', 'settlement_type', 'settlement_no', 'trade_start', 'trade_end', 'pay_in_out',
+                 'auction_settlement_no', 'auction_offer_date', 'auction_pay_in_out']
+
+
+def _normalize(header):
+    return re.sub(r'[^a-z0-9]', '', header.lower())
+
+
+def _column_map(headers):
+    """
+    Returns {field: column index} for the fields present under these headers.
+    """
+    positions = {_normalize(header): idx for idx, header in reversed(list(enumerate(headers)))}
+    columns = {}
+    for field, candidates in FIELD_COLUMNS.items():
+        idx = next((positions[_normalize(c)] for c in candidates if _normalize(c) in positions), None)
+        if idx is not None:
+            columns[field] = idx
+    return columns
+
+
+def to_iso_date(value):
+    """
+    Converts a date in any of the formats used by the published files to YYYY-MM-DD.
+    Returns:
+        str: The ISO date, or None if the value is not a date
+    """
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return value.isoformat()
+    value = (value or '').strip().rstrip('@')
+    if re.match(r'^\d{4}-\d{2}-\d{2}$', value):
+        return value
+    for fmt in DATE_FORMATS:
+        parsed = parse_date(value, fmt)
+        if parsed:
+            return parsed.date().isoformat()
+    return None
+
+
+def parse_settlement_file(path, exchange):
+    """
+    Reads the main table of a published settlement CSV into index records.
+    Returns:
+        list: One dict per settlement, with ISO dates
+    """
+    sections = split_sections(read_rows(path))
+    if not sections:
+        return []
+    headers, rows = sections[0]
+    columns = _column_map(headers)
+    if 'settlement_no' not in columns or 'trade_start' not in columns:
+        return []
+
+    records = []
+    for row in rows:
+        record = {field: (row[idx].strip() if idx < len(row) and row[idx] else None)
+                  for field, idx in columns.items()}
+        if not record['settlement_no']:
+            continue
+        for field in DATE_FIELDS & record.keys():
+            record[field] = to_iso_date(record[field])
+        if not record.get('settlement_type') and '-' in record['settlement_no']:
+            # BSE settlement numbers carry their type as a prefix, e.g. DR-621/2025-2026
+            record['settlement_type'] = record['settlement_no'].split('-', 1)[0]
+        record['exchange'] = exchange
+        records.append(record)
+    return records
+
+
+def _days(start, end):
+    """
+    Yields the ISO dates of a trading period, capped at SETTLEMENT_INDEX_MAX_SPAN days.
+    """
+    if not start:
+        return
+    first = date.fromisoformat(start)
+    last = date.fromisoformat(end) if end else first
+    span = min((last - first).days, SETTLEMENT_INDEX_MAX_SPAN)
+    for offset in range(max(span, 0) + 1):
+        yield (first + timedelta(days=offset)).isoformat()
+
+
+class SettlementIndex:
+    """
+    Persistent SQLite index of the processed BSE and NSE settlement calendars.
+
+    Every trading day of a settlement is stored in an indexed table, so a lookup by trading date
+    or settlement number is a B-tree search instead of a scan of the CSV folders. Each source file
+    is recorded with its size, mtime and hash; update() only re-reads files that changed and drops
+    the rows of files that disappeared.
+    """
+
+    def __init__(self, path=SETTLEMENT_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA foreign_keys = ON')
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _index_file(self, path, exchange, stat, sha256):
+        self._conn.execute('DELETE FROM sources WHERE path = ?', (path,))
+        self._conn.execute('INSERT INTO sources (path, exchange, size, mtime_ns, sha256) VALUES (?, ?, ?, ?, ?)',
+                           (path, exchange, stat.st_size, stat.st_mtime_ns, sha256))
+        records = parse_settlement_file(path, exchange)
+        for record in records:
+            cursor = self._conn.execute(
+                f"INSERT INTO settlements (source, {', '.join(RESULT_FIELDS)}) "
+                f"VALUES (?, {', '.join('?' * len(RESULT_FIELDS))})",
+                [path] + [record.get(field) for field in RESULT_FIELDS])
+            self._conn.executemany('INSERT INTO trading_days (trade_date, settlement_id) VALUES (?, ?)',
+                                   [(day, cursor.lastrowid)
+                                    for day in _days(record.get('trade_start'), record.get('trade_end'))])
+        return len(records)
+
+    def update(self, sources=None):
+        """
+        Brings the index in line with the CSVs currently in the source folders.
+        Args:
+            sources (list): (exchange, folder) pairs; defaults to DEFAULT_SOURCES
+        Returns:
+            dict: Counts of 'indexed', 'unchanged' and 'removed' files, and 'rows' inserted
+        """
+        stats = {'indexed': 0, 'unchanged': 0, 'removed': 0, 'rows': 0}
+        with self._lock, self._conn:
+            known = {row['path']: row for row in self._conn.execute('SELECT * FROM sources')}
+            seen = set()
+            for exchange, folder in sources or DEFAULT_SOURCES:
+                for root, _, files in os.walk(folder):
+                    for name in sorted(files):
+                        if not name.endswith('.csv'):
+                            continue
+                        path = os.path.abspath(os.path.join(root, name))
+                        seen.add(path)
+                        stat = os.stat(path)
+                        previous = known.get(path)
+                        if previous and (previous['size'], previous['mtime_ns']) == (stat.st_size, stat.st_mtime_ns):
+                            stats['unchanged'] += 1
+                            continue
+                        sha256 = file_sha256(path)
+                        if previous and previous['sha256'] == sha256:
+                            self._conn.execute('UPDATE sources SET size = ?, mtime_ns = ? WHERE path = ?',
+                                               (stat.st_size, stat.st_mtime_ns, path))
+                            stats['unchanged'] += 1
+                            continue
+                        stats['rows'] += self._index_file(path, exchange, stat, sha256)
+                        stats['indexed'] += 1
+
+            for path in set(known) - seen:
+                self._conn.execute('DELETE FROM sources WHERE path = ?', (path,))
+                stats['removed'] += 1
+
+        logger.info(f"Settlement index updated: {stats}")
+        return stats
+
+    def _query(self, where, params, exchange=None, settlement_type=None):
+        if exchange:
+            where += ' AND s.exchange = ?'
+            params.append(exchange)
+        if settlement_type:
+            where += ' AND s.settlement_type = ?'
+            params.append(settlement_type)
+        sql = (f"SELECT DISTINCT {', '.join('s.' + field for field in RESULT_FIELDS)} FROM settlements s "
+               f"{where} ORDER BY s.exchange, s.settlement_type, s.settlement_no")
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def by_trading_date(self, trading_date, exchange=None, settlement_type=None):
+        """
+        Returns the settlements that include a trading date.
+        Args:
+            trading_date (date or str): The trading date (ISO or any format used by the published files)
+            exchange (str): Restrict to 'BSE' or 'NSE'
+            settlement_type (str): Restrict to a type, e.g. 'M', 'Z', 'DR'
+        Returns:
+            list: One dict per settlement (ISO dates)
+        """
+        iso = to_iso_date(trading_date)
+        if iso is None:
+            raise ValueError(f"Not a date: {trading_date}")
+        return self._query('JOIN trading_days d ON d.settlement_id = s.id WHERE d.trade_date = ?', [iso],
+                           exchange, settlement_type)
+
+    def by_settlement_no(self, settlement_no, exchange=None, settlement_type=None):
+        """
+        Returns the records of a settlement number (e.g. '2025063' or 'DR-621/2025-2026').
+        """
+        return self._query('WHERE s.settlement_no = ?', [settlement_no], exchange, settlement_type)
+
+
+_default_index = None
+
+
+def get_settlement_index():
+    """
+    Returns the process-wide settlement index, opening it on first use.
+    """
+    global _default_index
+    if _default_index is None:
+        _default_index = SettlementIndex()
+    return _default_index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build and query the settlement calendar index.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('update', help="Index new and changed output files")
+    lookup = subparsers.add_parser('lookup', help="Look up settlements")
+    target = lookup.add_mutually_exclusive_group(required=True)
+    target.add_argument('--date', help="Trading date")
+    target.add_argument('--settlement', help="Settlement number")
+    lookup.add_argument('--exchange', choices=['BSE', 'NSE'])
+    lookup.add_argument('--type', dest='settlement_type')
+    lookup.add_argument('--no-update', action='store_true', help="Query without indexing new files first")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    index = get_settlement_index()
+    if args.command == 'update' or not args.no_update:
+        index.update()
+    if args.command == 'lookup':
+        if args.date:
+            results = index.by_trading_date(args.date, args.exchange, args.settlement_type)
+        else:
+            results = index.by_settlement_no(args.settlement, args.exchange, args.settlement_type)
+        for result in results:
+            print(json.dumps(result))
+    index.close()
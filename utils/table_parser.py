@@ -0,0 +1,152 @@
+import io
+import logging
+
+try:
+    from lxml import etree
+except ImportError:  # lxml is optional, BeautifulSoup is used instead
+    etree = None
+
+logger = logging.getLogger(__name__)
+
+MAIN_TABLE_ID = 'ContentPlaceHolder1_dgSettle'
+TIMING_TABLE_ID = 'ContentPlaceHolder1_dg1'
+
+
+def _to_bytes(html):
+    return html.encode('utf-8') if isinstance(html, str) else html
+
+
+def _cell_text(cell):
+    """Equivalent of BeautifulSoup's get_text(strip=True) for an lxml element."""
+    return ''.join(text.strip() for text in cell.itertext())
+
+
+def _lxml_rows(table):
+    """
+    Converts an lxml table into rows: the <th> cells of the first row, then the <td> cells of the others.
+    """
+    trs = table.iter('tr')
+    first = next(trs, None)
+    if first is None:
+        return []
+    rows = [[_cell_text(th) for th in first.iter('th')]]
+    for tr in trs:
+        rows.append([_cell_text(td) for td in tr.iter('td')])
+    return rows
+
+
+def _lxml_tables(html, table_ids=None, limit=None):
+    """
+    Streams the document with iterparse and converts only the wanted tables, clearing every
+    other element as soon as it is complete so the full DOM is never held in memory.
+    Parsing stops once all wanted tables were found.
+    Args:
+        html (str or bytes): The HTML document
+        table_ids (list): Ids of the tables to extract; None to extract the outermost tables by position
+        limit (int): With table_ids None, stop after this many tables
+    Returns:
+        list: (table_id, rows) in document order
+    """
+    wanted = set(table_ids or [])
+    found = []
+    capturing = 0  # depth of <table> elements inside a captured table
+    events = etree.iterparse(io.BytesIO(_to_bytes(html)), events=('start', 'end'),
+                             html=True, encoding='utf-8')
+    for event, elem in events:
+        if elem.tag == 'table':
+            if event == 'start':
+                if capturing or (elem.get('id') in wanted if table_ids else True):
+                    capturing += 1
+                continue
+            if capturing:
+                capturing -= 1
+                if capturing:
+                    continue
+                found.append((elem.get('id'), _lxml_rows(elem)))
+                if (table_ids and len(found) == len(wanted)) or (limit and len(found) >= limit):
+                    break
+        if event == 'end' and not capturing:
+            elem.clear(keep_tail=True)
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+    return found
+
+
+def _bs4_rows(table):
+    rows = [[th.get_text(strip=True) for th in table.find('tr').find_all('th')]]
+    for row in table.find_all('tr')[1:]:
+        rows.append([td.get_text(strip=True) for td in row.find_all('td')])
+    return rows
+
+
+def _bs4_tables(html, table_ids=None, limit=None):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    if table_ids:
+        tables = [soup.find('table', {'id': table_id}) for table_id in table_ids]
+    else:
+        # Outermost tables only, as _lxml_tables: a table nested in a cell is part of that table
+        tables = soup.find_all(lambda tag: tag.name == 'table' and tag.find_parent('table') is None,
+                               limit=limit)
+    return [(table.get('id'), _bs4_rows(table)) for table in tables if table is not None]
+
+
+def extract_tables(html, table_ids=None, limit=None):
+    """
+    Extracts tables as lists of rows, with lxml when available and BeautifulSoup otherwise.
+    Args:
+        html (str or bytes): The HTML document
+        table_ids (list): Ids of the tables to extract; None to take tables by position
+        limit (int): With table_ids None, maximum number of tables to return
+    Returns:
+        list: (table_id, rows) for each table found, in document order
+    """
+    if etree is not None:
+        return _lxml_tables(html, table_ids, limit)
+    return _bs4_tables(html, table_ids, limit)
+
+
+def parse_settlement_tables(html):
+    """
+    Parses the settlement calendar tables out of a setcal.aspx page.
+    Args:
+        html (str): Page source of the settlement calendar page
+    Returns:
+        list: A list of lists containing the main table (header + rows) followed by an empty
+              separator row and the timing table (if present). Empty list if the main table is missing.
+    """
+    tables = dict(extract_tables(html, [MAIN_TABLE_ID, TIMING_TABLE_ID]))
+    if MAIN_TABLE_ID not in tables:
+        return []
+
+    data = tables[MAIN_TABLE_ID]
+    if TIMING_TABLE_ID in tables:
+        data.append([])
+        data.extend(tables[TIMING_TABLE_ID])
+    return data
+
+
+def parse_xls_export(html):
+    """
+    Parses a BSE settlement calendar export (an HTML document saved as .xls).
+    Headers are cleaned the way the published CSVs expect: newlines become spaces and,
+    in the timing table, commas become semicolons.
+    Args:
+        html (str or bytes): Content of the exported file
+    Returns:
+        tuple: (main_table_data, timing_table_data); timing_table_data is empty if absent
+    """
+    tables = [rows for _, rows in extract_tables(html, limit=2)]
+    if not tables:
+        raise ValueError("No table found in export")
+
+    main_table_data = tables[0]
+    main_table_data[0] = [col.replace('\n', ' ') for col in main_table_data[0]]
+
+    timing_table_data = []
+    if len(tables) > 1:
+        timing_table_data = tables[1]
+        timing_table_data[0] = [col.replace('\n', ' ').replace(',', ';') for col in timing_table_data[0]]
+
+    return main_table_data, timing_table_data
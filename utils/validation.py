@@ -1,16 +1,105 @@
 import os
 import csv
-from utils.clean_csv import convert_date_format
+import json
+import time
+import multiprocessing
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+from utils.csv_pipeline import process_settlement_file, MAX_LOGGED_DIFFS
+from utils.diff_engine import log_diff
+from utils.run_manifest import month_key_from_filename
+from utils.columnar_sink import write_published_csv
+from utils.date_utils import PUBLISH_DATE_FORMAT
+from utils.instrumentation import instrumented
 import logging
-from settings import READY_DIR, LOGS_DIR, OUTPUT_DIR, SETTLEMENT_DIR
+from settings import (READY_DIR, OUTPUT_DIR, SETTLEMENT_DIR,
+                      VALIDATION_WORKERS, VALIDATION_PARALLEL_MIN_FILES, VALIDATION_REPORT_DIR,
+                      PROCESS_START_METHOD)
 
 logger = logging.getLogger(__name__)
 
-def compare_folders(output_folder=OUTPUT_DIR, settlement_folder=SETTLEMENT_DIR):
+REPORT_CSV_FIELDS = ['filename', 'status', 'total_diffs', 'settlement_lines', 'output_lines', 'elapsed', 'dest_path']
+
+
+def _validate_file(filename, settlement_folder, output_folder, dest_folder):
+    """
+    Runs one file through the pipeline and times it. Module-level so it can run in a worker process.
+    """
+    started = time.perf_counter()
+    result = process_settlement_file(filename, settlement_folder, output_folder, dest_folder)
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def validate_files(filenames, settlement_folder, output_folder, dest_folder=READY_DIR, workers=VALIDATION_WORKERS):
+    """
+    Validates files present in both folders, fanning them out over a process pool.
+    Folders with fewer than VALIDATION_PARALLEL_MIN_FILES files, or a single worker, run in-process.
+    Args:
+        filenames (list): CSV names present in both folders
+        settlement_folder (str): Folder with the scraped settlement CSVs
+        output_folder (str): Folder with the CSVs converted from the XLS exports
+        dest_folder (str): Folder receiving the publish files
+        workers (int): Number of worker processes
+    Returns:
+        list: FileResult per file, in the order of filenames
+    """
+    filenames = list(filenames)
+    if workers <= 1 or len(filenames) < VALIDATION_PARALLEL_MIN_FILES:
+        return [_validate_file(f, settlement_folder, output_folder, dest_folder) for f in filenames]
+
+    workers = min(workers, len(filenames))
+    logger.info(f"Validating {len(filenames)} files with {workers} workers")
+    chunksize = max(1, len(filenames) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(PROCESS_START_METHOD)) as executor:
+        return list(executor.map(_validate_file, filenames, repeat(settlement_folder), repeat(output_folder),
+                                 repeat(dest_folder), chunksize=chunksize))
+
+
+def write_validation_report(results, only_in_settlement, only_in_output, elapsed, report_dir=VALIDATION_REPORT_DIR):
     """
-    Compares CSV files and handles matched/mismatched files
+    Writes validation_report.json (full detail, including keyed diffs) and validation_report.csv
+    (one line per file) to report_dir.
+    Returns:
+        tuple: (json_path, csv_path)
+    """
+    os.makedirs(report_dir, exist_ok=True)
+    files = [result.to_dict() for result in results]
+    files += [{'filename': f, 'status': 'only_in_settlement'} for f in sorted(only_in_settlement)]
+    files += [{'filename': f, 'status': 'only_in_output'} for f in sorted(only_in_output)]
+    report = {
+        'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'elapsed': round(elapsed, 4),
+        'matches': sum(1 for result in results if result.matched),
+        'mismatches': sum(1 for result in results if not result.matched),
+        'unique_files': len(only_in_settlement) + len(only_in_output),
+        'files': files,
+    }
+
+    json_path = os.path.join(report_dir, 'validation_report.json')
+    csv_path = os.path.join(report_dir, 'validation_report.csv')
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=REPORT_CSV_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(files)
+    return json_path, csv_path
+
+
+@instrumented()
+def compare_folders(output_folder=OUTPUT_DIR, settlement_folder=SETTLEMENT_DIR, manifest=None,
+                    workers=VALIDATION_WORKERS, report_dir=VALIDATION_REPORT_DIR, dest_folder=READY_DIR):
+    """
+    Compares CSV files and handles matched/mismatched files.
+    Each settlement file is read once: it is cleaned, hashed and, when its digest matches the
+    output file, converted into dest_folder in a single streaming pass. Mismatches get a keyed
+    diff by settlement number (see utils.diff_engine). Files are spread over `workers` processes
+    and a JSON/CSV report is written to report_dir (None to skip it).
+    If a run manifest is given, published months are recorded in it.
     Returns count of mismatched files
     """
+    started = time.perf_counter()
     mismatches = 0
     matches = 0
     missing_files = 0
@@ -26,78 +115,36 @@ def compare_folders(output_folder=OUTPUT_DIR, settlement_folder=SETTLEMENT_DIR):
     # Files present in both folders
     common_files = settlement_files & output_files
     
-    # Compare common files
-    for filename in sorted(common_files):
-        settlement_path = os.path.join(settlement_folder, filename)
-        output_path = os.path.join(output_folder, filename)
-        
-        with open(settlement_path, 'r', encoding='utf-8') as f1, \
-             open(output_path, 'r', encoding='utf-8') as f2:
-            
-            reader1 = csv.reader(f1)
-            reader2 = csv.reader(f2)
-            
-            settlement_data = list(reader1)
-            output_data = list(reader2)
-            
-            if settlement_data == output_data:
-                logger.info(f"Exact match: {filename}")
-                matches += 1
-                matched_files.append(filename)
-                
-                # Convert and save to ready_to_load
-                date_cols = convert_date_format(filename, settlement_folder)
-                logger.debug(f"Converted dates in {filename} (columns: {', '.join(date_cols)})")
-                
-            else:
-                logger.error(f"Mismatch found: {filename}")
-                mismatches += 1
-                mismatched_files.append(filename)
-                
-                max_diffs = 5
-                diff_count = 0
-                total_diffs = 0
-                
-                # Compare line by line
-                for i, (line1, line2) in enumerate(zip(settlement_data, output_data)):
-                    if line1 != line2:
-                        total_diffs += 1
-                        if diff_count < max_diffs:
-                            logger.debug(f"\nDifference at line {i+1}:")
-                            # Find differing columns
-                            diffs = []
-                            for col, (val1, val2) in enumerate(zip(line1, line2)):
-                                if val1 != val2:
-                                    diffs.append((col+1, val1, val2))
-                            
-                            # Print line comparison
-                            logger.debug(f"Settlement >> {line1}")
-                            logger.debug(f"Output     << {line2}")
-                            
-                            # Print column differences
-                            if diffs:
-                                logger.debug("Differing columns:")
-                                for col, v1, v2 in diffs:
-                                    logger.debug(f"    Column {col}: '{v1}' vs '{v2}'")
-                            
-                            diff_count += 1
-                
-                # Handle different line counts
-                len_diff = len(settlement_data) - len(output_data)
-                if len_diff != 0:
-                    logger.debug(f"\nLine count difference: {len(settlement_data)} vs {len(output_data)} lines")
-                    if len_diff > 0:
-                        extra_lines = settlement_data[len(output_data):]
-                        logger.debug(f"Extra lines in settlement file: {len(extra_lines)}")
-                    else:
-                        extra_lines = output_data[len(settlement_data):]
-                        logger.debug(f"Extra lines in output file: {abs(len_diff)}")
-                
-                # Show remaining diffs count
-                if total_diffs > max_diffs:
-                    logger.debug(f"\n... and {total_diffs - max_diffs} more differences")
-                
-                logger.debug(f"Total differences found: {total_diffs}")
+    # Compare common files, publishing each match in the same pass
+    results = validate_files(sorted(common_files), settlement_folder, output_folder, dest_folder, workers)
+    for result in results:
+        filename = result.filename
+        if result.anomaly_columns:
+            logger.info(f"Cleaned {filename} - Anomalies found in columns:")
+            for col in result.anomaly_columns:
+                logger.debug(f"Found anomaly in column: {col}")
+
+        if result.matched:
+            logger.info(f"Exact match: {filename}")
+            matches += 1
+            matched_files.append(filename)
+            logger.debug(f"Converted dates in {filename} (columns: {', '.join(result.date_columns)})"
+                         if result.date_columns else f"No dates found in {filename}")
+            key = month_key_from_filename(filename)
+            outputs = [result.dest_path]
+            if key:
+                year, month = key.split('-')
+                outputs += write_published_csv(result.dest_path, 'BSE', year, month, PUBLISH_DATE_FORMAT)
+            if manifest is not None and key and manifest.get('months', key):
+                manifest.record('months', key, 'published', outputs=outputs)
+        else:
+            logger.error(f"Mismatch found: {filename}")
+            mismatches += 1
+            mismatched_files.append(filename)
+
+            if result.settlement_lines != result.output_lines:
+                logger.debug(f"\nLine count difference: {result.settlement_lines} vs {result.output_lines} lines")
+            log_diff(result.diff, MAX_LOGGED_DIFFS)
 
     # Files only in settlement
     only_in_settlement = settlement_files - output_files
@@ -122,19 +169,17 @@ def compare_folders(output_folder=OUTPUT_DIR, settlement_folder=SETTLEMENT_DIR):
     logger.warning(f"Mismatched files: {mismatches}")
     logger.warning(f"Unique files: {missing_files}")
     logger.info(f"\nValidated files available in: {os.path.abspath(READY_DIR)}")
-    
-    # Process matched files
-    for filename in matched_files:
-        date_cols = convert_date_format(filename, settlement_folder)
-        logger.debug(f"Converted dates in {filename} (columns: {', '.join(date_cols)})" if date_cols else f"No dates found in {filename}")
+
+    if report_dir:
+        json_path, _ = write_validation_report(results, only_in_settlement, only_in_output,
+                                               time.perf_counter() - started, report_dir)
+        logger.info(f"Validation report written to {json_path}")
 
     return mismatches
 
 if __name__ == "__main__":
-    os.makedirs('logs', exist_ok=True)
-    logging.basicConfig(
-        filename=os.path.join(LOGS_DIR, 'validation.log'),
-        level=logging.DEBUG,
-        format='%(asctime)s - %(levelname)s - %(message)s'
-    )
-    compare_folders()
+    # Kept for existing scripts; same as `python cli.py validate`
+    import sys
+    from cli import main
+
+    sys.exit(main(['validate'] + sys.argv[1:]))
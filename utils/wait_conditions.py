@@ -0,0 +1,71 @@
+import os
+import time
+import logging
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+logger = logging.getLogger(__name__)
+
+
+def click_and_wait_for_postback(driver, element, table_id, timeout):
+    """
+    Clicks an element that triggers a full-page postback and waits until the page is replaced.
+    The wait ends when the current table (or the clicked element if the table is not on the page yet)
+    goes stale and the table is present again.
+    Args:
+        driver: Selenium WebDriver instance
+        element: The WebElement to click
+        table_id (str): Id of the table rendered by the postback
+        timeout (float): Maximum seconds to wait for each condition
+    Returns:
+        float: Seconds spent waiting
+    """
+    existing = driver.find_elements(By.ID, table_id)
+    marker = existing[0] if existing else element
+
+    start = time.monotonic()
+    element.click()
+    WebDriverWait(driver, timeout).until(EC.staleness_of(marker))
+    try:
+        WebDriverWait(driver, timeout).until(EC.presence_of_element_located((By.ID, table_id)))
+    except TimeoutException:
+        # The page came back without the table, e.g. a month with no data
+        logger.debug(f"Table {table_id} not present after postback")
+    elapsed = time.monotonic() - start
+    logger.info(f"Postback completed in {elapsed:.2f}s")
+    return elapsed
+
+
+def wait_for_download(directory, filename, timeout, poll_interval=0.25, stable_polls=2):
+    """
+    Waits for a browser download to finish: the file exists, its '.crdownload' partial is gone
+    and its size has not changed for `stable_polls` consecutive polls.
+    Args:
+        directory (str): The download directory
+        filename (str): The final name of the downloaded file
+        timeout (float): Maximum seconds to wait
+        poll_interval (float): Seconds between polls
+        stable_polls (int): Number of polls the size must stay unchanged
+    Returns:
+        str: Path of the downloaded file, or None if it did not complete within the timeout
+    """
+    path = os.path.join(directory, filename)
+    start = time.monotonic()
+    deadline = start + timeout
+    last_size = None
+    stable = 0
+
+    while time.monotonic() < deadline:
+        if os.path.exists(path) and not os.path.exists(path + '.crdownload'):
+            size = os.path.getsize(path)
+            stable = stable + 1 if size == last_size else 0
+            last_size = size
+            if stable >= stable_polls:
+                logger.info(f"Download of {filename} completed in {time.monotonic() - start:.2f}s")
+                return path
+        time.sleep(poll_interval)
+
+    logger.warning(f"Download of {filename} not completed after {timeout}s")
+    return None